@@ -0,0 +1,113 @@
+"""Filtered, keyset-paginated queries over the alerts collection.
+
+Alerts are returned newest first, ordered by ``(timestamp, _id)``. A page
+ends with an opaque cursor naming its last alert; the next page asks for
+alerts strictly before that key, so every page is an index range scan no
+matter how deep into the collection it is (unlike skip/offset). Each
+supported filter has a compound index that ends in the sort key, so
+filtered pages are served from the index in order without an in-memory sort.
+"""
+import base64
+import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+from ip_features import alert_values, parse_ips
+
+ALERT_INDEXES = [
+    [('timestamp', DESCENDING), ('_id', DESCENDING)],
+    [('severity', ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)],
+    [('attack_type', ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)],
+    [('source_ip', ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)],
+]
+SORT = [('timestamp', DESCENDING), ('_id', DESCENDING)]
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 1000
+TIME_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d']
+
+def parse_time(value):
+    """Naive datetime from the alert timestamp format, ISO-8601 or a bare date"""
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    try:
+        return datetime.datetime.fromisoformat(value).replace(tzinfo=None)
+    except ValueError:
+        raise ValueError(f"Invalid time {value!r}; expected YYYY-MM-DD[ HH:MM:SS]")
+
+def _codes(value, mapping, name):
+    """Comma-separated names or integer codes -> list of integer codes"""
+    codes = []
+    for item in value.split(','):
+        item = item.strip()
+        if item.lstrip('-').isdigit():
+            codes.append(int(item))
+        elif item in mapping:
+            codes.append(mapping[item])
+        else:
+            raise ValueError(f"Invalid {name} {item!r}; expected one of {sorted(mapping)} or an integer")
+    return codes
+
+def build_query(args, severity_mapping, attack_type_mapping):
+    """Mongo filter from /alerts query parameters; raises ValueError on bad input.
+
+    Supports start/end (timestamp range, end exclusive), severity (names or
+    codes, comma-separated), min_severity, attack_type (names or codes) and
+    source_ip (one address).
+    """
+    query = {}
+    time_range = {}
+    if args.get('start'):
+        time_range['$gte'] = parse_time(args['start'])
+    if args.get('end'):
+        time_range['$lt'] = parse_time(args['end'])
+    if time_range:
+        query['timestamp'] = time_range
+    if args.get('severity'):
+        query['severity'] = {'$in': _codes(args['severity'], severity_mapping, 'severity')}
+    elif args.get('min_severity'):
+        query['severity'] = {'$gte': _codes(args['min_severity'], severity_mapping, 'severity')[0]}
+    if args.get('attack_type'):
+        query['attack_type'] = {'$in': _codes(args['attack_type'], attack_type_mapping, 'attack_type')}
+    if args.get('source_ip'):
+        source_ip = args['source_ip'].strip()
+        parsed = parse_ips([source_ip])
+        if parsed.version[0] == 0:
+            raise ValueError(f"Invalid source_ip {source_ip!r}")
+        # Stored the way alerts store it: IPv4 as an integer, IPv6 as text
+        query['source_ip'] = alert_values([source_ip], parsed)[0]
+    return query
+
+def parse_limit(value):
+    if value in (None, ''):
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid limit {value!r}")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_LIMIT)
+
+def encode_cursor(alert):
+    key = f"{alert['timestamp'].isoformat()}|{alert['_id']}"
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        key = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, object_id = key.split('|')
+        return datetime.datetime.fromisoformat(timestamp), ObjectId(object_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def after_cursor(query, cursor):
+    """Restrict query to alerts that sort after the cursor's alert"""
+    timestamp, object_id = decode_cursor(cursor)
+    keyset = {'$or': [{'timestamp': {'$lt': timestamp}},
+                      {'timestamp': timestamp, '_id': {'$lt': object_id}}]}
+    return {'$and': [query, keyset]} if query else keyset
@@ -0,0 +1,232 @@
+"""Background writer that batches alerts into MongoDB off the request path.
+
+Alerts are queued in a bounded in-process queue and drained by a writer
+thread into unordered bulk inserts, grouped by size or time window. Failed
+batches are retried with exponential backoff and then spilled to a local
+append-only file, which is replayed once MongoDB accepts writes again.
+Inserted alerts are then folded into the per-minute rollups, if any.
+
+Pre-forked workers share the spill file. Appends and claims take an
+exclusive flock on ``<spill_path>.lock``, and a worker claims the spilled
+alerts for replay by renaming the file to ``<spill_path>.replay-<pid>``,
+so every spilled alert is replayed by exactly one process. A claim left by
+a worker that died is taken over by the next replay.
+"""
+import contextlib
+import fcntl
+import glob
+import logging
+import os
+import queue
+import threading
+import time
+
+from bson import json_util
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from metrics import STAGE_SECONDS
+
+DUPLICATE_KEY_ERROR = 11000
+
+_STOP = object()
+
+class AlertSink:
+    def __init__(self, collection, max_queue=10000, batch_size=500, flush_interval=1.0,
+                 max_retries=5, backoff_base=0.5, spill_path="output/alerts_spill.jsonl", rollups=None):
+        self.collection = collection
+        self.rollups = rollups
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.spill_path = spill_path
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._spill_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self.inserted = 0
+        self.spilled = 0
+        self.flushes = 0
+        self.last_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+
+    def submit(self, alerts):
+        """Queue alert documents for insertion without blocking the caller.
+
+        Documents should already carry their ``_id`` so callers can answer
+        before the insert happens. If the queue is full the overflow goes
+        straight to the spill file.
+        """
+        self._ensure_started()
+        for position, alert in enumerate(alerts):
+            try:
+                self._queue.put_nowait(alert)
+            except queue.Full:
+                logging.warning("Alert queue full, spilling alerts to disk")
+                self._spill(alerts[position:])
+                return
+
+    def stats(self):
+        return {
+            'queue_depth': self._queue.qsize(),
+            'inserted': self.inserted,
+            'spilled': self.spilled,
+            'flushes': self.flushes,
+            'last_flush_seconds': self.last_flush_seconds,
+            'avg_flush_seconds': self.total_flush_seconds / self.flushes if self.flushes else 0.0
+        }
+
+    def close(self, timeout=30):
+        """Flush queued alerts and stop the writer thread"""
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _ensure_started(self):
+        # A forked child inherits the queue object but not the writer thread
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="alert-sink", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._write(batch)
+            except Exception as e:
+                logging.error(f"Unexpected error writing alerts, spilling batch: {e}", exc_info=True)
+                self._spill(batch)
+        # Drain whatever was queued before the stop marker
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+        for start in range(0, len(batch), self.batch_size):
+            self._write(batch[start:start + self.batch_size])
+
+    def _insert(self, batch):
+        """Insert batch and fold the documents that were not already stored into the rollups"""
+        try:
+            self.collection.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # Replayed or retried documents may already be stored
+            errors = e.details.get('writeErrors', [])
+            if any(error.get('code') != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+            duplicates = {error['index'] for error in errors}
+            batch = [alert for position, alert in enumerate(batch) if position not in duplicates]
+        if self.rollups is not None:
+            self.rollups.record(batch)
+
+    def _write(self, batch):
+        for attempt in range(self.max_retries):
+            start = time.perf_counter()
+            try:
+                self._insert(batch)
+            except PyMongoError as e:
+                logging.warning(f"Alert insert failed (attempt {attempt + 1}/{self.max_retries}): {e}")
+                if attempt + 1 < self.max_retries and not self._closed:
+                    time.sleep(self.backoff_base * 2 ** attempt)
+                    continue
+                break
+            self.last_flush_seconds = time.perf_counter() - start
+            STAGE_SECONDS.labels('mongo_insert').observe(self.last_flush_seconds)
+            self.total_flush_seconds += self.last_flush_seconds
+            self.flushes += 1
+            self.inserted += len(batch)
+            self._replay_spill()
+            return
+        self._spill(batch)
+
+    @contextlib.contextmanager
+    def _locked_spill(self):
+        """Exclusive access to the spill file among this process's threads and every other process"""
+        with self._spill_lock:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            with open(self.spill_path + ".lock", "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                yield
+
+    def _spill(self, alerts):
+        lines = "".join(json_util.dumps(alert) + "\n" for alert in alerts)
+        with self._locked_spill():
+            with open(self.spill_path, "a") as f:
+                f.write(lines)
+        self.spilled += len(alerts)
+
+    def _claim_spill(self):
+        """Path of spilled alerts only this process replays, or None if there are none"""
+        replay_path = f"{self.spill_path}.replay-{os.getpid()}"
+        if os.path.exists(replay_path):
+            # A replay that failed earlier
+            return replay_path
+        with self._locked_spill():
+            for path in [self.spill_path] + self._orphaned_claims():
+                try:
+                    os.replace(path, replay_path)
+                    return replay_path
+                except FileNotFoundError:
+                    continue
+        return None
+
+    def _orphaned_claims(self):
+        """Replay files claimed by processes that no longer run, including the unnumbered one of older releases"""
+        orphans = [self.spill_path + ".replay"]
+        for path in glob.glob(glob.escape(self.spill_path) + ".replay-*"):
+            try:
+                os.kill(int(path.rsplit("-", 1)[1]), 0)
+            except ProcessLookupError:
+                orphans.append(path)
+            except (ValueError, PermissionError):
+                continue
+        return orphans
+
+    def _replay_spill(self):
+        """Re-insert spilled alerts once MongoDB is accepting writes again"""
+        replay_path = self._claim_spill()
+        if replay_path is None:
+            return
+        with open(replay_path) as f:
+            alerts = [json_util.loads(line) for line in f if line.strip()]
+        try:
+            for start in range(0, len(alerts), self.batch_size):
+                self._insert(alerts[start:start + self.batch_size])
+        except PyMongoError as e:
+            logging.warning(f"Replaying spilled alerts failed, will retry later: {e}")
+            return
+        os.remove(replay_path)
+        self.inserted += len(alerts)
+        logging.info(f"Replayed {len(alerts)} spilled alerts")
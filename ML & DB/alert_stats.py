@@ -0,0 +1,219 @@
+"""Per-minute alert rollups and the aggregations behind /alerts/stats.
+
+Every batch the alert writer inserts is folded into one rollup document
+per minute, ``{_id: minute, count, severity: {code: n}, attack_type:
+{code: n}}``, with atomic ``$inc`` upserts, so rollups stay current across
+pre-forked workers. Statistics are aggregation pipelines over the rollups:
+a day is at most 1440 small documents, whatever the alert volume. Range
+ends that fall inside a minute, such as "now", are exact: the whole minutes
+come from the rollups and the partial ones at either end are counted from
+the alerts themselves. The rollup results are cached per process for a few
+seconds, since dashboards poll.
+"""
+import collections
+import datetime
+import logging
+import threading
+import time
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+BUCKET_FORMATS = {
+    'minute': '%Y-%m-%d %H:%M:00',
+    'hour': '%Y-%m-%d %H:00:00',
+    'day': '%Y-%m-%d 00:00:00',
+}
+DIMENSIONS = ('severity', 'attack_type')
+
+def minute(timestamp):
+    return timestamp.replace(second=0, microsecond=0)
+
+def ceil_minute(timestamp):
+    start = minute(timestamp)
+    return start if start == timestamp else start + datetime.timedelta(minutes=1)
+
+def split_range(start, end):
+    """``(whole, partial)`` for [start, end): the (first, last) bounds of the whole minutes in it, or
+    None if it has none, and the [start, end) ranges of the partial minutes around them"""
+    first = ceil_minute(start) if start is not None else None
+    last = minute(end) if end is not None else None
+    if first is not None and last is not None and first >= last:
+        return None, [(start, end)] if start < end else []
+    partial = []
+    if start is not None and first != start:
+        partial.append((start, first))
+    if end is not None and last != end:
+        partial.append((last, end))
+    return (first, last), partial
+
+def rollup_updates(alerts):
+    """One $inc upsert per minute covered by ``alerts``"""
+    increments = collections.defaultdict(collections.Counter)
+    for alert in alerts:
+        timestamp = alert.get('timestamp')
+        if not isinstance(timestamp, datetime.datetime):
+            continue
+        counts = increments[minute(timestamp)]
+        counts['count'] += 1
+        for dimension in DIMENSIONS:
+            counts[f"{dimension}.{alert.get(dimension, 0)}"] += 1
+    return [UpdateOne({'_id': key}, {'$inc': dict(counts)}, upsert=True) for key, counts in increments.items()]
+
+def _breakdown(dimension):
+    return [
+        {'$project': {'pairs': {'$objectToArray': f'${dimension}'}}},
+        {'$unwind': '$pairs'},
+        {'$group': {'_id': '$pairs.k', 'count': {'$sum': '$pairs.v'}}},
+    ]
+
+def stats_pipeline(first=None, last=None, bucket='hour', timeline=True):
+    """Totals, per-dimension counts and optionally a per-severity timeline of the rollups of the
+    minutes from first up to but excluding last"""
+    window = {}
+    if first is not None:
+        window['$gte'] = first
+    if last is not None:
+        window['$lt'] = last
+    facets = {
+        'total': [{'$group': {'_id': None, 'count': {'$sum': '$count'}}}],
+        'severity': _breakdown('severity'),
+        'attack_type': _breakdown('attack_type'),
+    }
+    if timeline:
+        facets['timeline'] = [
+            {'$project': {'bucket': {'$dateToString': {'format': BUCKET_FORMATS[bucket], 'date': '$_id'}},
+                          'pairs': {'$objectToArray': '$severity'}}},
+            {'$unwind': '$pairs'},
+            {'$group': {'_id': {'bucket': '$bucket', 'severity': '$pairs.k'}, 'count': {'$sum': '$pairs.v'}}},
+        ]
+    return [{'$match': {'_id': window}} if window else {'$match': {}}, {'$facet': facets}]
+
+def partial_pipeline(ranges, bucket='hour', timeline=True):
+    """stats_pipeline's facets counted from the alerts with timestamps in any of the [start, end) ranges"""
+    # Keyed like the rollups, where a missing code counts as 0
+    codes = {dimension: {'$toString': {'$ifNull': [f'${dimension}', 0]}} for dimension in DIMENSIONS}
+    facets = {
+        'total': [{'$group': {'_id': None, 'count': {'$sum': 1}}}],
+        'severity': [{'$group': {'_id': codes['severity'], 'count': {'$sum': 1}}}],
+        'attack_type': [{'$group': {'_id': codes['attack_type'], 'count': {'$sum': 1}}}],
+    }
+    if timeline:
+        bucket_of = {'$dateToString': {'format': BUCKET_FORMATS[bucket], 'date': '$timestamp'}}
+        facets['timeline'] = [{'$group': {'_id': {'bucket': bucket_of, 'severity': codes['severity']},
+                                          'count': {'$sum': 1}}}]
+    return [
+        {'$match': {'$or': [{'timestamp': {'$gte': start, '$lt': end}} for start, end in ranges]}},
+        {'$facet': facets},
+    ]
+
+def rebuild_pipeline(dimension, rollup_collection):
+    """Recompute one dimension of every rollup from the alerts themselves"""
+    timestamp = '$timestamp'
+    minute_of = {'$dateFromParts': {'year': {'$year': timestamp}, 'month': {'$month': timestamp},
+                                    'day': {'$dayOfMonth': timestamp}, 'hour': {'$hour': timestamp},
+                                    'minute': {'$minute': timestamp}}}
+    return [
+        {'$match': {'timestamp': {'$type': 'date'}}},
+        {'$group': {'_id': {'minute': minute_of, 'key': {'$toString': f'${dimension}'}}, 'count': {'$sum': 1}}},
+        {'$group': {'_id': '$_id.minute', 'count': {'$sum': '$count'},
+                    dimension: {'$push': {'k': '$_id.key', 'v': '$count'}}}},
+        {'$project': {'count': 1, dimension: {'$arrayToObject': f'${dimension}'}}},
+        {'$merge': {'into': rollup_collection, 'whenMatched': 'merge', 'whenNotMatched': 'insert'}},
+    ]
+
+def _named(counts, names):
+    """{name: count} from {code: count}, unknown codes kept as-is"""
+    return {names.get(int(code), code): count for code, count in sorted(counts.items(), key=lambda item: int(item[0]))}
+
+def _counts(result):
+    """A stats_pipeline or partial_pipeline result as Counters, so results can be added up"""
+    counts = {'total': collections.Counter({'count': result['total'][0]['count'] if result['total'] else 0})}
+    for dimension in DIMENSIONS:
+        counts[dimension] = collections.Counter({row['_id']: row['count'] for row in result[dimension]})
+    if 'timeline' in result:
+        counts['timeline'] = collections.Counter({(row['_id']['bucket'], row['_id']['severity']): row['count']
+                                                  for row in result['timeline']})
+    return counts
+
+class AlertRollups:
+    def __init__(self, collection, cache_seconds=5.0, max_cached=256, alerts=None):
+        """``alerts`` is the alerts collection the partial minutes at range ends are counted from;
+        without it the ranges are widened to whole minutes"""
+        self.collection = collection
+        self.alerts = alerts
+        self.cache_seconds = cache_seconds
+        self.max_cached = max_cached
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, alerts):
+        """Fold newly inserted alerts into their minutes; errors are logged, not raised"""
+        updates = rollup_updates(alerts)
+        if not updates:
+            return
+        try:
+            self.collection.bulk_write(updates, ordered=False)
+        except PyMongoError as e:
+            # The alerts themselves are stored; rebuild() recovers the counts
+            logging.warning(f"Updating alert rollups failed: {e}")
+
+    def rebuild(self, alerts_collection):
+        """Recompute all rollups from the alerts collection (backfill or repair)"""
+        self.collection.drop()
+        for dimension in DIMENSIONS:
+            alerts_collection.aggregate(rebuild_pipeline(dimension, self.collection.name), allowDiskUse=True)
+        self.clear_cache()
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self, start=None, end=None, bucket='hour', severity_names=None, attack_type_names=None,
+              timeline=True):
+        """Alert statistics for [start, end); timeline=False leaves out the timeline, for totals alone"""
+        if bucket not in BUCKET_FORMATS:
+            raise ValueError(f"Invalid bucket {bucket!r}; expected one of {list(BUCKET_FORMATS)}")
+        whole, partial = split_range(start, end)
+        if self.alerts is None and partial:
+            whole, partial = (start and minute(start), end and ceil_minute(end)), []
+        counts = self._rollup_counts(whole, bucket, timeline) if whole is not None else {}
+        if partial:
+            result = list(self.alerts.aggregate(partial_pipeline(partial, bucket, timeline)))[0]
+            counts = {field: counts.get(field, collections.Counter()) + values
+                      for field, values in _counts(result).items()}
+        severity_names = severity_names or {}
+        stats = {
+            'start': start.strftime('%Y-%m-%d %H:%M:%S') if start else None,
+            'end': end.strftime('%Y-%m-%d %H:%M:%S') if end else None,
+            'bucket': bucket,
+            'total': counts.get('total', {}).get('count', 0),
+            'severity': _named(counts.get('severity', {}), severity_names),
+            'attack_type': _named(counts.get('attack_type', {}), attack_type_names or {}),
+        }
+        if timeline:
+            stats['timeline'] = [{'time': time_bucket, 'severity': severity_names.get(int(severity), severity),
+                                  'count': count}
+                                 for (time_bucket, severity), count in sorted(counts.get('timeline', {}).items())]
+        return stats
+
+    def _rollup_counts(self, whole, bucket, timeline):
+        """_counts of the rollups of whole minutes, served from the cache when fresh"""
+        key = (*whole, bucket, timeline)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > now:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+        counts = _counts(list(self.collection.aggregate(stats_pipeline(*whole, bucket, timeline)))[0])
+        with self._lock:
+            self._cache[key] = (now + self.cache_seconds, counts)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        return counts
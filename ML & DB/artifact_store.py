@@ -0,0 +1,217 @@
+"""Versioned, directory-based model artifacts.
+
+Each saved model set lives in its own ``<root>/<version>/`` directory:
+
+    manifest.json            version, feature schema, training metadata
+    lgbm.txt                 LightGBM booster in its native text format
+    scaler_*.npy             StandardScaler statistics
+    iforest_*.npy            Isolation Forest as flat node arrays, plus the rolling
+                             window of rows incremental training refits it on
+    autoencoder_*.npy        autoencoder Dense weights, biases and threshold sketch
+    autoencoder.keras        optional Keras model, only needed to keep training
+
+Arrays are loaded with ``mmap_mode='r'``, so processes serving the same
+version share one copy of the model pages through the OS page cache.
+``<root>/CURRENT`` names the version that load() picks by default; versions
+are written to a temporary directory and renamed into place, and CURRENT is
+replaced atomically, so readers never see a half-written model set.
+"""
+import datetime
+import json
+import os
+import shutil
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+from numpy_autoencoder import NumpyAutoencoder
+from quantile_sketch import QuantileSketch
+from tree_ensemble import CompiledIsolationForest
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+CURRENT = "CURRENT"
+LGBM_FILE = "lgbm.txt"
+KERAS_FILE = "autoencoder.keras"
+
+class ArtifactStore:
+    def __init__(self, root="models"):
+        self.root = root
+
+    def path(self, version, name=""):
+        return os.path.join(self.root, version, name)
+
+    def versions(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isfile(self.path(name, MANIFEST)))
+
+    def current_version(self):
+        try:
+            with open(os.path.join(self.root, CURRENT)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def manifest(self, version=None):
+        version = version or self.current_version()
+        if version is None:
+            raise FileNotFoundError(f"No model version published in {self.root}")
+        with open(self.path(version, MANIFEST)) as f:
+            return json.load(f)
+
+    def _new_version(self):
+        version = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        suffix = 1
+        candidate = version
+        while os.path.exists(self.path(candidate)):
+            suffix += 1
+            candidate = f"{version}-{suffix}"
+        return candidate
+
+    def save(self, system, publish=True):
+        """Write the system's models as a new version and return its name"""
+        os.makedirs(self.root, exist_ok=True)
+        version = self._new_version()
+        staging = os.path.join(self.root, f".staging-{version}")
+        os.makedirs(staging)
+        try:
+            manifest = {
+                'format_version': FORMAT_VERSION,
+                'version': version,
+                'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+                'feature_columns': list(system.feature_columns),
+                'training': getattr(system, 'training_metadata', None) or {},
+                **self._write_arrays(system, staging)
+            }
+            with open(os.path.join(staging, MANIFEST), "w") as f:
+                json.dump(manifest, f, indent=2, default=str)
+            os.rename(staging, self.path(version))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        if publish:
+            self.publish(version)
+        return version
+
+    def publish(self, version):
+        """Point CURRENT at version atomically"""
+        pointer = os.path.join(self.root, f".{CURRENT}.tmp")
+        with open(pointer, "w") as f:
+            f.write(version)
+        os.replace(pointer, os.path.join(self.root, CURRENT))
+
+    def _write_arrays(self, system, directory):
+        def save(name, array):
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(array))
+
+        scaler = system.scaler
+        save('scaler_mean', scaler.mean_)
+        save('scaler_scale', scaler.scale_)
+        save('scaler_var', scaler.var_)
+
+        forest = system.isolation_forest
+        if not isinstance(forest, CompiledIsolationForest):
+            forest = CompiledIsolationForest.from_sklearn(forest)
+        for name, array in forest.to_arrays().items():
+            save(f'iforest_{name}', array)
+        window = getattr(system, 'training_window', None)
+        if window is not None:
+            save('iforest_window', window)
+
+        autoencoder = system.numpy_autoencoder
+        if system.autoencoder is not None:
+            autoencoder = NumpyAutoencoder.from_keras(system.autoencoder)
+            system.autoencoder.save(os.path.join(directory, KERAS_FILE))
+        arrays = autoencoder.to_arrays()
+        activations = [str(a) for a in arrays.pop('activations')]
+        for name, array in arrays.items():
+            save(f'autoencoder_{name}', array)
+        sketch_params = None
+        if system.ae_sketch is not None:
+            sketch_params, counts = system.ae_sketch.to_state()
+            save('autoencoder_sketch', counts)
+
+        system.lgbm_model.save_model(os.path.join(directory, LGBM_FILE))
+        return {
+            'scaler': {
+                'n_samples_seen': int(np.max(scaler.n_samples_seen_)),
+                'feature_names': hasattr(scaler, 'feature_names_in_')
+            },
+            'isolation_forest': {
+                'n_estimators': forest.n_estimators,
+                'offset': forest.offset,
+                'denominator': forest.denominator,
+                'window_rows': len(window) if window is not None else 0
+            },
+            'autoencoder': {
+                'activations': activations,
+                'keras': system.autoencoder is not None,
+                'threshold': system.ae_threshold,
+                'sketch': sketch_params
+            },
+            'lightgbm': {
+                'file': LGBM_FILE,
+                'best_iteration': int(system.lgbm_model.best_iteration)
+            }
+        }
+
+    def load(self, system, version=None, mmap_mode='r'):
+        """Load a version (CURRENT by default) into system and return its manifest"""
+        import lightgbm as lgb
+
+        manifest = self.manifest(version)
+        directory = self.path(manifest['version'])
+
+        def load(name, optional=False):
+            path = os.path.join(directory, f"{name}.npy")
+            if optional and not os.path.exists(path):
+                return None
+            return np.load(path, mmap_mode=mmap_mode)
+
+        feature_columns = manifest['feature_columns']
+        scaler = StandardScaler()
+        scaler.mean_ = load('scaler_mean')
+        scaler.scale_ = load('scaler_scale')
+        scaler.var_ = load('scaler_var')
+        scaler.n_samples_seen_ = manifest['scaler']['n_samples_seen']
+        scaler.n_features_in_ = len(feature_columns)
+        if manifest['scaler']['feature_names']:
+            scaler.feature_names_in_ = np.array(feature_columns, dtype=object)
+
+        forest_info = manifest['isolation_forest']
+        forest = CompiledIsolationForest(
+            # Versions saved before missing_left was kept score NaN as 0
+            *[load(f'iforest_{name}', optional=name == 'missing_left') for name in CompiledIsolationForest.ARRAYS],
+            offset=forest_info['offset'], denominator=forest_info['denominator'])
+
+        autoencoder_info = manifest['autoencoder']
+        activations = autoencoder_info['activations']
+        autoencoder = NumpyAutoencoder([load(f'autoencoder_w{i}') for i in range(len(activations))],
+                                       [load(f'autoencoder_b{i}') for i in range(len(activations))],
+                                       activations)
+
+        system.scaler = scaler
+        system.lgbm_model = lgb.Booster(model_file=os.path.join(directory, LGBM_FILE))
+        system.isolation_forest = forest
+        system.autoencoder = None
+        system.feature_columns = feature_columns
+        system.training_window = load('iforest_window') if forest_info.get('window_rows') else None
+        system.model_version = manifest['version']
+        system.training_metadata = manifest.get('training', {})
+        system.ae_threshold = autoencoder_info.get('threshold')
+        system.ae_sketch = None
+        if autoencoder_info.get('sketch'):
+            # The sketch keeps updating while serving, so it gets a private copy
+            system.ae_sketch = QuantileSketch.from_state(autoencoder_info['sketch'],
+                                                         np.array(load('autoencoder_sketch')))
+        system.refresh_inference_engines(autoencoder)
+        return manifest
+
+    def load_keras_autoencoder(self, version=None):
+        """Load the Keras autoencoder saved with a version (imports TensorFlow)"""
+        from tensorflow import keras
+
+        version = version or self.current_version()
+        return keras.models.load_model(self.path(version, KERAS_FILE))
@@ -0,0 +1,172 @@
+"""Score a large CSV or Parquet event file offline with a saved model version.
+
+The input is read in chunks and the chunks are scored in a process pool;
+each worker loads the models once (the artifact arrays are memory-mapped)
+and writes its chunk straight to ``<output>/part-<chunk>.parquet``, so
+memory stays bounded by the chunks in flight whatever the file size.
+Nothing is written to MongoDB.
+
+Behavioral features start from an empty window for each run, not from the
+server's snapshot, and are computed in file order as the chunks are read,
+so the scores do not depend on --workers or on resuming.
+
+Each part is renamed into place only when complete, and a chunk whose
+part exists is skipped, so rerunning the same command after an interrupt
+resumes where it stopped. The output directory reads as one table:
+
+    python batch_score.py events.parquet scores/ --workers 4 --alerts-only
+    pd.read_parquet("scores/")
+"""
+import argparse
+import concurrent.futures
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+import pandas as pd
+
+MANIFEST = "_batch_score.json"
+
+_system = None
+
+def _init_worker(version):
+    global _system
+    import model
+
+    # One OpenMP thread per worker; the pool provides the parallelism
+    model.LGBM_PREDICT_THREADS = 1
+    system = model.CyberSecurityDetectionSystem(serving=False)
+    if not model.load_models(system, version):
+        raise RuntimeError("No trained models found; train and save models before scoring")
+    _system = system
+
+def _part_path(output, chunk):
+    return os.path.join(output, f"part-{chunk:06d}.parquet")
+
+def _score_chunk(chunk, start, data, output, alerts_only, keep):
+    """Worker task: score one chunk and write its part file; returns (chunk, rows, alerts)"""
+    from model import records_frame
+
+    # Behavioral features come with each chunk, from the run's window in file order
+    scores = _system.score_batch(records_frame(data))
+    scores.insert(0, 'row', range(start, start + len(data)))
+    for column in reversed(keep):
+        scores.insert(1, column, data[column].to_numpy())
+    alert_count = int(scores['alert'].sum())
+    if alerts_only:
+        scores = scores[scores['alert']]
+    path = _part_path(output, chunk)
+    temporary = f"{path}.tmp-{os.getpid()}"
+    scores.to_parquet(temporary, index=False)
+    os.replace(temporary, path)
+    return chunk, len(data), alert_count
+
+def read_chunks(path, chunk_rows):
+    """Yield DataFrames of up to chunk_rows rows from a CSV or Parquet file"""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+def _check_manifest(output, settings, overwrite):
+    """Resume only runs with the same input, model version and options"""
+    path = os.path.join(output, MANIFEST)
+    if os.path.exists(path):
+        with open(path) as f:
+            previous = json.load(f)
+        if previous != settings:
+            if not overwrite:
+                raise SystemExit(f"{output} holds results of a different run ({previous}); "
+                                 f"use --overwrite or another output directory")
+            for name in os.listdir(output):
+                if name.startswith("part-"):
+                    os.remove(os.path.join(output, name))
+    os.makedirs(output, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(settings, f, indent=2)
+
+def run(args):
+    from model import BEHAVIOR_FEATURES, artifact_store, behavior_features, behavior_store
+
+    version = args.version or artifact_store.current_version()
+    if version is None:
+        raise SystemExit("No published model version; train and save models first")
+    stat = os.stat(args.input)
+    _check_manifest(args.output, {
+        'input': os.path.abspath(args.input), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+        'model_version': version, 'chunk_rows': args.chunk_rows, 'alerts_only': args.alerts_only,
+        'keep': args.keep, 'behavior_features': BEHAVIOR_FEATURES
+    }, args.overwrite)
+
+    done = set()
+    for name in os.listdir(args.output):
+        if name.startswith("part-") and name.endswith(".parquet"):
+            done.add(name)
+        elif name.startswith("part-"):
+            # Left by a worker interrupted mid-write; its chunk is scored again
+            os.remove(os.path.join(args.output, name))
+    skipped = rows = alerts = 0
+    started = last_report = time.perf_counter()
+    in_flight = set()
+    context = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(args.workers, mp_context=context, initializer=_init_worker,
+                                                initargs=(version,)) as pool:
+        def collect(wait_for):
+            nonlocal rows, alerts, last_report
+            finished, _ = concurrent.futures.wait(in_flight, return_when=wait_for)
+            for future in finished:
+                in_flight.remove(future)
+                _, chunk_rows, chunk_alerts = future.result()
+                rows += chunk_rows
+                alerts += chunk_alerts
+            now = time.perf_counter()
+            if now - last_report >= args.report_interval:
+                last_report = now
+                print(f"{rows} rows scored, {rows / (now - started):.0f} rows/s, {alerts} alerts", flush=True)
+
+        start = 0
+        store = behavior_store()
+        for chunk, data in enumerate(read_chunks(args.input, args.chunk_rows)):
+            # Every chunk goes through the window, including those already done
+            behavior = behavior_features(store, data) if store is not None else {}
+            if os.path.basename(_part_path(args.output, chunk)) in done:
+                skipped += 1
+            else:
+                # Bound the chunks held in memory to two per worker
+                while len(in_flight) >= 2 * args.workers:
+                    collect(concurrent.futures.FIRST_COMPLETED)
+                in_flight.add(pool.submit(_score_chunk, chunk, start, data.assign(**behavior), args.output,
+                                          args.alerts_only, args.keep))
+            start += len(data)
+        while in_flight:
+            collect(concurrent.futures.FIRST_COMPLETED)
+
+    elapsed = time.perf_counter() - started
+    print(f"Scored {rows} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s) "
+          f"with model version {version}: {alerts} alerts"
+          + (f"; {skipped} chunks already done were skipped" if skipped else ""))
+    return rows, alerts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='CSV or .parquet file of events')
+    parser.add_argument('output', help='directory for the Parquet part files')
+    parser.add_argument('--version', help='model version to score with (default: models/CURRENT)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-rows', type=int, default=50000)
+    parser.add_argument('--alerts-only', action='store_true', help='write only the rows that raise an alert')
+    parser.add_argument('--keep', nargs='*', default=[], help='input columns to copy into the output, e.g. "Event ID"')
+    parser.add_argument('--overwrite', action='store_true', help='discard results of a different earlier run')
+    parser.add_argument('--report-interval', type=float, default=10.0, help='seconds between progress lines')
+    args = parser.parse_args(argv)
+    run(args)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
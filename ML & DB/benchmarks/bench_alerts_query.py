@@ -0,0 +1,113 @@
+"""Measure filtered /alerts query latency against a real MongoDB.
+
+Seeds a scratch collection with synthetic alerts spread over a time span,
+creates the service's alert indexes, then times the first page and a deep
+(cursor-following) page for each filter combination. The winning plan of
+each query is checked for an index scan with no in-memory sort:
+
+    python benchmarks/bench_alerts_query.py --uri mongodb://localhost:27017/ --alerts 1000000
+"""
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from bson import ObjectId
+from pymongo import MongoClient
+
+MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MODEL_DIR)
+
+from alert_queries import ALERT_INDEXES, SORT, after_cursor, encode_cursor
+
+FILTERS = {
+    'none': {},
+    'time_range': {'timestamp': {'$gte': None, '$lt': None}},
+    'severity': {'severity': {'$in': [3, 4]}},
+    'attack_type': {'attack_type': {'$in': [2]}},
+    'source_ip': {'source_ip': 3232235777},
+    'severity+time': {'severity': {'$in': [4]}, 'timestamp': {'$gte': None, '$lt': None}},
+}
+
+def seed(collection, count, days, batch=50000, seed=0):
+    rng = np.random.default_rng(seed)
+    end = datetime.datetime.now().replace(microsecond=0)
+    span = days * 86400
+    for offset in range(0, count, batch):
+        size = min(batch, count - offset)
+        seconds = np.sort(rng.integers(0, span, size))
+        documents = [{
+            '_id': ObjectId(),
+            'timestamp': end - datetime.timedelta(seconds=int(s)),
+            'severity': int(severity),
+            'attack_type': int(attack_type),
+            'source_ip': 3232235777 + int(host),
+        } for s, severity, attack_type, host in zip(
+            seconds, rng.integers(0, 5, size), rng.integers(0, 6, size), rng.integers(0, 5000, size))]
+        collection.insert_many(documents, ordered=False)
+    return end
+
+def resolve(query, end):
+    """Fill the time placeholders with the most recent day"""
+    resolved = {}
+    for field, condition in query.items():
+        if field == 'timestamp':
+            condition = {'$gte': end - datetime.timedelta(days=1), '$lt': end}
+        resolved[field] = condition
+    return resolved
+
+def page(collection, query, limit, cursor=None):
+    if cursor:
+        query = after_cursor(query, cursor)
+    start = time.perf_counter()
+    alerts = list(collection.find(query).sort(SORT).limit(limit))
+    return time.perf_counter() - start, alerts
+
+def uses_index(collection, query):
+    plan = collection.find(query).sort(SORT).limit(1).explain()['queryPlanner']['winningPlan']
+    text = str(plan)
+    return 'IXSCAN' in text and "'SORT'" not in text
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uri', default='mongodb://localhost:27017/')
+    parser.add_argument('--database', default='alerts_benchmark')
+    parser.add_argument('--alerts', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--depth', type=int, default=50, help='pages followed for the deep-page timing')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--keep', action='store_true', help='reuse an already seeded collection')
+    args = parser.parse_args()
+
+    collection = MongoClient(args.uri)[args.database]['alerts']
+    if not args.keep or collection.estimated_document_count() == 0:
+        collection.drop()
+        start = time.perf_counter()
+        end = seed(collection, args.alerts, args.days)
+        print(f"seeded {args.alerts} alerts in {time.perf_counter() - start:.1f}s")
+    else:
+        end = collection.find_one(sort=SORT)['timestamp']
+    start = time.perf_counter()
+    for keys in ALERT_INDEXES:
+        collection.create_index(keys)
+    print(f"indexes ready in {time.perf_counter() - start:.1f}s")
+
+    print(f"{'filter':<15} {'first page ms':>14} {'deep page ms':>13} {'index':>6}")
+    for name, template in FILTERS.items():
+        query = resolve(template, end)
+        first = statistics.median(page(collection, query, args.limit)[0] for _ in range(args.repeats))
+        cursor, elapsed = None, 0.0
+        for _ in range(args.depth):
+            elapsed, alerts = page(collection, query, args.limit, cursor)
+            if len(alerts) < args.limit:
+                break
+            cursor = encode_cursor(alerts[-1])
+        indexed = uses_index(collection, query)
+        print(f"{name:<15} {first * 1000:>14.2f} {elapsed * 1000:>13.2f} {'yes' if indexed else 'NO':>6}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Compare load time and per-process memory of system.pkl and the artifact store.
+
+Trains a model set on synthetic data, saves it in both formats under a
+scratch directory, then loads each format in fresh interpreters, alone and
+in several concurrent processes. Run from the ``ML & DB`` directory:
+
+    python benchmarks/bench_artifacts.py --rows 50000 --processes 4
+"""
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+
+MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MODEL_DIR)
+
+PROBE = """
+import json, os, sys, time
+sys.path.insert(0, {model_dir!r})
+os.chdir({workdir!r})
+start = time.perf_counter()
+import model
+system = model.CyberSecurityDetectionSystem(serving=False)
+{load}
+elapsed = time.perf_counter() - start
+sys.stdin.readline()  # Hold the models until every process has loaded
+memory = {{}}
+with open('/proc/self/smaps_rollup') as f:
+    for line in f:
+        parts = line.split()
+        if parts[0] in ('Rss:', 'Pss:', 'Private_Clean:', 'Private_Dirty:'):
+            memory[parts[0].rstrip(':')] = int(parts[1]) / 1024
+print(json.dumps({{'seconds': elapsed, 'rss_mb': memory['Rss'], 'pss_mb': memory['Pss'],
+                  'uss_mb': memory['Private_Clean'] + memory['Private_Dirty']}}))
+"""
+
+LOADERS = {
+    'pickle': """
+import pickle
+with open('models/system.pkl', 'rb') as f:
+    models = pickle.load(f)
+""",
+    'artifacts': "model.load_models(system)",
+}
+
+def train(workdir, rows):
+    from benchmarks.synthetic import generate_dataset
+    import model
+
+    os.chdir(workdir)
+    system = model.CyberSecurityDetectionSystem(serving=False)
+    system.train_models(system.preprocess_data(generate_dataset(rows), model.behavior_store()))
+    model.save_models(system)
+    with open(os.path.join("models", "system.pkl"), "wb") as f:
+        pickle.dump({
+            'scaler': system.scaler,
+            'lgbm': system.lgbm_model,
+            'isolation_forest': system.isolation_forest,
+            'autoencoder': system.autoencoder,
+            'feature_columns': system.feature_columns
+        }, f)
+
+def measure(workdir, fmt, processes):
+    code = PROBE.format(model_dir=MODEL_DIR, workdir=workdir, load=LOADERS[fmt])
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL='3')
+    children = [subprocess.Popen([sys.executable, '-c', code], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                 stderr=subprocess.DEVNULL, text=True, env=env)
+                for _ in range(processes)]
+    outputs = [child.communicate('\n')[0] for child in children]
+    return [json.loads(output.strip().splitlines()[-1]) for output in outputs]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50_000)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--workdir', default=None, help='reuse a directory with models already trained')
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="artifact-bench-")
+    if not os.path.exists(os.path.join(workdir, "models", "system.pkl")):
+        train(workdir, args.rows)
+
+    print(f"{'format':>10} {'procs':>6} {'load s':>8} {'RSS MB':>8} {'PSS MB':>8} {'USS MB':>8}")
+    for fmt in LOADERS:
+        for processes in (1, args.processes):
+            results = measure(workdir, fmt, processes)
+            mean = {key: sum(r[key] for r in results) / len(results) for key in results[0]}
+            print(f"{fmt:>10} {processes:>6} {mean['seconds']:>8.2f} {mean['rss_mb']:>8.0f} "
+                  f"{mean['pss_mb']:>8.0f} {mean['uss_mb']:>8.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compare Keras and NumPy autoencoder inference for parity and latency.
+
+Run from the ``ML & DB`` directory:
+
+    python benchmarks/bench_autoencoder.py --batch-sizes 1 64 10000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import generate_dataset
+from model import CyberSecurityDetectionSystem
+from numpy_autoencoder import NumpyAutoencoder
+
+def reconstruction_mse(X, reconstructed):
+    return np.mean(np.power(X - reconstructed, 2), axis=1)
+
+def best_of(func, X, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(X)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 64, 10_000])
+    parser.add_argument('--train-rows', type=int, default=20_000)
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--rtol', type=float, default=1e-3, help='float32 MSE parity tolerance')
+    parser.add_argument('--int8-rtol', type=float, default=5e-2, help='int8 MSE parity tolerance')
+    args = parser.parse_args()
+
+    system = CyberSecurityDetectionSystem(serving=False)
+    processed = system.preprocess_data(generate_dataset(args.train_rows))
+    X = system.scaler.fit_transform(processed.drop('Attack Type', axis=1))
+    autoencoder = system.build_autoencoder(X.shape[1])
+    autoencoder.fit(X, X, epochs=args.epochs, batch_size=32, verbose=0)
+
+    engines = {
+        'keras': lambda batch: autoencoder.predict(batch, verbose=0),
+        'numpy': NumpyAutoencoder.from_keras(autoencoder).predict,
+        'int8': NumpyAutoencoder.from_keras(autoencoder).quantize().predict,
+    }
+
+    expected = reconstruction_mse(X, engines['keras'](X))
+    for name, rtol in (('numpy', args.rtol), ('int8', args.int8_rtol)):
+        actual = reconstruction_mse(X, engines[name](X))
+        worst = float(np.max(np.abs(actual - expected) / np.maximum(expected, 1e-12)))
+        status = 'ok' if worst <= rtol else 'FAIL'
+        print(f"{name:>6} parity: max relative MSE error {worst:.2e} (tolerance {rtol:.0e}) {status}")
+        if status == 'FAIL':
+            sys.exit(1)
+
+    print(f"\n{'batch':>7}" + ''.join(f"{name + ' ms':>12}" for name in engines))
+    for batch_size in args.batch_sizes:
+        batch = X[np.arange(batch_size) % len(X)]
+        timings = [best_of(engine, batch, args.repeats) * 1000 for engine in engines.values()]
+        print(f"{batch_size:>7}" + ''.join(f"{ms:>12.3f}" for ms in timings))
+
+if __name__ == "__main__":
+    main()
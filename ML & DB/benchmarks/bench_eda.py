@@ -0,0 +1,71 @@
+"""Benchmark the one-pass EDA summary against building the figures from the full frame.
+
+Preprocesses a synthetic dataset, then times what perform_eda used to do
+before writing images (``df.corr()`` and plotly express over every row)
+against EdaSummary.from_frame plus building the figures from its saved
+form, and reports the size of each. The correlation matrices are checked to
+agree. Image export is left out: it needs kaleido and costs the same for
+both once the timeline is downsampled. Run from the ``ML & DB`` directory:
+
+    python benchmarks/bench_eda.py --rows 50000 200000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model
+from benchmarks.memory_mongo import InMemoryClient
+from benchmarks.synthetic import generate_dataset
+from eda import build_figures
+
+def full_frame_figures(df):
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    correlation = df.corr()
+    figures = {
+        'attack_distribution': px.pie(df, names='Attack Type'),
+        'severity_timeline': px.line(df, x='Timestamp', y='Attack Severity'),
+        'device_distribution': px.bar(df[['Device_Mobile', 'Device_Desktop', 'Device_Tablet']].sum()),
+        'browser_distribution': px.bar(df[['Browser_Chrome', 'Browser_Firefox', 'Browser_Safari']].sum()),
+        'correlation_heatmap': go.Figure(go.Heatmap(z=correlation, x=correlation.columns, y=correlation.columns)),
+    }
+    return correlation, figures
+
+def figure_bytes(figures):
+    return sum(len(figure.to_json()) for figure in figures.values())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[50_000, 200_000])
+    args = parser.parse_args()
+
+    model.MongoClient = InMemoryClient
+    system = model.CyberSecurityDetectionSystem(serving=False)
+    system.feature_columns = None
+    print(f"{'rows':>9} {'full s':>8} {'summary s':>10} {'full fig KB':>12} {'summary fig KB':>15} {'max |corr diff|':>16}")
+    for rows in args.rows:
+        df = system.preprocess_data(generate_dataset(rows))
+
+        start = time.perf_counter()
+        correlation, figures = full_frame_figures(df)
+        full_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        summary = system.eda_summary(df)
+        summary_figures = build_figures(json.loads(json.dumps(summary.to_dict())))
+        summary_seconds = time.perf_counter() - start
+
+        columns, matrix = summary.correlation()
+        difference = np.nanmax(np.abs(correlation.loc[columns, columns].to_numpy() - matrix))
+        print(f"{rows:>9} {full_seconds:>8.2f} {summary_seconds:>10.2f} {figure_bytes(figures) / 1024:>12.0f} "
+              f"{figure_bytes(summary_figures) / 1024:>15.0f} {difference:>16.1e}", flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Peak RSS of the detect and training-preparation paths, float32 vs float64 features.
+
+Each measurement runs in a fresh interpreter that builds a synthetic batch,
+resets the VmHWM high-water mark and then runs one stage:
+
+* ``detect``: preprocess, scale and score one batch with the saved models
+  (as ``/detect`` does, without storing alerts);
+* ``train``: preprocess a labeled batch and build the scaled train/test
+  matrices that train_models fits on.
+
+``--baseline`` points at another checkout's ``ML & DB`` directory (e.g. a
+``git worktree`` of an older commit) to measure the same stages there. Run
+from a directory containing the ``models/`` saved by save_models (Linux only):
+
+    python benchmarks/bench_memory.py --rows 100000 300000
+    python benchmarks/bench_memory.py --rows 300000 --baseline /tmp/before/"ML & DB"
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import gc, json, sys, time
+sys.path.insert(0, {model_dir!r})
+import model
+from benchmarks.memory_mongo import InMemoryClient
+from benchmarks.synthetic import generate_dataset
+
+def status(field):
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) / 1024 for line in f if line.startswith(field + ':'))
+
+model.MongoClient = InMemoryClient
+system = model.CyberSecurityDetectionSystem(serving=False)
+data = generate_dataset({rows})
+if {stage!r} == 'detect':
+    model.load_models(system)
+else:
+    system.feature_columns = None
+gc.collect()
+with open('/proc/self/clear_refs', 'w') as f:
+    f.write('5')
+start_rss = status('VmRSS')
+start = time.perf_counter()
+if {stage!r} == 'detect':
+    result = system._predict(data, serving=False)
+elif hasattr(system, '_training_matrices'):
+    result = system._training_matrices(system.preprocess_data(data))
+else:
+    # Checkouts from before the compact pipeline
+    from sklearn.model_selection import train_test_split
+    processed = system.preprocess_data(data)
+    X_train, X_test, y_train, y_test = train_test_split(processed.drop('Attack Type', axis=1),
+                                                        processed['Attack Type'], test_size=0.2, random_state=42)
+    result = system.scaler.fit_transform(X_train), system.scaler.transform(X_test)
+elapsed = time.perf_counter() - start
+print(json.dumps({{'peak_rss_mb': status('VmHWM'), 'delta_mb': status('VmHWM') - start_rss, 'seconds': elapsed}}))
+"""
+
+def probe(model_dir, stage, rows, env):
+    output = subprocess.run([sys.executable, '-c', PROBE.format(model_dir=model_dir, stage=stage, rows=rows)],
+                            capture_output=True, text=True, env={**os.environ, **env})
+    if output.returncode:
+        raise RuntimeError(output.stderr.strip().splitlines()[-1] if output.stderr.strip() else "probe failed")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000])
+    parser.add_argument('--stages', nargs='+', choices=['detect', 'train'], default=['detect', 'train'])
+    parser.add_argument('--baseline', help="another checkout's 'ML & DB' directory to measure as well")
+    parser.add_argument('--output', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    variants = [('float64', MODEL_DIR, {'COMPACT_FEATURES': '0'}), ('float32', MODEL_DIR, {'COMPACT_FEATURES': '1'})]
+    if args.baseline:
+        variants.insert(0, ('baseline', os.path.abspath(args.baseline), {}))
+    results = []
+    print(f"{'stage':<8} {'rows':>9} {'variant':<9} {'peak RSS MB':>12} {'delta MB':>9} {'seconds':>8}")
+    for stage in args.stages:
+        for rows in args.rows:
+            for name, model_dir, env in variants:
+                result = {'stage': stage, 'rows': rows, 'variant': name, **probe(model_dir, stage, rows, env)}
+                results.append(result)
+                print(f"{stage:<8} {rows:>9} {name:<9} {result['peak_rss_mb']:>12.0f} {result['delta_mb']:>9.0f} "
+                      f"{result['seconds']:>8.2f}", flush=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark preprocess_data against the original row-by-row implementation.
+
+The comparison times the encoding alone: preprocess_data is called without
+a feature store, as the legacy code had none. The behavioral window join
+that serving adds on top (behavior_features from an empty store) is timed
+in its own column. Run from the ``ML & DB`` directory:
+
+    python benchmarks/bench_preprocess.py --sizes 10000 1000000 10000000
+"""
+import argparse
+import ipaddress
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import generate_dataset
+from model import BEHAVIOR_FEATURES, CyberSecurityDetectionSystem, behavior_features, behavior_store
+
+def legacy_preprocess(df):
+    """The per-row preprocessing preprocess_data used before vectorization"""
+    df["Timestamp"] = pd.to_datetime(df['Timestamp'])
+    df["Timestamp"] = df["Timestamp"].astype('datetime64[ns]').astype(int) // 10**9
+    severity_mapping = {"Low": 1, "Medium": 2, "High": 3, "Critical": 4}
+    df["Attack Severity"] = df["Attack Severity"].map(severity_mapping)
+    df["Attack Severity"] = df["Attack Severity"].fillna(0)
+    df["Data Exfiltrated"] = df["Data Exfiltrated"].astype(int)
+    df["Source IP"] = [int(ipaddress.IPv4Address(ip)) for ip in df["Source IP"]]
+    df["Destination IP"] = [int(ipaddress.IPv4Address(ip)) for ip in df["Destination IP"]]
+    extracted_features = []
+    for ua in df["User Agent"]:
+        browser = "Unknown"
+        device = "Desktop"
+        if "Chrome" in ua:
+            browser = "Chrome"
+        elif "Safari" in ua and "Chrome" not in ua:
+            browser = "Safari"
+        elif "Firefox" in ua:
+            browser = "Firefox"
+        if "Android" in ua or "iPhone" in ua:
+            device = "Mobile"
+        elif "iPad" in ua:
+            device = "Tablet"
+        extracted_features.append((browser, device))
+    features_df = pd.DataFrame(extracted_features, columns=['Browser', 'Device'])
+    df['Browser_Chrome'] = (features_df['Browser'] == 'Chrome').astype(int)
+    df['Browser_Firefox'] = (features_df['Browser'] == 'Firefox').astype(int)
+    df['Browser_Safari'] = (features_df['Browser'] == 'Safari').astype(int)
+    df['Device_Mobile'] = (features_df['Device'] == 'Mobile').astype(int)
+    df['Device_Desktop'] = (features_df['Device'] == 'Desktop').astype(int)
+    df['Device_Tablet'] = (features_df['Device'] == 'Tablet').astype(int)
+    df.drop(columns=['User Agent'], inplace=True)
+    attack_type_mapping = {"Malware": 1, "Phishing": 2, "Insider Threat": 3,
+                           "Ransomware": 4, "DDoS": 5, "Unknown": 0}
+    df["Attack Type"] = df["Attack Type"].fillna("Unknown")
+    df["Attack Type"] = df["Attack Type"].apply(lambda x: attack_type_mapping.get(x, 0))
+    df.drop(columns=["Threat Intelligence", "Event ID"], inplace=True)
+    df = pd.get_dummies(df, columns=['Response Action'])
+    for col in ['Response Action_Blocked', 'Response Action_Contained',
+                'Response Action_Eradicated', 'Response Action_Recovered',
+                'Response Action_Monitor']:
+        if col not in df.columns:
+            df[col] = 0
+    return df
+
+def same_values(result, expected):
+    """Whether the frames hold the same values; preprocess_data stores them in narrower dtypes"""
+    try:
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    except AssertionError:
+        return False
+    return True
+
+def timed(func, df):
+    start = time.perf_counter()
+    result = func(df)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument('--legacy-max-rows', type=int, default=1_000_000,
+                        help='skip the slow reference implementation above this size')
+    args = parser.parse_args()
+
+    system = CyberSecurityDetectionSystem(serving=False)
+    print(f"{'rows':>12} {'vectorized s':>14} {'legacy s':>10} {'speedup':>9}  {'identical':>9} {'behavior s':>11}")
+    for n_rows in args.sizes:
+        df = generate_dataset(n_rows)
+        result, fast = timed(system.preprocess_data, df.copy())
+        behavior = (f"{timed(lambda frame: behavior_features(behavior_store(), frame), df)[1]:>11.3f}"
+                    if BEHAVIOR_FEATURES else f"{'-':>11}")
+        if n_rows > args.legacy_max_rows:
+            print(f"{n_rows:>12} {fast:>14.3f} {'-':>10} {'-':>9}  {'-':>9} {behavior}")
+            continue
+        expected, slow = timed(legacy_preprocess, df.copy())
+        # The derived IP feature columns have no legacy counterpart
+        identical = same_values(result[expected.columns], expected)
+        print(f"{n_rows:>12} {fast:>14.3f} {slow:>10.3f} {slow / fast:>8.1f}x  {str(identical):>9} {behavior}")
+
+if __name__ == "__main__":
+    main()
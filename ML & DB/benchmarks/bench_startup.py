@@ -0,0 +1,69 @@
+"""Measure import time and peak RSS of the serve and train startup paths.
+
+Each mode runs in a fresh interpreter. Run from a directory containing the
+``models/`` saved by save_models (serve mode loads them):
+
+    python benchmarks/bench_startup.py --repeats 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['tensorflow', 'plotly', 'lightgbm', 'sklearn.ensemble', 'sklearn.model_selection']
+
+MODES = {
+    # Import the service module and load saved models, as the /detect workers do
+    'serve': """
+import model
+system = model.CyberSecurityDetectionSystem()
+loaded = model.load_models(system)
+""",
+    # Additionally pull in everything the training and EDA paths import
+    'train': """
+import model
+system = model.CyberSecurityDetectionSystem(serving=False)
+system.build_autoencoder(16)
+import lightgbm, plotly.express, plotly.graph_objects
+import sklearn.ensemble, sklearn.model_selection
+loaded = True
+""",
+}
+
+PROBE = """
+import json, resource, sys, time
+sys.path.insert(0, {model_dir!r})
+start = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': elapsed,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'models_loaded': loaded,
+    'heavy_modules': [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+def run(mode):
+    code = PROBE.format(model_dir=MODEL_DIR, body=MODES[mode], heavy=HEAVY_MODULES)
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL='3')
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'mode':>6} {'best s':>8} {'max RSS MB':>11}  models  heavy modules loaded")
+    for mode in args.modes:
+        results = [run(mode) for _ in range(args.repeats)]
+        best = min(results, key=lambda result: result['seconds'])
+        print(f"{mode:>6} {best['seconds']:>8.2f} {best['max_rss_mb']:>11.0f}  {str(best['models_loaded']):>6}  "
+              f"{', '.join(best['heavy_modules']) or '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark the compiled tree ensembles against LightGBM's and sklearn's own predict.
+
+Fits LightGBM (with the service's parameters) and an Isolation Forest on
+synthetic training data, compiles both into node arrays, checks that the
+predictions are identical, and times every engine across batch sizes.
+Run from the ``ML & DB`` directory:
+
+    python benchmarks/bench_trees.py --sizes 1 10 100 1000 10000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model
+from benchmarks.memory_mongo import InMemoryClient
+from benchmarks.synthetic import generate_dataset
+from tree_ensemble import CompiledIsolationForest, CompiledLightGBM
+
+def best_time(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    import lightgbm as lgb
+    from sklearn.ensemble import IsolationForest
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--train-rows', type=int, default=20_000)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 1000, 10000])
+    parser.add_argument('--repeats', type=int, default=10)
+    args = parser.parse_args()
+
+    model.MongoClient = InMemoryClient
+    system = model.CyberSecurityDetectionSystem(serving=False)
+    X_train, _, y_train, _ = system._training_matrices(system.preprocess_data(generate_dataset(args.train_rows)))
+    booster = lgb.train({**model.LGBM_PARAMS, 'num_threads': model.TRAINING_THREADS},
+                        lgb.Dataset(X_train, label=y_train), num_boost_round=100)
+    forest = IsolationForest(contamination=0.1, random_state=42).fit(X_train)
+    compiled_booster = CompiledLightGBM.from_booster(booster)
+    compiled_forest = CompiledIsolationForest.from_sklearn(forest)
+    print(f"LightGBM: {compiled_booster.num_trees} trees, depth {compiled_booster._walker.depth}; "
+          f"Isolation Forest: {compiled_forest.n_estimators} trees, depth {compiled_forest._walker.depth}")
+
+    X = system._scale(system.preprocess_data(generate_dataset(max(args.sizes), seed=7)))
+    assert np.array_equal(booster.predict(X, num_threads=model.LGBM_PREDICT_THREADS), compiled_booster.predict(X))
+    assert np.array_equal(forest.predict(X), compiled_forest.predict(X))
+    print("Compiled predictions are identical to the native ones")
+
+    engines = {
+        'lightgbm': lambda batch: booster.predict(batch, num_threads=model.LGBM_PREDICT_THREADS),
+        'lightgbm_compiled': compiled_booster.predict,
+        'iforest': forest.predict,
+        'iforest_compiled': compiled_forest.predict,
+    }
+    print(f"{'rows':>7} " + " ".join(f"{name + ' ms':>22}" for name in engines))
+    for rows in args.sizes:
+        batch = X[:rows]
+        timings = [best_time(lambda: predict(batch), args.repeats) * 1000 for predict in engines.values()]
+        print(f"{rows:>7} " + " ".join(f"{ms:>22.3f}" for ms in timings), flush=True)
+
+if __name__ == '__main__':
+    main()
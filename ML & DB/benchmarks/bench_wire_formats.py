@@ -0,0 +1,71 @@
+"""Compare the cost of turning a /detect request body into a DataFrame per wire format.
+
+Each format's body is built once from the same synthetic records; the
+timed part is what /detect does with it: decode, then records_frame. Run
+from the ``ML & DB`` directory:
+
+    python benchmarks/bench_wire_formats.py --sizes 10 1000 100000
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import generate_dataset
+from model import records_frame
+from wire_formats import ARROW, MSGPACK, PARQUET, decode
+
+def encode_bodies(data):
+    import msgpack
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+
+    records = json.loads(data.to_json(orient='records'))
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    arrow = io.BytesIO()
+    with ipc.new_stream(arrow, table.schema) as writer:
+        writer.write_table(table)
+    parquet = io.BytesIO()
+    pq.write_table(table, parquet)
+    return {
+        'json': json.dumps(records).encode(),
+        MSGPACK: msgpack.packb(records),
+        ARROW: arrow.getvalue(),
+        PARQUET: parquet.getvalue(),
+    }
+
+def to_frame(body, format_name):
+    data = json.loads(body) if format_name == 'json' else decode(body, format_name)
+    return records_frame(data)
+
+def best_of(function, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 100000])
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'format':>8} {'body KB':>10} {'decode ms':>10} {'us/row':>8} {'vs json':>8}")
+    for size in args.sizes:
+        data = generate_dataset(size).drop(columns=['Attack Type', 'Event ID', 'Threat Intelligence'])
+        baseline = None
+        for format_name, body in encode_bodies(data).items():
+            elapsed = best_of(lambda: to_frame(body, format_name), args.repeats)
+            baseline = baseline or elapsed
+            print(f"{size:>8} {format_name:>8} {len(body) / 1024:>10.1f} {elapsed * 1000:>10.2f} "
+                  f"{elapsed / size * 1e6:>8.2f} {baseline / elapsed:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
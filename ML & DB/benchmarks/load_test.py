@@ -0,0 +1,107 @@
+"""Measure /detect throughput of serve.py as the worker count grows.
+
+For each worker count a fresh pre-fork server is started, hammered by
+concurrent client processes (each with its own keep-alive session) for a
+fixed duration, then stopped. Run from a directory containing the
+``models/`` saved by save_models:
+
+    python benchmarks/load_test.py --workers 1 2 4 --clients 16 --seconds 10
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import requests
+
+MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MODEL_DIR)
+
+from benchmarks.synthetic import generate_dataset
+
+def payloads(rows, count, seed=0):
+    data = generate_dataset(rows * count, seed=seed)
+    data = data.drop(columns=['Event ID', 'Threat Intelligence'])
+    records = json.loads(data.to_json(orient='records'))
+    return [records[i * rows:(i + 1) * rows] for i in range(count)]
+
+def client(url, bodies, deadline, results):
+    session = requests.Session()
+    latencies, errors = [], 0
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = session.post(url, json=bodies[i % len(bodies)])
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors += 1
+        i += 1
+    results.put((latencies, errors))
+
+def wait_ready(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start within {timeout}s")
+
+def run(workers, args, bodies):
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL='3')
+    server = subprocess.Popen([sys.executable, os.path.join(MODEL_DIR, 'serve.py'), '--workers', str(workers),
+                               '--port', str(args.port), '--reload-interval', '0'],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_ready(f"{base}/detect/stats")
+        # Warm every worker before timing
+        for body in bodies[:workers * 4]:
+            requests.post(f"{base}/detect", json=body)
+        results = multiprocessing.Queue()
+        deadline = time.perf_counter() + args.seconds
+        clients = [multiprocessing.Process(target=client, args=(f"{base}/detect", bodies, deadline, results))
+                   for _ in range(args.clients)]
+        for process in clients:
+            process.start()
+        collected = [results.get() for _ in clients]
+        for process in clients:
+            process.join()
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+    latencies = sorted(latency for worker_latencies, _ in collected for latency in worker_latencies)
+    errors = sum(worker_errors for _, worker_errors in collected)
+    return {
+        'requests_per_second': len(latencies) / args.seconds,
+        'p50_ms': latencies[len(latencies) // 2] * 1000 if latencies else None,
+        'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000 if latencies else None,
+        'errors': errors
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--rows', type=int, default=1, help='records per request')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    bodies = payloads(args.rows, 256)
+    print(f"{'workers':>7} {'req/s':>9} {'scaling':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    baseline = None
+    for workers in args.workers:
+        result = run(workers, args, bodies)
+        baseline = baseline or result['requests_per_second']
+        print(f"{workers:>7} {result['requests_per_second']:>9.1f} {result['requests_per_second'] / baseline:>7.2f}x "
+              f"{result['p50_ms'] or 0:>8.1f} {result['p99_ms'] or 0:>8.1f} {result['errors']:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""In-memory stand-in for the parts of pymongo the service uses.
+
+Benchmarks swap it in for MongoClient so timings do not depend on a running
+database. Filters support equality, the $gt/$gte/$lt/$lte/$ne/$in operators
+on top-level fields and $and/$or, and updates support $inc (with upsert),
+which covers the service's queries.
+"""
+import copy
+import threading
+
+from bson import ObjectId
+
+OPERATORS = {
+    '$gt': lambda value, operand: value is not None and value > operand,
+    '$gte': lambda value, operand: value is not None and value >= operand,
+    '$lt': lambda value, operand: value is not None and value < operand,
+    '$lte': lambda value, operand: value is not None and value <= operand,
+    '$ne': lambda value, operand: value != operand,
+    '$in': lambda value, operand: value in operand,
+}
+
+def _matches(document, query):
+    for field, condition in (query or {}).items():
+        if field == '$and':
+            if not all(_matches(document, clause) for clause in condition):
+                return False
+            continue
+        if field == '$or':
+            if not any(_matches(document, clause) for clause in condition):
+                return False
+            continue
+        value = document.get(field)
+        if isinstance(condition, dict) and condition and all(key.startswith('$') for key in condition):
+            if not all(OPERATORS[op](value, operand) for op, operand in condition.items()):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+class InMemoryCursor:
+    def __init__(self, documents):
+        self._documents = documents
+        self._sort = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction=1):
+        self._sort = list(key) if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def skip(self, count):
+        self._skip = count
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def __iter__(self):
+        documents = self._documents
+        # Stable sorts applied last key first give the compound ordering
+        for key, direction in reversed(self._sort):
+            documents = sorted(documents, key=lambda document: document.get(key), reverse=direction < 0)
+        documents = documents[self._skip:]
+        if self._limit:
+            documents = documents[:self._limit]
+        return iter(copy.deepcopy(documents))
+
+class InMemoryCollection:
+    def __init__(self, name="alerts"):
+        self.name = name
+        self.documents = []
+        self.indexes = []
+        self._lock = threading.Lock()
+
+    def insert_one(self, document):
+        self.insert_many([document])
+
+    def insert_many(self, documents, ordered=True):
+        with self._lock:
+            for document in documents:
+                document.setdefault('_id', ObjectId())
+                self.documents.append(copy.deepcopy(document))
+
+    def update_one(self, query, update, upsert=False):
+        with self._lock:
+            document = next((document for document in self.documents if _matches(document, query)), None)
+            if document is None:
+                if not upsert:
+                    return
+                document = {field: value for field, value in query.items() if not field.startswith('$')}
+                document.setdefault('_id', ObjectId())
+                self.documents.append(document)
+            for path, amount in update.get('$inc', {}).items():
+                *parents, field = path.split('.')
+                target = document
+                for parent in parents:
+                    target = target.setdefault(parent, {})
+                target[field] = target.get(field, 0) + amount
+
+    def bulk_write(self, requests, ordered=True):
+        for request in requests:
+            self.update_one(request._filter, request._doc, upsert=request._upsert)
+
+    def find(self, query=None, projection=None):
+        with self._lock:
+            documents = [document for document in self.documents if _matches(document, query)]
+        if projection:
+            keep = {field for field, include in projection.items() if include} | {'_id'}
+            documents = [{field: value for field, value in document.items() if field in keep}
+                         for document in documents]
+        return InMemoryCursor(documents)
+
+    def count_documents(self, query):
+        with self._lock:
+            return sum(1 for document in self.documents if _matches(document, query))
+
+    def delete_many(self, query):
+        with self._lock:
+            self.documents = [document for document in self.documents if not _matches(document, query)]
+
+    def create_index(self, keys, **kwargs):
+        self.indexes.append((keys, kwargs))
+
+class InMemoryDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, InMemoryCollection(name))
+
+class InMemoryClient:
+    """Drop-in for MongoClient(uri, ...); databases live as long as the client"""
+
+    def __init__(self, uri=None, **kwargs):
+        self.databases = {}
+
+    def __getitem__(self, name):
+        return self.databases.setdefault(name, InMemoryDatabase())
+
+    def close(self):
+        pass
@@ -0,0 +1,204 @@
+"""Time and memory benchmarks for the training and scoring pipeline.
+
+Runs every stage on synthetic data of several sizes with MongoDB replaced by
+an in-memory stand-in, and writes the results as JSON. Scoring is broken
+down into the scaler, each model and the alert assembly, next to the end-to-end
+detect_anomalies call. Two result files can be compared to catch regressions.
+Run from the ``ML & DB`` directory:
+
+    python benchmarks/suite.py run --sizes 1000 10000 100000 --output output/bench-new.json
+    python benchmarks/suite.py compare output/bench-old.json output/bench-new.json --tolerance 0.1
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MODEL_DIR)
+
+import numpy as np
+
+import model
+from benchmarks.memory_mongo import InMemoryClient
+from benchmarks.synthetic import generate_dataset
+
+def _peak_rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return None
+
+def _reset_peak_rss():
+    # Writing 5 resets the VmHWM high-water mark (Linux >= 4.0)
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def measure(stage, rows, fn, setup=None, repeats=3):
+    """Best wall time over repeats, then one traced run for peak memory.
+
+    setup() runs before every call, untimed, and returns fn's arguments.
+    """
+    setup = setup or (lambda: ())
+    times = []
+    for _ in range(repeats):
+        args = setup()
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+
+    args = setup()
+    rss_tracked = _reset_peak_rss()
+    tracemalloc.start()
+    fn(*args)
+    _, peak_alloc = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    seconds = min(times)
+    return {
+        'stage': stage,
+        'rows': rows,
+        'seconds': seconds,
+        'median_seconds': float(np.median(times)),
+        'rows_per_second': rows / seconds if seconds else None,
+        # Python and NumPy allocations only; native allocations show up in peak_rss_mb
+        'peak_alloc_mb': peak_alloc / 2**20,
+        'peak_rss_mb': _peak_rss_mb() if rss_tracked else None
+    }
+
+def _scoring_stages(system, data, rows, repeats):
+    feature_data = system.preprocess_data(data.copy(), model.behavior_store())[system.feature_columns]
+    scaled = system._scale(feature_data)
+    # The engines detect_anomalies scores with, as picked by TREE_ENGINE
+    lgbm_predictions = system._lgbm_predict(scaled)
+    if_predictions = system._forest_predict(scaled)
+    ae_mse = system._reconstruction_error(scaled)
+    threshold = system._autoencoder_threshold(ae_mse)
+    return [
+        measure('detect.scale', rows, lambda: system._scale(feature_data), repeats=repeats),
+        measure('detect.lightgbm', rows, lambda: system._lgbm_predict(scaled), repeats=repeats),
+        measure('detect.isolation_forest', rows, lambda: system._forest_predict(scaled), repeats=repeats),
+        measure('detect.autoencoder', rows, lambda: system._reconstruction_error(scaled), repeats=repeats),
+        measure('detect.alerts', rows,
+                lambda: system._build_alerts(data, lgbm_predictions, if_predictions, ae_mse, threshold),
+                repeats=repeats),
+        measure('detect.total', rows, lambda: system.detect_anomalies(data), repeats=repeats),
+    ]
+
+def run(args):
+    model.MongoClient = InMemoryClient
+    # Repeated runs over the same rows would otherwise be answered from the score cache
+    model.SCORE_CACHE_MB = 0
+    output = os.path.abspath(args.output)
+    workdir = tempfile.mkdtemp(prefix="bench-suite-")
+    os.chdir(workdir)
+    results = []
+
+    for rows in args.train_sizes:
+        processed = model.CyberSecurityDetectionSystem(serving=False).preprocess_data(
+            generate_dataset(rows, seed=args.seed), model.behavior_store())
+
+        def fresh_system():
+            return (model.CyberSecurityDetectionSystem(serving=False), processed)
+
+        results.append(measure('train_models', rows, lambda s, df: s.train_models(df), setup=fresh_system,
+                               repeats=args.train_repeats))
+        print(json.dumps(results[-1]), flush=True)
+    # Score with models trained on the largest training size
+    system = model.CyberSecurityDetectionSystem(serving=False)
+    system.train_models(processed)
+
+    results.append(measure('save_models', max(args.train_sizes), lambda: model.save_models(system),
+                           repeats=args.repeats))
+    results.append(measure('load_models', max(args.train_sizes),
+                           lambda: model.load_models(model.CyberSecurityDetectionSystem(serving=False)), repeats=args.repeats))
+    print(json.dumps(results[-2]), json.dumps(results[-1]), sep='\n', flush=True)
+
+    for rows in args.sizes:
+        data = generate_dataset(rows, seed=args.seed + 1)
+        # Serving joins behavioral features from the window; each repeat starts an empty one
+        stage_results = [measure('preprocess_data', rows, system.preprocess_data,
+                                 setup=lambda: (data.copy(), model.behavior_store()), repeats=args.repeats)]
+        stage_results += _scoring_stages(system, data, rows, args.repeats)
+        for result in stage_results:
+            print(json.dumps(result), flush=True)
+        results += stage_results
+    system.shutdown()
+
+    report = {
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'packages': {name: __import__(name).__version__ for name in ('numpy', 'pandas', 'sklearn', 'lightgbm')},
+            'autoencoder_engine': model.AUTOENCODER_ENGINE
+        },
+        'results': results
+    }
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {output}")
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = {(r['stage'], r['rows']): r for r in json.load(f)['results']}
+    with open(args.candidate) as f:
+        candidate = {(r['stage'], r['rows']): r for r in json.load(f)['results']}
+
+    regressions = []
+    print(f"{'stage':>24} {'rows':>9} {'base s':>9} {'new s':>9} {'time':>7} {'base MB':>8} {'new MB':>8}")
+    for key in sorted(baseline.keys() & candidate.keys()):
+        old, new = baseline[key], candidate[key]
+        time_ratio = new['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        memory_ratio = new['peak_alloc_mb'] / old['peak_alloc_mb'] if old['peak_alloc_mb'] else 1.0
+        flag = ''
+        if time_ratio > 1 + args.tolerance or memory_ratio > 1 + args.tolerance:
+            regressions.append(key)
+            flag = '  REGRESSION'
+        print(f"{key[0]:>24} {key[1]:>9} {old['seconds']:>9.4f} {new['seconds']:>9.4f} {time_ratio:>6.2f}x "
+              f"{old['peak_alloc_mb']:>8.1f} {new['peak_alloc_mb']:>8.1f}{flag}")
+    for key in sorted(baseline.keys() ^ candidate.keys()):
+        print(f"{key[0]:>24} {key[1]:>9}  only in {'baseline' if key in baseline else 'candidate'}")
+    if regressions:
+        print(f"{len(regressions)} stages regressed by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks and write a JSON report')
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                            help='rows for preprocessing and scoring')
+    run_parser.add_argument('--train-sizes', type=int, nargs='+', default=[1_000, 10_000],
+                            help='rows for training; the largest also trains the models that are scored')
+    run_parser.add_argument('--repeats', type=int, default=3)
+    run_parser.add_argument('--train-repeats', type=int, default=1)
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--output', default=os.path.join(
+        MODEL_DIR, 'output', f"bench-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json"))
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser('compare', help='compare two JSON reports')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--tolerance', type=float, default=0.10,
+                                help='relative slowdown or memory growth reported as a regression')
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
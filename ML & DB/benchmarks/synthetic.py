@@ -0,0 +1,51 @@
+"""Synthetic data shaped like cybersecurity_dataset.csv for benchmarks"""
+import numpy as np
+import pandas as pd
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile Safari/604.1",
+    "Mozilla/5.0 (iPad; CPU OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Mobile Safari/537.36",
+    "curl/8.4.0",
+    "Unknown",
+]
+ATTACK_TYPES = ["Malware", "Phishing", "Insider Threat", "Ransomware", "DDoS"]
+SEVERITIES = ["Low", "Medium", "High", "Critical"]
+RESPONSE_ACTIONS = ["Blocked", "Contained", "Eradicated", "Recovered"]
+THREAT_INTELLIGENCE = ["Known Threat", "Unknown Threat", "Suspected Threat"]
+
+def _random_ips(rng, n):
+    octets = rng.integers(1, 255, size=(n, 4))
+    return np.array(['.'.join(map(str, row)) for row in octets], dtype=object)
+
+def generate_dataset(n_rows, seed=42, n_hosts=50_000, n_timestamps=100_000):
+    """Build a DataFrame with the columns and value domains of the training export.
+
+    IPs and timestamps are drawn from fixed-size pools so generating millions
+    of rows stays cheap while still giving realistic repetition.
+    """
+    rng = np.random.default_rng(seed)
+    hosts = _random_ips(rng, n_hosts)
+    start = pd.Timestamp("2023-01-01").value // 10**9
+    seconds = np.sort(rng.integers(start, start + 365 * 86400, size=n_timestamps))
+    timestamps = pd.to_datetime(seconds, unit='s').strftime('%Y-%m-%d %H:%M:%S').to_numpy(dtype=object)
+
+    def pick(values):
+        values = np.asarray(values, dtype=object)
+        return values[rng.integers(0, len(values), size=n_rows)]
+
+    return pd.DataFrame({
+        'Event ID': np.arange(1, n_rows + 1),
+        'Timestamp': pick(timestamps),
+        'Source IP': pick(hosts),
+        'Destination IP': pick(hosts),
+        'User Agent': pick(USER_AGENTS),
+        'Attack Type': pick(ATTACK_TYPES),
+        'Attack Severity': pick(SEVERITIES),
+        'Data Exfiltrated': rng.random(n_rows) < 0.3,
+        'Threat Intelligence': pick(THREAT_INTELLIGENCE),
+        'Response Action': pick(RESPONSE_ACTIONS),
+    })
@@ -0,0 +1,123 @@
+"""Incremental readers for /detect/bulk request bodies.
+
+Records are pulled off the request stream as they arrive, so a bulk upload
+is scored chunk by chunk without ever holding the whole body. Both
+newline-delimited JSON (one record per line) and a single JSON array are
+accepted.
+"""
+import codecs
+import json
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/ndjson')
+READ_SIZE = 1 << 16
+
+def _read_text(stream):
+    """Decode a byte stream into text blocks, keeping split UTF-8 sequences intact"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    while True:
+        block = stream.read(READ_SIZE)
+        text = decoder.decode(block, final=not block)
+        if text:
+            yield text
+        if not block:
+            return
+
+def iter_ndjson(stream):
+    buffer = ''
+    line_number = 0
+    for text in _read_text(stream):
+        buffer += text
+        *lines, buffer = buffer.split('\n')
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield _decode(line, line_number)
+    if buffer.strip():
+        yield _decode(buffer, line_number + 1)
+
+def _decode(line, line_number):
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON on line {line_number}: {e.msg}")
+
+def iter_json_array(stream):
+    """Yield the elements of a top-level JSON array (or a single object) one at a time"""
+    decoder = json.JSONDecoder()
+    chunks = _read_text(stream)
+    buffer, position, exhausted = '', 0, False
+
+    def fill():
+        nonlocal buffer, position, exhausted
+        text = next(chunks, None)
+        if text is None:
+            exhausted = True
+            return False
+        buffer = buffer[position:] + text
+        position = 0
+        return True
+
+    def skip_whitespace():
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer) or not fill():
+                return
+
+    skip_whitespace()
+    if position >= len(buffer):
+        return
+    if buffer[position] != '[':
+        # A lone record, as /detect accepts
+        while fill():
+            pass
+        yield _decode(buffer[position:], 1)
+        return
+    position += 1
+    expect_value = True
+    while True:
+        skip_whitespace()
+        if position >= len(buffer):
+            raise ValueError("Unterminated JSON array")
+        if buffer[position] == ']':
+            return
+        if not expect_value:
+            if buffer[position] != ',':
+                raise ValueError(f"Expected ',' or ']' in JSON array, found {buffer[position]!r}")
+            position += 1
+            expect_value = True
+            continue
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                # Most likely the element continues in the next block
+                if exhausted or not fill():
+                    raise ValueError(f"Invalid JSON array element: {e.msg}")
+                continue
+            # A number at the end of the buffer may still be incomplete
+            if end == len(buffer) and not exhausted and fill():
+                continue
+            break
+        position = end
+        expect_value = False
+        yield value
+
+def iter_records(stream, content_type):
+    if (content_type or '').split(';')[0].strip().lower() in NDJSON_TYPES:
+        return iter_ndjson(stream)
+    return iter_json_array(stream)
+
+def chunked(records, size):
+    """Yield ``(start_index, records)`` lists of up to ``size`` records"""
+    chunk, start = [], 0
+    for index, record in enumerate(records):
+        if not chunk:
+            start = index
+        chunk.append(record)
+        if len(chunk) == size:
+            yield start, chunk
+            chunk = []
+    if chunk:
+        yield start, chunk
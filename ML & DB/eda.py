@@ -0,0 +1,271 @@
+"""Exploratory data analysis from streaming aggregates.
+
+EdaSummary folds processed frames in one chunk at a time and keeps only
+aggregates: attack type, severity, device and browser counts, the running
+mean and co-moment matrix the correlation heatmap is computed from (Chan et
+al.'s pairwise update), and a severity timeline in time buckets that double
+in width whenever there are more than ``2 * max_points`` of them. Memory is
+independent of the number of rows, and streaming training feeds every chunk
+it reads.
+
+Figures are rendered from a saved summary, usually by a detached
+``python eda.py render <directory>`` process, into
+``output/eda/<fingerprint>/``, then copied to the ``output/*.png`` names.
+The fingerprint identifies the dataset (file identity, rows, feature
+columns), so retraining on an unchanged dataset reuses the figures already
+rendered.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+
+EDA_FORMAT = 1
+EDA_ROOT = os.path.join("output", "eda")
+SUMMARY = "summary.json"
+STATUS = "status.json"
+PENDING, RENDERING, READY, FAILED = 'pending', 'rendering', 'ready', 'failed'
+# Figure name -> file, under the EDA directory and (as published) under output/
+FIGURES = {
+    'attack_distribution': 'attack_distribution.png',
+    'severity_timeline': 'attack_severity_timeline.png',
+    'device_distribution': 'device_type_distribution.png',
+    'browser_distribution': 'browser_distribution.png',
+    'correlation_heatmap': 'feature_correlation_heatmap.png',
+}
+DEVICE_COLUMNS = ['Device_Mobile', 'Device_Desktop', 'Device_Tablet']
+BROWSER_COLUMNS = ['Browser_Chrome', 'Browser_Firefox', 'Browser_Safari']
+
+def _counts(values):
+    codes, counts = np.unique(np.asarray(values), return_counts=True)
+    return {str(code): int(count) for code, count in zip(codes.tolist(), counts.tolist())}
+
+def _add_counts(total, counts):
+    for key, count in counts.items():
+        total[key] = total.get(key, 0) + count
+
+class EdaSummary:
+    def __init__(self, attack_type_names=None, max_points=500, bucket_seconds=60):
+        self.attack_type_names = {str(code): name for code, name in (attack_type_names or {}).items()}
+        self.max_points = max_points
+        self.bucket_seconds = bucket_seconds
+        self.rows = 0
+        self.attack_types = {}
+        self.severities = {}
+        self.devices = dict.fromkeys(DEVICE_COLUMNS, 0)
+        self.browsers = dict.fromkeys(BROWSER_COLUMNS, 0)
+        self.columns = None
+        self.mean = None
+        self.comoment = None
+        # Sorted bucket indexes and, per bucket, event count, severity sum and max severity
+        self.buckets = np.empty(0, dtype=np.int64)
+        self.events = np.empty(0, dtype=np.int64)
+        self.severity_sums = np.empty(0)
+        self.severity_peaks = np.empty(0)
+
+    @classmethod
+    def from_frame(cls, df, block_rows=65536, **kwargs):
+        summary = cls(**kwargs)
+        for start in range(0, len(df), block_rows):
+            summary.update(df.iloc[start:start + block_rows])
+        return summary
+
+    def update(self, df):
+        """Fold in one processed chunk"""
+        if not len(df):
+            return
+        if 'Attack Type' in df.columns:
+            _add_counts(self.attack_types, _counts(df['Attack Type']))
+        _add_counts(self.severities, _counts(df['Attack Severity']))
+        for totals in (self.devices, self.browsers):
+            for col in totals:
+                if col in df.columns:
+                    totals[col] += int(df[col].sum())
+        self._update_moments(df)
+        self._update_timeline(df['Timestamp'].to_numpy(dtype=np.int64),
+                              df['Attack Severity'].to_numpy(dtype=np.float64))
+        self.rows += len(df)
+
+    def _update_moments(self, df):
+        if self.columns is None:
+            self.columns = df.columns.tolist()
+            self.mean = np.zeros(len(self.columns))
+            self.comoment = np.zeros((len(self.columns), len(self.columns)))
+        seen = self.rows
+        X = df.reindex(columns=self.columns, fill_value=0).to_numpy(dtype=np.float64)
+        block_mean = X.mean(axis=0)
+        centered = X - block_mean
+        delta = block_mean - self.mean
+        total = seen + len(X)
+        self.comoment += centered.T @ centered + np.outer(delta, delta) * (seen * len(X) / total)
+        self.mean += delta * (len(X) / total)
+
+    def _update_timeline(self, timestamps, severities):
+        self._merge_buckets(np.concatenate([self.buckets, timestamps // self.bucket_seconds]),
+                            np.concatenate([self.events, np.ones(len(timestamps), dtype=np.int64)]),
+                            np.concatenate([self.severity_sums, severities]),
+                            np.concatenate([self.severity_peaks, severities]))
+        while len(self.buckets) > 2 * self.max_points:
+            self._coarsen()
+
+    def _merge_buckets(self, buckets, events, sums, peaks):
+        self.buckets, inverse = np.unique(buckets, return_inverse=True)
+        self.events = np.bincount(inverse, weights=events, minlength=len(self.buckets)).astype(np.int64)
+        self.severity_sums = np.bincount(inverse, weights=sums, minlength=len(self.buckets))
+        self.severity_peaks = np.full(len(self.buckets), -np.inf)
+        np.maximum.at(self.severity_peaks, inverse, peaks)
+
+    def _coarsen(self, factor=2):
+        """Merge every ``factor`` adjacent time buckets into one"""
+        self._merge_buckets(self.buckets // factor, self.events, self.severity_sums, self.severity_peaks)
+        self.bucket_seconds *= factor
+
+    def correlation(self):
+        """``(columns, matrix)`` as DataFrame.corr() computes it; NaN for constant columns"""
+        if self.columns is None:
+            return [], np.empty((0, 0))
+        std = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            matrix = self.comoment / np.outer(std, std)
+        return self.columns, np.clip(matrix, -1, 1)
+
+    def timeline_points(self):
+        """``[(bucket start, events, mean severity, max severity)]`` with at most max_points buckets"""
+        while len(self.buckets) > self.max_points:
+            self._coarsen()
+        return [(datetime.datetime.fromtimestamp(bucket * self.bucket_seconds, datetime.timezone.utc), count,
+                 total / count, peak)
+                for bucket, count, total, peak in zip(self.buckets.tolist(), self.events.tolist(),
+                                                      self.severity_sums.tolist(), self.severity_peaks.tolist())]
+
+    def to_dict(self):
+        columns, correlation = self.correlation()
+        return {
+            'format': EDA_FORMAT,
+            'rows': self.rows,
+            'attack_type_names': self.attack_type_names,
+            'attack_types': self.attack_types,
+            'severities': self.severities,
+            'devices': self.devices,
+            'browsers': self.browsers,
+            'columns': columns,
+            # JSON has no NaN; constant columns are stored as null
+            'correlation': [[None if np.isnan(value) else value for value in row] for row in correlation.tolist()],
+            'bucket_seconds': self.bucket_seconds,
+            'timeline': [[start.isoformat(), count, mean, peak] for start, count, mean, peak in self.timeline_points()],
+        }
+
+def fingerprint(path, *extra):
+    """Identity of a dataset file (path, size, mtime) plus whatever else shapes the summary"""
+    stat = os.stat(path)
+    identity = [EDA_FORMAT, os.path.abspath(path), stat.st_size, stat.st_mtime_ns, *extra]
+    return hashlib.sha1(json.dumps(identity, default=str).encode()).hexdigest()[:16]
+
+def summary_directory(key, root=EDA_ROOT):
+    return os.path.join(root, key)
+
+def _write_json(path, data):
+    temporary = f"{path}.tmp-{os.getpid()}"
+    with open(temporary, "w") as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(temporary, path)
+
+def status(directory):
+    try:
+        with open(os.path.join(directory, STATUS)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def figures_ready(directory):
+    current = status(directory)
+    return (current is not None and current.get('status') == READY
+            and all(os.path.exists(os.path.join(directory, name)) for name in FIGURES.values()))
+
+def save_summary(summary, directory):
+    """Write a summary for rendering; returns the directory"""
+    os.makedirs(directory, exist_ok=True)
+    _write_json(os.path.join(directory, SUMMARY), summary.to_dict())
+    _write_json(os.path.join(directory, STATUS), {'status': PENDING, 'rows': summary.rows})
+    return directory
+
+def build_figures(data):
+    """Plotly figures from a saved summary dict"""
+    import plotly.graph_objects as go
+
+    names = data['attack_type_names']
+    attack_types = data['attack_types']
+    timeline = data['timeline']
+    figures = {
+        'attack_distribution': go.Figure(go.Pie(labels=[names.get(code, code) for code in attack_types],
+                                                values=list(attack_types.values())))
+            .update_layout(title='Distribution of Attack Types'),
+        'severity_timeline': go.Figure([
+            go.Scatter(x=[point[0] for point in timeline], y=[point[2] for point in timeline], name='mean'),
+            go.Scatter(x=[point[0] for point in timeline], y=[point[3] for point in timeline], name='max',
+                       line={'dash': 'dot'}),
+        ]).update_layout(title=f"Attack Severity Timeline ({data['bucket_seconds']}s buckets)",
+                         xaxis_title='Timestamp', yaxis_title='Attack Severity'),
+        'device_distribution': go.Figure(go.Bar(x=list(data['devices']), y=list(data['devices'].values())))
+            .update_layout(title='Device Type Distribution'),
+        'browser_distribution': go.Figure(go.Bar(x=list(data['browsers']), y=list(data['browsers'].values())))
+            .update_layout(title='Browser Distribution'),
+        'correlation_heatmap': go.Figure(go.Heatmap(z=data['correlation'], x=data['columns'], y=data['columns']))
+            .update_layout(title='Feature Correlation Heatmap'),
+    }
+    return figures
+
+def render_figures(directory, publish_to=None):
+    """Render the figures of a saved summary into directory, then copy them to publish_to"""
+    _write_json(os.path.join(directory, STATUS), {'status': RENDERING, 'pid': os.getpid()})
+    try:
+        with open(os.path.join(directory, SUMMARY)) as f:
+            figures = build_figures(json.load(f))
+        for name, filename in FIGURES.items():
+            path = os.path.join(directory, filename)
+            temporary = os.path.join(directory, f".{os.getpid()}-{filename}")
+            figures[name].write_image(temporary, format='png')
+            os.replace(temporary, path)
+        if publish_to:
+            publish_figures(directory, publish_to)
+    except Exception as e:
+        _write_json(os.path.join(directory, STATUS), {'status': FAILED, 'error': str(e)})
+        raise
+    _write_json(os.path.join(directory, STATUS), {'status': READY})
+
+def publish_figures(directory, target):
+    """Copy rendered figures to their usual names in target, each replaced atomically"""
+    os.makedirs(target, exist_ok=True)
+    for filename in FIGURES.values():
+        temporary = os.path.join(target, f".{os.getpid()}-{filename}")
+        shutil.copyfile(os.path.join(directory, filename), temporary)
+        os.replace(temporary, os.path.join(target, filename))
+
+def render_in_background(directory, publish_to=None):
+    """Start a detached renderer process and return it; its outcome lands in <directory>/status.json"""
+    command = [sys.executable, os.path.abspath(__file__), 'render', directory]
+    if publish_to:
+        command += ['--publish', publish_to]
+    with open(os.path.join(directory, "render.log"), "ab") as log:
+        return subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                                start_new_session=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render EDA figures from a saved summary")
+    commands = parser.add_subparsers(dest='command', required=True)
+    render_parser = commands.add_parser('render')
+    render_parser.add_argument('directory')
+    render_parser.add_argument('--publish', help='also copy the figures into this directory')
+    args = parser.parse_args(argv)
+    render_figures(args.directory, args.publish)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
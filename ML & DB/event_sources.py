@@ -0,0 +1,38 @@
+"""Sources of newly labeled events for incremental training.
+
+A source is either a file that grows by appending, CSV or Parquet, or a
+MongoDB collection in the service's database, written ``mongodb:<collection>``.
+Each read returns only the events after a watermark (a row offset for files,
+the last ``_id`` for collections) together with the watermark to resume from
+next time.
+"""
+import os
+
+import pandas as pd
+from bson import ObjectId
+
+MONGO_PREFIX = "mongodb:"
+
+def read_events(source, db=None, watermark=None):
+    """Return ``(events, watermark)`` for the events in ``source`` after ``watermark``"""
+    if source.startswith(MONGO_PREFIX):
+        return _read_collection(db[source[len(MONGO_PREFIX):]], watermark)
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"Event source {source} does not exist")
+    offset = int(watermark or 0)
+    if source.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(source)
+        return table.slice(offset).to_pandas(), table.num_rows
+    # Keep the header line, skip the data rows already consumed
+    events = pd.read_csv(source, skiprows=range(1, offset + 1))
+    return events, offset + len(events)
+
+def _read_collection(collection, watermark):
+    query = {'_id': {'$gt': ObjectId(watermark)}} if watermark else {}
+    documents = list(collection.find(query).sort('_id', 1))
+    if not documents:
+        return pd.DataFrame(), watermark
+    watermark = str(documents[-1]['_id'])
+    return pd.DataFrame(documents).drop(columns=['_id']), watermark
@@ -0,0 +1,486 @@
+"""In-memory sliding-window behavioral features per Source IP.
+
+For every event the store reports what the source did within the last
+``window_seconds`` of event time: how many events it sent, to how many
+distinct destinations, how many of them were blocked (failed attempts), and
+how many went to this event's destination (the per-pair count). Each
+source keeps a ring of time buckets; an event is added to the newest bucket
+and every bucket is subtracted once when it slides out, so nothing is ever
+re-queried.
+
+A batch is scored with array operations: events are sorted by source and
+time, each source's earlier buckets join them as weighted pseudo events,
+and the window sums come from cumulative sums and a searchsorted for the
+oldest bucket still in each event's window. Python only touches the state
+of the sources in the batch, not every event. A source with more new
+destinations than its ``max_destinations`` budget allows is updated event
+by event instead, since which ones fit depends on what expires in between,
+and so are small batches, where array setup costs more than it saves.
+
+Memory is bounded: sources are kept in LRU order, evicted once more than
+``max_entities`` are tracked or once they have been idle for
+``ttl_seconds`` of event time, and each source tracks at most
+``max_destinations`` distinct destinations. The state is process-local
+(each pre-forked worker sees its own share of traffic) and can be
+snapshotted to disk and restored across restarts.
+"""
+import collections
+import logging
+import os
+import pickle
+import threading
+
+import numpy as np
+import pandas as pd
+
+FEATURE_COLUMNS = ['Source Events', 'Source Distinct Destinations', 'Source Failed Events', 'Pair Events']
+SNAPSHOT_FORMAT = 1
+# A batch is applied event by event when it is small or has few events per source with state to
+# gather, where array setup costs more than it saves
+VECTORIZE_MIN_EVENTS = 256
+VECTORIZE_MIN_EVENTS_PER_WINDOW = 2
+
+class _SourceWindow:
+    __slots__ = ('buckets', 'events', 'failed', 'destinations', 'last_seen')
+
+    def __init__(self):
+        self.buckets = collections.deque()  # [bucket index, events, failed, {destination: events}]
+        self.events = 0
+        self.failed = 0
+        self.destinations = {}
+        self.last_seen = 0
+
+    def expire(self, oldest):
+        """Drop the buckets older than bucket index ``oldest``"""
+        while self.buckets and self.buckets[0][0] < oldest:
+            _, events, failed, destinations = self.buckets.popleft()
+            self.events -= events
+            self.failed -= failed
+            for destination, count in destinations.items():
+                remaining = self.destinations[destination] - count
+                if remaining:
+                    self.destinations[destination] = remaining
+                else:
+                    del self.destinations[destination]
+
+    def add(self, index, destination, failed, max_destinations):
+        if self.buckets and self.buckets[-1][0] >= index:
+            # Late events count in the newest bucket
+            bucket = self.buckets[-1]
+        else:
+            bucket = [index, 0, 0, {}]
+            self.buckets.append(bucket)
+        bucket[1] += 1
+        bucket[2] += failed
+        self.events += 1
+        self.failed += failed
+        if destination in self.destinations or len(self.destinations) < max_destinations:
+            bucket[3][destination] = bucket[3].get(destination, 0) + 1
+            self.destinations[destination] = self.destinations.get(destination, 0) + 1
+            return self.destinations[destination]
+        return 1
+
+    def extend(self, buckets):
+        """Append buckets in index order; one with the newest bucket's index is merged into it"""
+        for bucket in buckets:
+            index, events, failed, destinations = bucket
+            if self.buckets and self.buckets[-1][0] == index:
+                newest = self.buckets[-1]
+                newest[1] += events
+                newest[2] += failed
+                for destination, count in destinations.items():
+                    newest[3][destination] = newest[3].get(destination, 0) + count
+            else:
+                self.buckets.append(bucket)
+            self.events += events
+            self.failed += failed
+            for destination, count in destinations.items():
+                self.destinations[destination] = self.destinations.get(destination, 0) + count
+
+def _window_sums(groups, buckets, weights, thresholds, base, span):
+    """Per row, the weights summed over the rows of its group up to and including it whose bucket is at
+    least the row's threshold. Rows are sorted by group, buckets never decrease within a group, and
+    every row's own bucket is at least its threshold."""
+    keys = groups * span + (buckets - base)
+    oldest = np.searchsorted(keys, groups * span + (thresholds - base), side='left')
+    cumulative = np.concatenate([[0], np.cumsum(weights)])
+    return cumulative[1:] - cumulative[oldest]
+
+def _active_counts(row_groups, row_thresholds, pair_ids, pair_rows, pair_buckets, base, span):
+    """Per row, how many pairs have a row at or before it whose bucket is still in its window.
+
+    Each pair row keeps its pair active from its own row until the pair's next
+    row or the first row of the group whose threshold passes its bucket,
+    whichever comes first; the active count is a running sum of those intervals.
+    """
+    n_rows = len(row_groups)
+    groups = row_groups[pair_rows]
+    ends = np.searchsorted(row_groups * span + (row_thresholds - base), groups * span + (pair_buckets - base),
+                           side='right')
+    same_pair = np.r_[pair_ids[1:] == pair_ids[:-1], False]
+    next_rows = np.r_[pair_rows[1:], n_rows]
+    ends = np.where(same_pair, np.minimum(ends, next_rows), ends)
+    changes = np.bincount(pair_rows, minlength=n_rows + 1) - np.bincount(ends, minlength=n_rows + 1)
+    return np.cumsum(changes)[:n_rows]
+
+class FeatureStore:
+    def __init__(self, window_seconds=300, buckets=30, max_entities=100000, ttl_seconds=3600,
+                 max_destinations=1024):
+        self.window_seconds = window_seconds
+        self.n_buckets = buckets
+        self.bucket_seconds = window_seconds / buckets
+        self.max_entities = max_entities
+        self.ttl_seconds = ttl_seconds
+        self.max_destinations = max_destinations
+        self.sources = collections.OrderedDict()
+        self.newest = 0  # Latest event time seen, in unix seconds
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+    def update(self, timestamps, sources, destinations, failed):
+        """Add a batch of events and return their features as ``{column: array}``.
+
+        ``timestamps`` are unix seconds. Events are applied in time order and
+        each event's features include the event itself.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        count = len(timestamps)
+        features = np.zeros((len(FEATURE_COLUMNS), count), dtype=np.int64)
+        if not count:
+            return dict(zip(FEATURE_COLUMNS, features))
+        failed = np.broadcast_to(np.asarray(failed, dtype=bool), (count,))
+        if count < VECTORIZE_MIN_EVENTS:
+            with self._lock:
+                return self._update_events(timestamps, sources, destinations, failed, features)
+        source_codes, source_keys = pd.factorize(pd.Series(np.asarray(sources, dtype=object)),
+                                                 use_na_sentinel=False)
+        destination_codes, destination_keys = pd.factorize(pd.Series(np.asarray(destinations, dtype=object)),
+                                                           use_na_sentinel=False)
+        source_keys, destination_keys = source_keys.tolist(), destination_keys.tolist()
+
+        # Events by source, in time order within each source
+        order = np.lexsort((timestamps, source_codes))
+        groups = source_codes[order].astype(np.int64)
+        indexes = (timestamps[order] // self.bucket_seconds).astype(np.int64)
+        thresholds = indexes - self.n_buckets + 1
+        event_destinations = destination_codes[order].astype(np.int64)
+        firsts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        lasts = np.r_[firsts[1:], count] - 1
+        sizes = lasts - firsts + 1
+        # Distinct (source, destination) pairs of the batch, sorted by source
+        _, pair_firsts, pair_of_event = np.unique(groups * len(destination_keys) + event_destinations,
+                                                  return_index=True, return_inverse=True)
+
+        with self._lock:
+            windows = [self.sources.get(source_keys[group]) for group in groups[firsts].tolist()]
+            if count < VECTORIZE_MIN_EVENTS_PER_WINDOW * (len(windows) - windows.count(None)):
+                return self._update_events(timestamps, sources, destinations, failed, features)
+            state = self._prior_state(windows, firsts, thresholds[firsts], thresholds[lasts], pair_firsts,
+                                      event_destinations, destination_keys)
+            prior, prior_pairs, newest_buckets, base_distinct, tracked_pairs, capped = state
+            tracked = tracked_pairs[pair_of_event.ravel()]
+            # Late events go into the source's newest bucket, as in _SourceWindow.extend
+            event_buckets = np.maximum(indexes, np.repeat(newest_buckets, sizes))
+            positions = np.repeat(np.arange(len(firsts)), sizes)
+            sorted_failed = failed[order]
+
+            # Rows: each source's prior buckets, then its events
+            base = int(min(thresholds.min(), prior[:, 1].min() if len(prior) else thresholds.min()))
+            row_order = np.argsort(np.concatenate([prior[:, 0], positions]), kind='stable')
+            row_groups = np.concatenate([prior[:, 0], positions])[row_order]
+            row_buckets = np.concatenate([prior[:, 1], event_buckets])[row_order]
+            # Prior rows pass every threshold, so they never end an interval in _active_counts
+            row_thresholds = np.concatenate([np.full(len(prior), base), thresholds])[row_order]
+            span = int(max(row_buckets.max(), thresholds.max())) - base + 1
+            event_rows = np.empty(count, dtype=np.int64)
+            is_event = row_order >= len(prior)
+            event_rows[row_order[is_event] - len(prior)] = np.flatnonzero(is_event)
+            group_first_rows = np.searchsorted(row_groups, np.arange(len(firsts)))
+
+            for column, weights in ((0, np.concatenate([prior[:, 2], np.ones(count, dtype=np.int64)])),
+                                    (2, np.concatenate([prior[:, 3], sorted_failed]))):
+                sums = _window_sums(row_groups, row_buckets, weights[row_order], row_thresholds, base, span)
+                features[column, order] = sums[event_rows]
+
+            # Pair rows: each pair's prior counts, then its tracked events; prior ones sit at the
+            # source's first row, ahead of all of its events
+            tracked_events = np.flatnonzero(tracked)
+            pair_rows = np.concatenate([group_first_rows[prior_pairs[:, 0]], event_rows[tracked_events]])
+            pair_codes = np.concatenate([prior_pairs[:, 1], event_destinations[tracked_events]])
+            pair_buckets = np.concatenate([prior_pairs[:, 2], event_buckets[tracked_events]])
+            pair_weights = np.concatenate([prior_pairs[:, 3], np.ones(len(tracked_events), dtype=np.int64)])
+            pair_order = np.lexsort((pair_rows, pair_buckets, pair_codes, row_groups[pair_rows]))
+            pair_rows, pair_codes, pair_buckets = pair_rows[pair_order], pair_codes[pair_order], \
+                pair_buckets[pair_order]
+            pair_groups = row_groups[pair_rows]
+            pair_ids = np.cumsum(np.r_[0, (pair_groups[1:] != pair_groups[:-1])
+                                       | (pair_codes[1:] != pair_codes[:-1])])
+            pair_thresholds = np.where(pair_order >= len(prior_pairs), row_thresholds[pair_rows], base)
+            pair_sums = _window_sums(pair_ids, pair_buckets, pair_weights[pair_order], pair_thresholds, base, span)
+            from_events = pair_order >= len(prior_pairs)
+            features[3, order[tracked_events[pair_order[from_events] - len(prior_pairs)]]] = pair_sums[from_events]
+            active = _active_counts(row_groups, row_thresholds, pair_ids, pair_rows, pair_buckets, base, span)
+            features[1, order] = active[event_rows] + np.repeat(base_distinct, sizes)
+
+            for position in capped:
+                if windows[position] is None:
+                    windows[position] = self.sources[source_keys[groups[firsts[position]]]] = _SourceWindow()
+                events = slice(firsts[position], lasts[position] + 1)
+                features[:, order[events]] = self._add_events(windows[position], indexes[events],
+                                                              event_destinations[events], sorted_failed[events],
+                                                              destination_keys)
+            self._apply(windows, source_keys, destination_keys, groups, firsts, sizes, event_buckets,
+                        thresholds[lasts], sorted_failed, event_destinations, tracked, timestamps, order,
+                        set(capped))
+        return dict(zip(FEATURE_COLUMNS, features))
+
+    def _update_events(self, timestamps, sources, destinations, failed, features):
+        """Apply a batch one event at a time, in time order; the caller holds the lock"""
+        sources = np.asarray(sources, dtype=object)
+        destinations = np.asarray(destinations, dtype=object)
+        indexes = (timestamps // self.bucket_seconds).astype(np.int64)
+        for position in np.argsort(timestamps, kind='stable').tolist():
+            timestamp = int(timestamps[position])
+            source = sources[position]
+            window = self.sources.get(source)
+            if window is None:
+                window = self.sources[source] = _SourceWindow()
+            else:
+                self.sources.move_to_end(source)
+            index = int(indexes[position])
+            window.expire(index - self.n_buckets + 1)
+            pair = window.add(index, destinations[position], int(failed[position]), self.max_destinations)
+            window.last_seen = max(window.last_seen, timestamp)
+            features[:, position] = (window.events, len(window.destinations), window.failed, pair)
+            if timestamp > self.newest:
+                self.newest = timestamp
+        self._evict()
+        return dict(zip(FEATURE_COLUMNS, features))
+
+    def _prior_state(self, windows, firsts, first_thresholds, last_thresholds, pair_firsts, event_destinations,
+                     destination_keys):
+        """What the sources of a batch already have in their windows.
+
+        Expires each source's buckets as its first event would, then returns
+        ``(prior, prior_pairs, newest_buckets, base_distinct, tracked_pairs,
+        capped)``: rows of (source position, bucket, events, failed) and
+        (source position, destination code, bucket, events), each source's
+        newest bucket index, a count of distinct destinations to add that the
+        pair rows leave out, which batch pairs count as destinations, and the
+        positions of the sources over their destination budget.
+
+        Only the buckets that slide out during the batch enter one by one (and
+        each bucket does so once, the batch it expires in); the rest stay
+        for the whole batch and enter as one row of their totals.
+        """
+        pair_positions = np.searchsorted(firsts, pair_firsts, side='right') - 1
+        pair_destinations = event_destinations[pair_firsts].tolist()
+        pair_bounds = np.searchsorted(pair_positions, np.arange(len(firsts) + 1)).tolist()
+        newest_buckets = np.full(len(firsts), np.iinfo(np.int64).min)
+        base_distinct = np.zeros(len(firsts), dtype=np.int64)
+        budget = np.full(len(firsts), self.max_destinations)
+        known = np.zeros(len(pair_firsts), dtype=bool)
+        prior, prior_pairs = [], []
+        destination_index = None
+        for position, window in enumerate(windows):
+            if window is None:
+                continue
+            window.expire(int(first_thresholds[position]))
+            if not window.buckets:
+                continue
+            newest_buckets[position] = window.buckets[-1][0]
+            budget[position] -= len(window.destinations)
+            batch_destinations = {}
+            for pair in range(pair_bounds[position], pair_bounds[position + 1]):
+                destination = destination_keys[pair_destinations[pair]]
+                known[pair] = destination in window.destinations
+                batch_destinations[destination] = pair_destinations[pair]
+
+            last_threshold = int(last_thresholds[position])
+            expiring = []
+            for bucket in window.buckets:
+                if bucket[0] >= last_threshold:
+                    break
+                expiring.append(bucket)
+            gone = {}  # Destination -> events in the expiring buckets
+            for index, events, failed, bucket_destinations in expiring:
+                prior.append((position, index, events, failed))
+                for destination, events in bucket_destinations.items():
+                    gone[destination] = gone.get(destination, 0) + events
+            staying = len(window.destinations) - sum(events == window.destinations[destination]
+                                                     for destination, events in gone.items())
+            if len(expiring) < len(window.buckets):
+                oldest_staying = window.buckets[len(expiring)][0]
+                prior.append((position, oldest_staying, window.events - sum(bucket[1] for bucket in expiring),
+                              window.failed - sum(bucket[2] for bucket in expiring)))
+                for destination, code in batch_destinations.items():
+                    events = window.destinations.get(destination, 0) - gone.get(destination, 0)
+                    if events:
+                        prior_pairs.append((position, code, oldest_staying, events))
+                        staying -= 1
+            # Destinations that stay and are not in the batch count throughout
+            base_distinct[position] = staying
+            if gone:
+                if destination_index is None:
+                    destination_index = {key: code for code, key in enumerate(destination_keys)}
+                for index, _, _, bucket_destinations in expiring:
+                    for destination, events in bucket_destinations.items():
+                        if gone[destination] == window.destinations[destination] \
+                                or destination in batch_destinations:
+                            code = destination_index.setdefault(destination, len(destination_index))
+                            prior_pairs.append((position, code, index, events))
+
+        # New destinations all fit unless a source has more of them than budget left
+        capped = np.bincount(pair_positions[~known], minlength=len(firsts)) > budget
+        return (np.array(prior, dtype=np.int64).reshape(-1, 4),
+                np.array(prior_pairs, dtype=np.int64).reshape(-1, 4), newest_buckets, base_distinct,
+                ~capped[pair_positions], np.flatnonzero(capped).tolist())
+
+    def _add_events(self, window, indexes, destination_codes, failed, destination_keys):
+        """Add one source's events in time order, one at a time; returns their features"""
+        features = np.zeros((len(FEATURE_COLUMNS), len(indexes)), dtype=np.int64)
+        for position, (index, code, failed_event) in enumerate(zip(indexes.tolist(), destination_codes.tolist(),
+                                                                   failed.tolist())):
+            window.expire(index - self.n_buckets + 1)
+            pair = window.add(index, destination_keys[code], int(failed_event), self.max_destinations)
+            features[:, position] = (window.events, len(window.destinations), window.failed, pair)
+        return features
+
+    def _apply(self, windows, source_keys, destination_keys, groups, firsts, sizes, event_buckets,
+               last_thresholds, failed, event_destinations, tracked, timestamps, order, updated):
+        """Fold a scored batch into the per-source windows and evict as _evict would; the sources in
+        ``updated`` already hold their events"""
+        keys = [source_keys[group] for group in groups[firsts].tolist()]
+        batch_last_seen = np.maximum.reduceat(timestamps[order], firsts).tolist()
+        # The batch's sources go to the back of the LRU order, as if every event had moved its source
+        # there in time order
+        ranks = np.empty(len(groups), dtype=np.int64)
+        ranks[np.argsort(timestamps, kind='stable')] = np.arange(len(groups))
+        lru = np.argsort(np.maximum.reduceat(ranks[order], firsts)).tolist()
+        sources = self.sources
+        for position in lru:
+            if windows[position] is not None:
+                del sources[keys[position]]
+        self.newest = max(self.newest, int(timestamps.max()))
+        expired_before = self.newest - self.ttl_seconds
+        excess = len(sources) + len(lru) - self.max_entities
+        while excess > 0 and sources:
+            sources.popitem(last=False)
+            self.evicted += 1
+            excess -= 1
+        while sources and next(iter(sources.values())).last_seen < expired_before:
+            sources.popitem(last=False)
+            self.evicted += 1
+        if not sources:
+            # Everything older is gone, so eviction reaches the batch's own sources; those are not built
+            evicted = max(excess, 0)
+            last_seen = np.array([batch_last_seen[position] if windows[position] is None
+                                  else max(windows[position].last_seen, batch_last_seen[position])
+                                  for position in lru[evicted:]], dtype=np.int64)
+            idle = last_seen < expired_before
+            evicted += len(idle) if idle.all() else int(np.argmin(idle))
+            self.evicted += evicted
+            lru = lru[evicted:]
+
+        stored = np.zeros(len(firsts), dtype=bool)
+        stored[lru] = True
+        stored[list(updated)] = False
+        new_buckets = self._batch_buckets(stored, sizes, event_buckets, last_thresholds, failed,
+                                          event_destinations, tracked, destination_keys)
+        last_thresholds = last_thresholds.tolist()
+        for position in lru:
+            window = windows[position]
+            if window is None:
+                window = _SourceWindow()
+            sources[keys[position]] = window
+            if stored[position]:
+                window.extend(new_buckets[position])
+                window.expire(last_thresholds[position])
+            window.last_seen = max(window.last_seen, batch_last_seen[position])
+
+    def _batch_buckets(self, stored, sizes, event_buckets, last_thresholds, failed, event_destinations, tracked,
+                       destination_keys):
+        """New buckets per source position (for those ``stored``), leaving out the ones already out of
+        the window after the source's last event"""
+        positions = np.repeat(np.arange(len(sizes)), sizes)
+        kept = np.flatnonzero(stored[positions] & (event_buckets >= np.repeat(last_thresholds, sizes)))
+        kept_positions, kept_buckets = positions[kept], event_buckets[kept]
+        # Events and failures per (source, bucket); buckets never decrease within a source
+        starts = np.flatnonzero(np.r_[True, (kept_positions[1:] != kept_positions[:-1])
+                                      | (kept_buckets[1:] != kept_buckets[:-1])])[:len(kept)]
+        bucket_events = np.diff(np.r_[starts, len(kept)])
+        bucket_failed = np.add.reduceat(failed[kept].astype(np.int64), starts)
+        buckets = [[index, events, failed_events, {}] for index, events, failed_events
+                   in zip(kept_buckets[starts].tolist(), bucket_events.tolist(), bucket_failed.tolist())]
+        # Tracked events per (source, bucket, destination)
+        bucket_of_event = np.zeros(len(kept), dtype=np.int64)
+        bucket_of_event[starts[1:]] = 1
+        bucket_of_event = np.cumsum(bucket_of_event)
+        tracked_events = np.flatnonzero(tracked[kept])
+        triples, triple_counts = np.unique(bucket_of_event[tracked_events] * len(destination_keys)
+                                           + event_destinations[kept][tracked_events], return_counts=True)
+        for triple, events in zip(triples.tolist(), triple_counts.tolist()):
+            bucket, destination = divmod(triple, len(destination_keys))
+            buckets[bucket][3][destination_keys[destination]] = events
+        bounds = np.searchsorted(kept_positions[starts], np.arange(len(sizes) + 1)).tolist()
+        return [buckets[bounds[position]:bounds[position + 1]] for position in range(len(sizes))]
+
+    def _evict(self):
+        sources = self.sources
+        while len(sources) > self.max_entities:
+            sources.popitem(last=False)
+            self.evicted += 1
+        # Least recently updated first, so idle sources are found at the front
+        expired_before = self.newest - self.ttl_seconds
+        while sources:
+            source, window = next(iter(sources.items()))
+            if window.last_seen >= expired_before:
+                break
+            sources.popitem(last=False)
+            self.evicted += 1
+
+    def __len__(self):
+        return len(self.sources)
+
+    def stats(self):
+        return {'sources': len(self.sources), 'evicted': self.evicted, 'newest': self.newest}
+
+    def snapshot(self, path):
+        """Write the state to ``path`` atomically"""
+        with self._lock:
+            state = {
+                'format': SNAPSHOT_FORMAT,
+                'settings': (self.window_seconds, self.n_buckets, self.max_entities, self.ttl_seconds,
+                             self.max_destinations),
+                'newest': self.newest,
+                'sources': [(source, list(window.buckets), window.last_seen)
+                            for source, window in self.sources.items()],
+            }
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            temporary = f"{path}.tmp-{os.getpid()}"
+            with open(temporary, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, path)
+
+    def restore(self, path):
+        """Load a snapshot written with the same window settings; returns False if there is none"""
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        if state.get('format') != SNAPSHOT_FORMAT or tuple(state['settings'][:2]) != (self.window_seconds,
+                                                                                       self.n_buckets):
+            logging.warning(f"Ignoring feature store snapshot {path} taken with different window settings")
+            return False
+        sources = collections.OrderedDict()
+        for source, buckets, last_seen in state['sources']:
+            window = _SourceWindow()
+            window.extend(buckets)
+            window.last_seen = last_seen
+            sources[source] = window
+        with self._lock:
+            self.sources = sources
+            self.newest = state['newest']
+            self._evict()
+        return True
@@ -0,0 +1,156 @@
+"""Columnar IPv4/IPv6 address parsing and derived address features.
+
+Addresses are held as two uint64 halves of a 128-bit IPv6 value. IPv4
+addresses (and IPv4-mapped IPv6 addresses such as ``::ffff:127.0.0.1``, which
+Node logs for v4 clients) live in ``::ffff:0:0/96`` so both families share one
+representation. Unparseable values become the ``INVALID`` sentinel instead of
+raising.
+"""
+import ipaddress
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+INVALID = np.uint64(2**64 - 1)
+INVALID_IPV4 = -1
+V4_MAPPED = np.uint64(0xFFFF << 32)
+
+IPV4_PATTERN = r'^(0|[1-9]\d{0,2})\.(0|[1-9]\d{0,2})\.(0|[1-9]\d{0,2})\.(0|[1-9]\d{0,2})$'
+OCTET_SHIFTS = np.array([24, 16, 8, 0], dtype=np.uint64)
+PREFIX_BUCKET_BITS = 24
+PREFIX_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+PRIVATE_NETWORKS = ['10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16', '169.254.0.0/16',
+                    '100.64.0.0/10', 'fc00::/7', 'fe80::/10']
+LOOPBACK_NETWORKS = ['127.0.0.0/8', '::1/128']
+MULTICAST_NETWORKS = ['224.0.0.0/4', 'ff00::/8']
+
+ParsedIPs = namedtuple('ParsedIPs', ['hi', 'lo', 'version'])
+
+def _split128(value):
+    return np.uint64(value >> 64), np.uint64(value & (2**64 - 1))
+
+def _network_masks(networks):
+    """(net_hi, net_lo, mask_hi, mask_lo) in the shared 128-bit space"""
+    masks = []
+    for network in map(ipaddress.ip_network, networks):
+        address, prefixlen = int(network.network_address), network.prefixlen
+        if network.version == 4:
+            address, prefixlen = int(V4_MAPPED) | address, 96 + prefixlen
+        mask = ((1 << prefixlen) - 1) << (128 - prefixlen)
+        masks.append(_split128(address) + _split128(mask))
+    return masks
+
+_PRIVATE = _network_masks(PRIVATE_NETWORKS)
+_LOOPBACK = _network_masks(LOOPBACK_NETWORKS)
+_MULTICAST = _network_masks(MULTICAST_NETWORKS)
+
+def _parse_unique(uniques):
+    """Parse distinct address strings; IPv4 fully vectorized, IPv6 per distinct value"""
+    n = len(uniques)
+    hi = np.full(n, INVALID, dtype=np.uint64)
+    lo = np.full(n, INVALID, dtype=np.uint64)
+    version = np.zeros(n, dtype=np.int8)
+
+    octets = uniques.str.extract(IPV4_PATTERN)
+    dotted = octets.notna().all(axis=1).to_numpy()
+    if dotted.any():
+        parts = octets[dotted].to_numpy(dtype=np.uint64)
+        in_range = (parts <= 255).all(axis=1)
+        idx = np.flatnonzero(dotted)[in_range]
+        hi[idx] = 0
+        lo[idx] = V4_MAPPED | (parts[in_range] << OCTET_SHIFTS).sum(axis=1, dtype=np.uint64)
+        version[idx] = 4
+
+    for idx in np.flatnonzero(uniques.str.contains(':', regex=False).to_numpy(dtype=bool)):
+        try:
+            address = ipaddress.IPv6Address(uniques.iat[idx])
+        except ValueError:
+            continue
+        hi[idx], lo[idx] = _split128(int(address))
+        version[idx] = 4 if address.ipv4_mapped is not None else 6
+    return hi, lo, version
+
+def parse_ips(values):
+    """Parse a Series of address strings into ParsedIPs arrays.
+
+    Addresses repeat heavily in event logs, so each distinct value is parsed
+    once and broadcast back through its factorized code.
+    """
+    codes, uniques = pd.factorize(pd.Series(values))
+    hi, lo, version = _parse_unique(pd.Series(uniques, dtype=object).astype(str))
+    # Missing values get code -1, which picks the trailing invalid slot
+    return ParsedIPs(np.append(hi, INVALID)[codes],
+                     np.append(lo, INVALID)[codes],
+                     np.append(version, np.int8(0))[codes])
+
+def ipv4_values(parsed):
+    """IPv4 addresses as int64, INVALID_IPV4 for IPv6 and invalid entries"""
+    return np.where(parsed.version == 4,
+                    (parsed.lo & np.uint64(0xFFFFFFFF)).astype(np.int64),
+                    INVALID_IPV4)
+
+def network_prefix(parsed):
+    """/24 prefix for IPv4, /48 prefix for IPv6, -1 for invalid entries"""
+    prefix = np.full(len(parsed.version), -1, dtype=np.int64)
+    v4 = parsed.version == 4
+    v6 = parsed.version == 6
+    prefix[v4] = ((parsed.lo[v4] & np.uint64(0xFFFFFFFF)) >> np.uint64(8)).astype(np.int64)
+    prefix[v6] = (parsed.hi[v6] >> np.uint64(16)).astype(np.int64)
+    return prefix
+
+def prefix_bucket(parsed):
+    """/24 prefix for IPv4, /48 prefix hashed into the same 24-bit range for IPv6, -1 for invalid entries"""
+    bucket = network_prefix(parsed)
+    v6 = parsed.version == 6
+    # Fibonacci hashing of the 48-bit prefix; uint64 multiplication wraps
+    hashed = (parsed.hi[v6] >> np.uint64(16)) * PREFIX_HASH_MULTIPLIER
+    bucket[v6] = (hashed >> np.uint64(64 - PREFIX_BUCKET_BITS)).astype(np.int64)
+    return bucket
+
+def in_networks(parsed, masks):
+    """Boolean mask of addresses inside any of the given networks"""
+    hit = np.zeros(len(parsed.version), dtype=bool)
+    for net_hi, net_lo, mask_hi, mask_lo in masks:
+        hit |= ((parsed.hi & mask_hi) == net_hi) & ((parsed.lo & mask_lo) == net_lo)
+    return hit & (parsed.version > 0)
+
+def ip_feature_columns(column, parsed):
+    """Model feature columns for one address column, keyed by column name.
+
+    ``column`` itself keeps the IPv4 integer the models were originally
+    trained on (-1 for IPv6 and invalid entries). The raw 128-bit halves are
+    not features: they are unbounded for IPv6 and the invalid sentinel, so
+    the address family, validity and network come in as small flags and a
+    24-bit prefix bucket instead.
+    """
+    return {
+        column: ipv4_values(parsed),
+        f'{column}_ipv6': (parsed.version == 6).astype(np.int8),
+        f'{column}_invalid': (parsed.version == 0).astype(np.int8),
+        f'{column}_prefix': prefix_bucket(parsed),
+        f'{column}_private': in_networks(parsed, _PRIVATE).astype(np.int8),
+        f'{column}_loopback': in_networks(parsed, _LOOPBACK).astype(np.int8),
+        f'{column}_multicast': in_networks(parsed, _MULTICAST).astype(np.int8),
+    }
+
+def same_subnet(source, destination):
+    """1 where both addresses share a /24 (IPv4) or /48 (IPv6) prefix"""
+    return ((source.version > 0)
+            & (source.version == destination.version)
+            & (network_prefix(source) == network_prefix(destination))).astype(np.int8)
+
+def alert_values(values, parsed):
+    """JSON-native address values for alerts.
+
+    IPv4 addresses stay integers as before; IPv6 addresses, which do not fit
+    in a Mongo int64, keep their original text; invalid entries become 0.
+    """
+    values = pd.Series(values).to_numpy(dtype=object)
+    result = np.zeros(len(values), dtype=object)
+    v4 = parsed.version == 4
+    result[v4] = ipv4_values(parsed)[v4].tolist()
+    v6 = parsed.version == 6
+    result[v6] = values[v6]
+    return result
@@ -0,0 +1,174 @@
+"""Process-local metrics rendered in the Prometheus text exposition format.
+
+Histograms and counters are plain Python objects updated under a per-metric
+lock, cheap enough to observe every stage of every request. Each process
+exposes its own values; with the pre-fork server every worker reports
+separately, so scrape them per worker or aggregate by ``pid``.
+"""
+import bisect
+import os
+import threading
+import time
+
+import numpy as np
+
+# Upper bounds in seconds for per-stage latencies, from 50us to 10s
+LATENCY_BUCKETS = [0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1, 2.5, 10, float('inf')]
+
+class Histogram:
+    """Cumulative bucket counts with a running sum, Prometheus style"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[min(index, len(self.counts) - 1)] += 1
+            self.total += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            cumulative = np.cumsum(self.counts).tolist()
+            return {
+                'buckets': {str(bound): count for bound, count in zip(self.buckets, cumulative)},
+                'sum': self.total,
+                'count': self.count
+            }
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+class Family:
+    """A named metric with one child per label value.
+
+    ``label`` is a label name, or a tuple of names whose children are keyed
+    by tuples of values.
+    """
+
+    def __init__(self, name, help, kind, factory, label=None):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.label = label
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, value=None):
+        child = self._children.get(value)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(value, self._factory())
+        return child
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def items(self):
+        with self._lock:
+            return sorted(self._children.items(), key=lambda item: str(item[0]))
+
+def _labels(**labels):
+    labels = {key: value for key, value in labels.items() if value is not None}
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + '}'
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render_histogram(name, histogram, **labels):
+    snapshot = histogram.snapshot()
+    lines = [f"{name}_bucket{_labels(**labels, le=_number(float(bound)))} {count}"
+             for bound, count in zip(histogram.buckets, snapshot['buckets'].values())]
+    lines.append(f"{name}_sum{_labels(**labels)} {_number(snapshot['sum'])}")
+    lines.append(f"{name}_count{_labels(**labels)} {snapshot['count']}")
+    return lines
+
+def render_value(name, help, value, kind='gauge', **labels):
+    """Exposition lines for a single gauge or counter sample"""
+    return [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name}{_labels(**labels)} {_number(value)}"]
+
+class Registry:
+    def __init__(self):
+        self._families = []
+        self._collectors = []
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, label=None):
+        family = Family(name, help, 'histogram', lambda: Histogram(buckets), label)
+        self._families.append(family)
+        return family
+
+    def counter(self, name, help, label=None):
+        family = Family(name, help, 'counter', Counter, label)
+        self._families.append(family)
+        return family
+
+    def collector(self, collect):
+        """Register collect() -> list of exposition lines, called at scrape time"""
+        self._collectors.append(collect)
+        return collect
+
+    def render(self):
+        lines = []
+        for family in self._families:
+            lines += [f"# HELP {family.name} {family.help}", f"# TYPE {family.name} {family.kind}"]
+            for value, child in family.items():
+                labels = {}
+                if isinstance(family.label, tuple):
+                    labels = dict(zip(family.label, value))
+                elif family.label:
+                    labels = {family.label: value}
+                if family.kind == 'histogram':
+                    lines += render_histogram(family.name, child, **labels)
+                else:
+                    lines.append(f"{family.name}{_labels(**labels)} {_number(child.value)}")
+        for collect in self._collectors:
+            lines += collect()
+        return '\n'.join(lines) + '\n'
+
+class StageTimer:
+    """``with timer('stage'):`` observes the block's wall time into the stage histogram"""
+
+    __slots__ = ('family', 'stage', 'start')
+
+    def __init__(self, family, stage):
+        self.family = family
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.family.labels(self.stage).observe(time.perf_counter() - self.start)
+        return False
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram('detect_stage_seconds', 'Wall time of each /detect pipeline stage', label='stage')
+
+def time_stage(stage):
+    return StageTimer(STAGE_SECONDS, stage)
+
+@REGISTRY.collector
+def _process_info():
+    return render_value('process_info', 'Identifies the process serving these metrics', 1, pid=os.getpid())
@@ -0,0 +1,141 @@
+"""Dynamic micro-batching in front of detect_anomalies.
+
+Concurrent /detect requests are collected for up to ``max_wait_ms`` or
+``max_batch_rows`` rows, scored in a single detect_anomalies pass over the
+combined frame, and each caller gets back the alerts for its own rows. This
+amortizes the fixed per-call cost of the three model predict calls. If the
+combined pass fails with one of the ``retry_on`` errors, every request in
+the batch is retried on its own, so only the requests that fail by
+themselves get an error. ``detect`` must raise those errors before it
+changes any state (the behavioral window, the threshold sketch), or the
+retried requests would be counted twice; any other error fails the batch.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from metrics import Histogram
+
+# Upper bounds of the batch-size and queueing-delay histogram buckets
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, float('inf')]
+DELAY_MS_BUCKETS = [0.5, 1, 2, 5, 10, 25, 50, 100, float('inf')]
+
+class _Pending:
+    __slots__ = ('frame', 'enqueued', 'done', 'alerts', 'error')
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.alerts = None
+        self.error = None
+
+class MicroBatcher:
+    def __init__(self, detect, max_wait_ms=2.0, max_batch_rows=1024, retry_on=()):
+        """``detect`` must accept ``(frame, return_rows=True)`` and return ``(alerts, rows)``"""
+        self.detect = detect
+        self.retry_on = tuple(retry_on)
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_rows = max_batch_rows
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self._metrics_lock = threading.Lock()
+        self.batch_rows = Histogram(BATCH_SIZE_BUCKETS)
+        self.batch_requests = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_delay_ms = Histogram(DELAY_MS_BUCKETS)
+
+    def submit(self, frame):
+        """Score ``frame`` as part of the next batch and return its alerts"""
+        self._ensure_started()
+        pending = _Pending(frame)
+        with self._cond:
+            self._pending.append(pending)
+            self._cond.notify()
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.alerts
+
+    def stats(self):
+        with self._metrics_lock:
+            return {
+                'batch_rows': self.batch_rows.snapshot(),
+                'batch_requests': self.batch_requests.snapshot(),
+                'queue_delay_ms': self.queue_delay_ms.snapshot()
+            }
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                if self._pid != os.getpid():
+                    self._pending = deque()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        """Wait for the first request, then gather more until the window or row budget runs out"""
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            batch = [self._pending.popleft()]
+            rows = len(batch[0].frame)
+            deadline = batch[0].enqueued + self.max_wait
+            while rows < self.max_batch_rows:
+                if self._pending:
+                    if rows + len(self._pending[0].frame) > self.max_batch_rows:
+                        break
+                    batch.append(self._pending.popleft())
+                    rows += len(batch[-1].frame)
+                    continue
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+        return batch, rows
+
+    def _run(self):
+        while True:
+            batch, rows = self._collect()
+            started = time.perf_counter()
+            with self._metrics_lock:
+                self.batch_rows.observe(rows)
+                self.batch_requests.observe(len(batch))
+                for pending in batch:
+                    self.queue_delay_ms.observe((started - pending.enqueued) * 1000.0)
+            try:
+                self._score(batch)
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            for pending in batch:
+                pending.done.set()
+
+    def _score(self, batch):
+        if len(batch) == 1:
+            batch[0].alerts, _ = self.detect(batch[0].frame, return_rows=True)
+            return
+        combined = pd.concat([pending.frame for pending in batch], ignore_index=True)
+        try:
+            alerts, rows = self.detect(combined, return_rows=True)
+        except self.retry_on:
+            # One bad request must not fail the others batched with it: score each on its own
+            for pending in batch:
+                try:
+                    pending.alerts, _ = self.detect(pending.frame, return_rows=True)
+                except Exception as e:
+                    pending.error = e
+            return
+        # Split the alerts back out by the row range each caller contributed
+        bounds = np.cumsum([0] + [len(pending.frame) for pending in batch])
+        owners = np.searchsorted(bounds, rows, side='right') - 1
+        for position, pending in enumerate(batch):
+            pending.alerts = [alerts[i] for i in np.flatnonzero(owners == position)]
@@ -1,24 +1,51 @@
+import atexit
+import copy
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
-import lightgbm as lgb
 from pymongo import MongoClient
+from pymongo.errors import PyMongoError
 import datetime
-import ipaddress
+import hashlib
 import json
-import plotly.express as px
-import plotly.graph_objects as go
-from sklearn.ensemble import IsolationForest
-import tensorflow as tf
-from tensorflow.keras import layers, Model
 import logging
 import os
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from bson import ObjectId
 from pandas import Timestamp
 import pickle
 import os.path
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from alert_queries import (ALERT_INDEXES, DEFAULT_LIMIT, SORT, after_cursor, build_query, encode_cursor, parse_limit,
+                           parse_time)
+from alert_sink import AlertSink
+from alert_stats import AlertRollups
+from artifact_store import ArtifactStore
+from bulk_records import chunked, iter_ndjson, iter_records
+from eda import (EdaSummary, figures_ready, fingerprint, publish_figures, render_figures, render_in_background,
+                 save_summary, summary_directory)
+from event_sources import read_events
+from feature_store import FEATURE_COLUMNS as BEHAVIOR_COLUMNS, FeatureStore
+from ip_features import alert_values, ip_feature_columns, parse_ips, same_subnet
+from metrics import REGISTRY, render_value, render_histogram, time_stage
+from micro_batcher import BATCH_SIZE_BUCKETS, MicroBatcher
+from numpy_autoencoder import NumpyAutoencoder
+from profiler import SamplingProfiler, install_signal_toggle
+from quantile_sketch import QuantileSketch
+from score_cache import ScoreCache
+from training_jobs import TrainingJobs
+from tree_ensemble import CompiledIsolationForest, CompiledLightGBM
+from wire_formats import (FORMATS, JSON, NDJSON, RESPONSE_TYPES, UnsupportedFormat, decode, encode, iter_chunks,
+                          request_format)
+
+# Training (lightgbm, tensorflow, sklearn estimators) and plotting (plotly)
+# dependencies are imported inside the methods that use them, so a process
+# that only loads saved models and serves /detect never pays for them.
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -48,19 +75,287 @@ def convert_objectids(data):
     else:
         return data
 
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# User Agent substrings, checked in priority order like the original if/elif chain
+BROWSER_RULES = [("Chrome", ("Chrome",)), ("Safari", ("Safari",)), ("Firefox", ("Firefox",))]
+DEVICE_RULES = [("Mobile", ("Android", "iPhone")), ("Tablet", ("iPad",))]
+BROWSER_COLUMNS = ['Browser_Chrome', 'Browser_Firefox', 'Browser_Safari']
+DEVICE_COLUMNS = ['Device_Mobile', 'Device_Desktop', 'Device_Tablet']
+
+def _parse_timestamps(values):
+    """Convert a Series of timestamps to unix seconds.
+
+    The fixed format used by the dashboard and the training export is tried
+    first; only the rows that fail it go through pandas' format inference.
+    """
+    parsed = pd.to_datetime(values, format=TIMESTAMP_FORMAT, errors='coerce').astype('datetime64[ns]')
+    unparsed = parsed.isna() & values.notna()
+    if unparsed.any():
+        parsed[unparsed] = pd.to_datetime(values[unparsed], format='mixed', utc=True).dt.tz_localize(None)
+    return parsed.astype(np.int64) // 10**9
+
+def _classify(uniques, rules, default):
+    """Label each unique string with the first rule whose substrings it contains"""
+    labels = np.full(len(uniques), default, dtype=object)
+    unmatched = np.ones(len(uniques), dtype=bool)
+    for label, needles in rules:
+        hit = np.zeros(len(uniques), dtype=bool)
+        for needle in needles:
+            hit |= uniques.str.contains(needle, regex=False).to_numpy(dtype=bool)
+        labels[hit & unmatched] = label
+        unmatched &= ~hit
+    return labels
+
+def _encode_user_agents(user_agents):
+    """One-hot browser/device columns for a Series of User Agent strings.
+
+    User Agents repeat heavily, so the rules run once per distinct value and
+    the result is broadcast back through the factorized codes.
+    """
+    codes, uniques = pd.factorize(user_agents)
+    uniques = pd.Series(uniques, dtype=object).astype(str)
+    # Missing User Agents get code -1, which picks the trailing default slot
+    browsers = np.append(_classify(uniques, BROWSER_RULES, "Unknown"), "Unknown")
+    devices = np.append(_classify(uniques, DEVICE_RULES, "Desktop"), "Desktop")
+    encoded = {}
+    for col in BROWSER_COLUMNS:
+        encoded[col] = (browsers == col.split('_', 1)[1]).astype(np.int8)[codes]
+    for col in DEVICE_COLUMNS:
+        encoded[col] = (devices == col.split('_', 1)[1]).astype(np.int8)[codes]
+    return encoded
+
+# Map attack types to integers with better handling of unknown types
+ATTACK_TYPE_MAPPING = {
+    "Malware": 1,
+    "Phishing": 2,
+    "Insider Threat": 3,
+    "Ransomware": 4,
+    "DDoS": 5,
+    "Unknown": 0  # Add default mapping for unknown
+}
+
+def _json_scores(scores):
+    """Scores as JSON-safe floats: overflowed ones clamp to the largest double, NaN becomes None"""
+    scores = np.minimum(np.asarray(scores, dtype=np.float64), np.finfo(np.float64).max)
+    return [None if score != score else score for score in scores.tolist()]
+
+def _map_labels(labels, mapping):
+    """Small-int codes for a Series of text (or categorical) labels, 0 for unknown ones.
+
+    Like _encode_user_agents, the lookup runs once per distinct label.
+    """
+    codes, uniques = pd.factorize(labels)
+    mapped = pd.Series(uniques, dtype=object).map(mapping).fillna(0).to_numpy(dtype=np.int8)
+    return pd.Series(np.append(mapped, np.int8(0))[codes], index=labels.index)
+
+def _encode_attack_types(attack_types):
+    return _map_labels(attack_types, ATTACK_TYPE_MAPPING)
+
+class InvalidRecords(ValueError):
+    """Records whose values cannot be encoded as model features, e.g. an unparseable Timestamp"""
+
+def _encode_records(df):
+    """Encode raw event records as feature columns; the stateless part of preprocess_data"""
+    # Convert timestamp to unix timestamp
+    df["Timestamp"] = _parse_timestamps(df["Timestamp"])
+    
+    # Map severity levels
+    severity_mapping = {"Low": 1, "Medium": 2, "High": 3, "Critical": 4}
+    # Unknown or missing Attack Severity maps to 0
+    df["Attack Severity"] = _map_labels(df["Attack Severity"], severity_mapping)
+    
+    # Convert boolean to int
+    df["Data Exfiltrated"] = df["Data Exfiltrated"].astype(np.int8)
+    
+    # Convert IP addresses to integer columns and derived address features
+    source_ips = parse_ips(df["Source IP"])
+    destination_ips = parse_ips(df["Destination IP"])
+    for col, values in ip_feature_columns("Source IP", source_ips).items():
+        df[col] = values
+    for col, values in ip_feature_columns("Destination IP", destination_ips).items():
+        df[col] = values
+    df["Same Subnet"] = same_subnet(source_ips, destination_ips)
+    
+    # Process User Agent if it exists
+    if "User Agent" in df.columns:
+        # One-hot encode browser and device
+        for col, values in _encode_user_agents(df["User Agent"]).items():
+            df[col] = values
+        
+        # Drop original User Agent column
+        df.drop(columns=['User Agent'], inplace=True)
+    
+    # Map attack types to integers with better handling of unknown types
+    if "Attack Type" in df.columns:
+        df["Attack Type"] = _encode_attack_types(df["Attack Type"])
+    else:
+        df["Attack Type"] = np.int8(0)  # Set default value if column doesn't exist
+    
+    # Drop unnecessary columns if they exist
+    columns_to_drop = ["Threat Intelligence", "Event ID"]
+    df.drop(columns=[col for col in columns_to_drop if col in df.columns], inplace=True)
+    
+    # One-hot encode response actions
+    df = pd.get_dummies(df, columns=['Response Action'], dtype=np.int8)
+    
+    # Ensure all expected columns are present
+    expected_columns = [
+        'Response Action_Blocked', 'Response Action_Contained', 
+        'Response Action_Eradicated', 'Response Action_Recovered', 
+        'Response Action_Monitor'
+    ]
+    for col in expected_columns:
+        if col not in df.columns:
+            df[col] = np.int8(0)
+    return df
+
+# Low-cardinality text columns of training CSVs, read as categoricals
+CSV_DTYPES = {col: 'category' for col in
+              ['Attack Type', 'Attack Severity', 'Response Action', 'User Agent', 'Threat Intelligence']}
+
+# Autoencoder scoring backend: 'numpy' (float32), 'int8' (quantized weights) or 'keras'
+AUTOENCODER_ENGINE = os.environ.get("AUTOENCODER_ENGINE", "numpy")
+
+# Quantile of reconstruction MSE above which the autoencoder flags a record
+AE_THRESHOLD_QUANTILE = float(os.environ.get("AE_THRESHOLD_QUANTILE", "0.95"))
+# Served scores keep updating the threshold, with older scores' weight halving every
+# this many records; 0 keeps the threshold calibrated at training time
+AE_THRESHOLD_HALF_LIFE = int(os.environ.get("AE_THRESHOLD_HALF_LIFE", "1000000"))
+
+# Tree-ensemble scoring backend: 'auto' scores the Isolation Forest from its compiled node
+# arrays and LightGBM with its own predict (the faster pair in benchmarks/bench_trees.py),
+# 'compiled' uses the node arrays for both, 'native' for neither where the fitted model is at hand
+TREE_ENGINE = os.environ.get("TREE_ENGINE", "auto")
+
+# OpenMP threads per LightGBM predict call; 0 uses all cores
+LGBM_PREDICT_THREADS = int(os.environ.get("LGBM_PREDICT_THREADS", "0"))
+
+# Threads for training. Fits that run alone use all of them; train_models fits the three
+# models at once and splits them with training_thread_split
+TRAINING_THREADS = int(os.environ.get("TRAINING_THREADS", "0")) or os.cpu_count()
+
+# Incremental training: boosting rounds added to the LightGBM booster, autoencoder
+# fine-tuning epochs, and the rolling window of rows the Isolation Forest is refit on
+INCREMENTAL_BOOST_ROUNDS = int(os.environ.get("INCREMENTAL_BOOST_ROUNDS", "20"))
+INCREMENTAL_EPOCHS = int(os.environ.get("INCREMENTAL_EPOCHS", "5"))
+ISOLATION_FOREST_WINDOW = int(os.environ.get("ISOLATION_FOREST_WINDOW", "50000"))
+MIN_INCREMENTAL_ROWS = 100
+
+# Sliding-window behavioral features per Source IP, joined in by preprocess_data;
+# BEHAVIOR_FEATURES=0 leaves them out (models trained with them then refuse to load)
+BEHAVIOR_FEATURES = os.environ.get("BEHAVIOR_FEATURES", "1") == "1"
+BEHAVIOR_WINDOW_SECONDS = int(os.environ.get("BEHAVIOR_WINDOW_SECONDS", "300"))
+BEHAVIOR_MAX_ENTITIES = int(os.environ.get("BEHAVIOR_MAX_ENTITIES", "100000"))
+BEHAVIOR_TTL_SECONDS = int(os.environ.get("BEHAVIOR_TTL_SECONDS", "3600"))
+FEATURE_STORE_SNAPSHOT = os.environ.get("FEATURE_STORE_SNAPSHOT", "output/feature_store.pkl")
+
+# Scaled model inputs are float32 (what LightGBM, the Isolation Forest and the autoencoder
+# compute in anyway); COMPACT_FEATURES=0 keeps float64. Rows are scaled in blocks of
+# SCALE_BLOCK_ROWS into one preallocated matrix.
+COMPACT_FEATURES = os.environ.get("COMPACT_FEATURES", "1") == "1"
+FEATURE_DTYPE = np.float32 if COMPACT_FEATURES else np.float64
+SCALE_BLOCK_ROWS = 65536
+
+# Model outputs of recently seen feature rows are reused, per process and model version,
+# up to SCORE_CACHE_MB (0 disables the cache); SCORE_CACHE_TTL_SECONDS > 0 also drops
+# entries that old. The key is the whole scaled row, behavioral columns included.
+SCORE_CACHE_MB = float(os.environ.get("SCORE_CACHE_MB", "32"))
+SCORE_CACHE_TTL_SECONDS = float(os.environ.get("SCORE_CACHE_TTL_SECONDS", "0"))
+
+# Seconds each process reuses an /alerts/stats result before re-aggregating
+ALERT_STATS_CACHE_SECONDS = float(os.environ.get("ALERT_STATS_CACHE_SECONDS", "5"))
+
+DETECT_ROWS = REGISTRY.counter('detect_rows_total', 'Records scored by detect_anomalies')
+DETECT_ALERTS = REGISTRY.counter('detect_alerts_total', 'Alerts raised by detect_anomalies')
+SCORE_CACHE_HITS = REGISTRY.counter('score_cache_hits_total', 'Records whose model outputs came from the score cache')
+SCORE_CACHE_MISSES = REGISTRY.counter('score_cache_misses_total', 'Records looked up in the score cache and scored')
+
+LGBM_PARAMS = {
+    'objective': 'multiclass',
+    'num_class': 6,
+    'metric': 'multi_logloss',
+    'learning_rate': 0.1,
+    'num_leaves': 31,
+    'verbose': -1
+}
+
+def behavior_store():
+    """An empty FeatureStore with the configured window, or None when BEHAVIOR_FEATURES is off"""
+    if not BEHAVIOR_FEATURES:
+        return None
+    return FeatureStore(BEHAVIOR_WINDOW_SECONDS, max_entities=BEHAVIOR_MAX_ENTITIES, ttl_seconds=BEHAVIOR_TTL_SECONDS)
+
+def behavior_features(store, df, timestamps=None):
+    """Add a frame's events to a FeatureStore and return their behavioral features as int32 columns.
+
+    ``timestamps`` are the events' unix seconds; by default df["Timestamp"] is parsed.
+    """
+    if timestamps is None:
+        timestamps = _parse_timestamps(df["Timestamp"])
+    blocked = df["Response Action"] == "Blocked" if "Response Action" in df.columns else False
+    behavior = store.update(timestamps, df["Source IP"], df["Destination IP"], blocked)
+    return {col: values.astype(np.int32) for col, values in behavior.items()}
+
+class IncompatibleModels(ValueError):
+    """Saved models that need feature columns preprocess_data no longer produces"""
+
+# One event in the layout of the training CSV, encoded to list the columns preprocess_data produces
+SCHEMA_RECORD = {
+    "Event ID": 0, "Timestamp": "2024-01-01 00:00:00", "Source IP": "10.0.0.1", "Destination IP": "10.0.0.2",
+    "User Agent": "Mozilla/5.0", "Attack Type": "Unknown", "Attack Severity": "Low", "Data Exfiltrated": False,
+    "Threat Intelligence": "", "Response Action": "Blocked"
+}
+
+def feature_schema():
+    """Feature columns preprocess_data produces for a record in the training CSV layout"""
+    columns = _encode_records(pd.DataFrame([SCHEMA_RECORD])).columns.drop('Attack Type').tolist()
+    if BEHAVIOR_FEATURES:
+        columns += list(BEHAVIOR_COLUMNS)
+    return columns
+
+def check_feature_schema(system):
+    """Raise IncompatibleModels if system's models need columns preprocess_data would only zero-fill.
+
+    The reindex to feature_columns drops columns a model set does not use,
+    but one trained on a replaced feature (the _hi/_lo IP halves, or
+    behavioral columns with BEHAVIOR_FEATURES off) would score constant
+    zeros in their place, so such a version has to be retrained.
+    """
+    if system.feature_columns is None:
+        return
+    produced = set(feature_schema())
+    missing = [col for col in system.feature_columns if col not in produced]
+    if missing:
+        raise IncompatibleModels(f"Model version {system.model_version} was trained on feature columns that "
+                                 f"preprocessing no longer produces: {missing}. Retrain it with POST /train.")
+
+def training_thread_split(threads=TRAINING_THREADS):
+    """Threads for (LightGBM, Isolation Forest, TensorFlow intra-op) when train_models fits them at once"""
+    trees = max(1, threads // 3)
+    return trees, trees, max(1, threads - 2 * trees)
+
 class CyberSecurityDetectionSystem:
-    def __init__(self, mongodb_uri="mongodb://localhost:27017/"):
-        try:
-            self.client = MongoClient(mongodb_uri)
-            self.db = self.client['cybersecurity_db']
-            self.alerts_collection = self.db['alerts']
-        except Exception as e:
-            raise
+    def __init__(self, mongodb_uri="mongodb://localhost:27017/", serving=True):
+        """serving=False is for offline use and pre-fork parents: no alert index builds and no
+        restored behavioral window until start_serving is called"""
+        self.mongodb_uri = mongodb_uri
+        self.connect()
         self.lgbm_model = None
         self.isolation_forest = None
         self.autoencoder = None
+        self.numpy_autoencoder = None  # TensorFlow-free copy of autoencoder used for scoring
+        self.lgbm_engine = None  # Compiled copy of lgbm_model when TREE_ENGINE=compiled
+        self.forest_engine = None  # Isolation Forest used for scoring
+        self.score_cache = None  # Model outputs of recent feature rows, for model_version
         self.scaler = StandardScaler()
         self.feature_columns = None  # Store feature columns used during training
+        self.model_version = None
+        self.training_metadata = {}
+        self.ae_threshold = None  # Autoencoder MSE threshold calibrated on held-out data
+        self.ae_sketch = None  # Streaming quantile sketch of served MSE scores
+        self.training_window = None  # Most recent scaled training rows, refit by incremental training
+        self.feature_store = behavior_store()  # Behavioral aggregates of the events seen so far
         self.severity_mapping = {
             "Low": 1, 
             "Medium": 2, 
@@ -68,92 +363,60 @@ class CyberSecurityDetectionSystem:
             "Critical": 4,
             "Unknown": 0
         }
+        if serving:
+            self.start_serving()
         
-    def preprocess_data(self, df):
-        """Preprocess the cybersecurity data"""
-        # Convert timestamp to unix timestamp
-        df["Timestamp"] = pd.to_datetime(df['Timestamp'])
-        df["Timestamp"] = df["Timestamp"].astype(int) // 10**9
-        
-        # Map severity levels
-        severity_mapping = {"Low": 1, "Medium": 2, "High": 3, "Critical": 4}
-        df["Attack Severity"] = df["Attack Severity"].map(severity_mapping)
-        
-        # Fill NaN values in Attack Severity with a default value (e.g., 0)
-        df["Attack Severity"].fillna(0, inplace=True)
-        
-        # Convert boolean to int
-        df["Data Exfiltrated"] = df["Data Exfiltrated"].astype(int)
-        
-        # Convert IP addresses to integers
-        df["Source IP"] = [int(ipaddress.IPv4Address(ip)) for ip in df["Source IP"]]
-        df["Destination IP"] = [int(ipaddress.IPv4Address(ip)) for ip in df["Destination IP"]]
-        
-        # Process User Agent if it exists
-        if "User Agent" in df.columns:
-            extracted_features = []
-            for ua in df["User Agent"]:
-                browser = "Unknown"
-                device = "Desktop"
-                
-                if "Chrome" in ua:
-                    browser = "Chrome"
-                elif "Safari" in ua and "Chrome" not in ua:
-                    browser = "Safari"
-                elif "Firefox" in ua:
-                    browser = "Firefox"
-                    
-                if "Android" in ua or "iPhone" in ua:
-                    device = "Mobile"
-                elif "iPad" in ua:
-                    device = "Tablet"
-                    
-                extracted_features.append((browser, device))
-                
-            features_df = pd.DataFrame(extracted_features, columns=['Browser', 'Device'])
-            
-            # One-hot encode browser and device
-            df['Browser_Chrome'] = (features_df['Browser'] == 'Chrome').astype(int)
-            df['Browser_Firefox'] = (features_df['Browser'] == 'Firefox').astype(int)
-            df['Browser_Safari'] = (features_df['Browser'] == 'Safari').astype(int)
-            df['Device_Mobile'] = (features_df['Device'] == 'Mobile').astype(int)
-            df['Device_Desktop'] = (features_df['Device'] == 'Desktop').astype(int)
-            df['Device_Tablet'] = (features_df['Device'] == 'Tablet').astype(int)
-            
-            # Drop original User Agent column
-            df.drop(columns=['User Agent'], inplace=True)
-        
-        # Map attack types to integers with better handling of unknown types
-        attack_type_mapping = {
-            "Malware": 1,
-            "Phishing": 2,
-            "Insider Threat": 3,
-            "Ransomware": 4,
-            "DDoS": 5,
-            "Unknown": 0  # Add default mapping for unknown
-        }
-        if "Attack Type" in df.columns:
-            df["Attack Type"] = df["Attack Type"].fillna("Unknown")
-            df["Attack Type"] = df["Attack Type"].apply(lambda x: attack_type_mapping.get(x, 0))
-        else:
-            df["Attack Type"] = 0  # Set default value if column doesn't exist
-        
-        # Drop unnecessary columns if they exist
-        columns_to_drop = ["Threat Intelligence", "Event ID"]
-        df.drop(columns=[col for col in columns_to_drop if col in df.columns], inplace=True)
-        
-        # One-hot encode response actions
-        df = pd.get_dummies(df, columns=['Response Action'])
+    def start_serving(self):
+        """Start the alert index build and restore the behavioral window from its snapshot"""
+        # Index builds wait for the server, so they must not hold up startup
+        threading.Thread(target=self.ensure_indexes, name="alert-indexes", daemon=True).start()
+        if self.feature_store is not None and self.feature_store.restore(FEATURE_STORE_SNAPSHOT):
+            logging.info(f"Restored behavioral features for {len(self.feature_store)} sources")
+
+    def connect(self):
+        """(Re)create the MongoDB client and alert writer.
+
+        MongoClient is not fork-safe, so pre-forked workers call this again
+        after fork; the client itself only connects on first use.
+        """
+        try:
+            self.client = MongoClient(self.mongodb_uri, connect=False)
+            self.db = self.client['cybersecurity_db']
+            self.alerts_collection = self.db['alerts']
+        except Exception as e:
+            raise
+        self.alert_rollups = AlertRollups(self.db['alert_rollups'], ALERT_STATS_CACHE_SECONDS,
+                                          alerts=self.alerts_collection)
+        self.alert_sink = AlertSink(self.alerts_collection, rollups=self.alert_rollups)
+
+    def ensure_indexes(self):
+        """Create the compound indexes the /alerts filters and pagination rely on"""
+        try:
+            for keys in ALERT_INDEXES:
+                self.alerts_collection.create_index(keys)
+        except PyMongoError as e:
+            logging.warning(f"Could not create alert indexes: {e}")
+
+    def preprocess_data(self, df, feature_store=None):
+        """Preprocess the cybersecurity data.
+
+        Behavioral features are joined from feature_store, which the events
+        are added to; without one, preprocessing changes no state and those
+        columns come from df as they are (zero-filled when absent). Every step
+        that can reject a record runs before the feature store sees the
+        events, so a frame that raises InvalidRecords leaves no state behind.
+        """
+        # The behavioral window is keyed on the raw addresses, which encoding replaces
+        events = df[[col for col in ("Source IP", "Destination IP", "Response Action") if col in df.columns]]
+        try:
+            df = _encode_records(df)
+        except (TypeError, ValueError) as e:
+            raise InvalidRecords(str(e)) from e
         
-        # Ensure all expected columns are present
-        expected_columns = [
-            'Response Action_Blocked', 'Response Action_Contained', 
-            'Response Action_Eradicated', 'Response Action_Recovered', 
-            'Response Action_Monitor'
-        ]
-        for col in expected_columns:
-            if col not in df.columns:
-                df[col] = 0
+        # Per-source activity in the sliding window, updated with these events
+        if feature_store is not None:
+            for col, values in behavior_features(feature_store, events, df["Timestamp"]).items():
+                df[col] = values
         
         # Ensure columns are in the same order as during training
         if self.feature_columns is not None:
@@ -161,47 +424,43 @@ class CyberSecurityDetectionSystem:
         
         return df
     
-    def perform_eda(self, df):
-        """Perform Exploratory Data Analysis and return visualizations"""
-        figures = {}
-        
-        # Attack Type Distribution
-        fig_attack_dist = px.pie(df, names='Attack Type', title='Distribution of Attack Types')
-        figures['attack_distribution'] = fig_attack_dist
-        
-        # Attack Severity Over Time
-        fig_severity = px.line(df, x='Timestamp', y='Attack Severity', 
-                             title='Attack Severity Timeline')
-        figures['severity_timeline'] = fig_severity
-        
-        # Device Type Distribution
-        device_dist = df[['Device_Mobile', 'Device_Desktop', 'Device_Tablet']].sum()
-        fig_devices = px.bar(device_dist, title='Device Type Distribution')
-        figures['device_distribution'] = fig_devices
-        
-        # Browser Usage
-        browser_dist = df[['Browser_Chrome', 'Browser_Firefox', 'Browser_Safari']].sum()
-        fig_browsers = px.bar(browser_dist, title='Browser Distribution')
-        figures['browser_distribution'] = fig_browsers
-        
-        # Correlation Heatmap
-        correlation = df.corr()
-        fig_corr = go.Figure(data=go.Heatmap(z=correlation, x=correlation.columns, 
-                                            y=correlation.columns))
-        fig_corr.update_layout(title='Feature Correlation Heatmap')
-        figures['correlation_heatmap'] = fig_corr
-        
-        os.makedirs("output", exist_ok=True)
-        fig_attack_dist.write_image("output/attack_distribution.png")
-        fig_severity.write_image("output/attack_severity_timeline.png")
-        fig_devices.write_image("output/device_type_distribution.png")
-        fig_browsers.write_image("output/browser_distribution.png")
-        fig_corr.write_image("output/feature_correlation_heatmap.png")
-        
-        return figures
+    def eda_summary(self, df=None):
+        """One-pass EDA aggregates of a processed frame, or an empty summary to update chunk by chunk"""
+        names = {code: name for name, code in ATTACK_TYPE_MAPPING.items()}
+        if df is None:
+            return EdaSummary(attack_type_names=names)
+        return EdaSummary.from_frame(df, attack_type_names=names)
+
+    def perform_eda(self, data, source=None, background=False):
+        """Render the EDA figures for processed training data, given as a DataFrame or an EdaSummary.
+
+        Figures are rendered into output/eda/<fingerprint>/ and copied to
+        output/. The fingerprint comes from the source dataset file when given,
+        else from the summary itself; figures already rendered for the same
+        fingerprint are reused. With background=True a detached process
+        renders them. Returns the EDA directory.
+        """
+        summary = data if isinstance(data, EdaSummary) else self.eda_summary(data)
+        if source is not None and os.path.isfile(source):
+            key = fingerprint(source, summary.rows, self.feature_columns)
+        else:
+            key = hashlib.sha1(json.dumps(summary.to_dict(), sort_keys=True).encode()).hexdigest()[:16]
+        directory = summary_directory(key)
+        if figures_ready(directory):
+            logging.info(f"EDA figures for this dataset are already rendered in {directory}")
+            publish_figures(directory, "output")
+            return directory
+        save_summary(summary, directory)
+        if background:
+            render_in_background(directory, publish_to="output")
+        else:
+            render_figures(directory, publish_to="output")
+        return directory
 
     def build_autoencoder(self, input_dim):
         """Build and compile autoencoder model"""
+        from tensorflow.keras import layers, Model
+        
         encoding_dim = 32
         
         input_layer = layers.Input(shape=(input_dim,))
@@ -216,48 +475,296 @@ class CyberSecurityDetectionSystem:
         
         return autoencoder
 
-    def train_models(self, df):
-        """Train all models: LightGBM, Isolation Forest, and Autoencoder"""
-        # Prepare features and target
-        X = df.drop('Attack Type', axis=1)
-        y = df['Attack Type']
+    def _scale(self, X, rows=None):
+        """Standardize the rows of X (all, or the positions in rows) into a new FEATURE_DTYPE matrix.
+
+        Blocks are scaled in float64 like StandardScaler.transform and written
+        into the preallocated result, so no full-size float64 copy is made.
+        """
+        n_rows = len(X) if rows is None else len(rows)
+        scaled = np.empty((n_rows, X.shape[1]), dtype=FEATURE_DTYPE)
+        for start in range(0, n_rows, SCALE_BLOCK_ROWS):
+            stop = min(start + SCALE_BLOCK_ROWS, n_rows)
+            block = X.iloc[start:stop] if rows is None else X.iloc[rows[start:stop]]
+            block = block.to_numpy(dtype=np.float64)
+            block -= self.scaler.mean_
+            block /= self.scaler.scale_
+            scaled[start:stop] = block
+        return scaled
+
+    def _training_matrices(self, df):
+        """Split a preprocessed frame 80/20 and fit the scaler on the training rows.
+
+        Returns scaled (X_train, X_test, y_train, y_test); the split is the one
+        train_test_split(X, y, test_size=0.2, random_state=42) makes.
+        """
+        from sklearn.model_selection import train_test_split
         
-        # Store feature columns
+        X = df.drop(columns='Attack Type')
+        y = df['Attack Type']
         self.feature_columns = X.columns.tolist()
+        train_rows, test_rows = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42)
+        
+        self.scaler = StandardScaler()
+        for start in range(0, len(train_rows), SCALE_BLOCK_ROWS):
+            self.scaler.partial_fit(X.iloc[train_rows[start:start + SCALE_BLOCK_ROWS]])
+        return self._scale(X, train_rows), self._scale(X, test_rows), y.iloc[train_rows], y.iloc[test_rows]
+
+    def train_models(self, df):
+        """Train all models: LightGBM, Isolation Forest, and Autoencoder"""
+        import lightgbm as lgb
+        from sklearn.ensemble import IsolationForest
         
         # Split and scale data
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        X_train_scaled, X_test_scaled, y_train, y_test = self._training_matrices(df)
         
         # Train LightGBM
         train_data = lgb.Dataset(X_train_scaled, label=y_train)
         test_data = lgb.Dataset(X_test_scaled, label=y_test, reference=train_data)
         
-        params = {
-            'objective': 'multiclass',
-            'num_class': 6,
-            'metric': 'multi_logloss',
-            'learning_rate': 0.1,
-            'num_leaves': 31,
-            'verbose': -1
+        # The three fits release the GIL, so LightGBM and the Isolation Forest
+        # train on pool threads while the autoencoder trains on this one, each
+        # on its share of TRAINING_THREADS (training jobs size TensorFlow's pool)
+        lgbm_threads, forest_threads, _ = training_thread_split()
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            lgbm_future = pool.submit(lgb.train, {**LGBM_PARAMS, 'num_threads': lgbm_threads}, train_data,
+                                      num_boost_round=100, valid_sets=[test_data])
+            
+            # Train Isolation Forest
+            self.isolation_forest = IsolationForest(contamination=0.1, random_state=42, n_jobs=forest_threads)
+            forest_future = pool.submit(self.isolation_forest.fit, X_train_scaled)
+            
+            # Train Autoencoder
+            self.autoencoder = self.build_autoencoder(X_train_scaled.shape[1])
+            self.autoencoder.fit(X_train_scaled, X_train_scaled,
+                               epochs=50,
+                               batch_size=32,
+                               shuffle=True,
+                               validation_data=(X_test_scaled, X_test_scaled),
+                               verbose=0)
+            
+            self.lgbm_model = lgbm_future.result()
+            forest_future.result()
+        
+        self.training_window = X_train_scaled[-ISOLATION_FOREST_WINDOW:].astype(np.float32)
+        self.refresh_inference_engines()
+        self.calibrate_autoencoder_threshold(X_test_scaled)
+        
+        self._write_performance_report(X_train_scaled.shape[1])
+        self.training_metadata = self._describe_training('in_memory', len(X_train_scaled), len(X_test_scaled))
+        
+        return {
+            'lgbm': self.lgbm_model,
+            'isolation_forest': self.isolation_forest,
+            'autoencoder': self.autoencoder
         }
+
+    def train_models_streaming(self, csv_path, memory_budget_mb, chunk_rows=None):
+        """Train all models from a CSV in chunks, with peak memory bounded by memory_budget_mb.
+
+        The scaler is fitted incrementally with partial_fit while preprocessed
+        chunks are spilled to disk. LightGBM then reads the spilled rows through
+        a Sequence, the Autoencoder trains from a batch generator over them, and
+        the Isolation Forest fits a reservoir sample. Returns an EdaSummary
+        folded over every chunk.
+        """
+        import lightgbm as lgb
+        from sklearn.ensemble import IsolationForest
+        from streaming import (CHUNK_BUDGET_SHARE, PREPROCESS_OVERHEAD, PROBE_ROWS, RESERVOIR_BUDGET_SHARE,
+                               ReservoirSample, ScaledSequence, SpillFile, rows_for_budget, scaled_batches)
+        
+        budget = memory_budget_mb * 1024 * 1024
+        if chunk_rows is None:
+            probe = pd.read_csv(csv_path, nrows=PROBE_ROWS, dtype=CSV_DTYPES)
+            bytes_per_row = probe.memory_usage(deep=True).sum() / max(len(probe), 1)
+            chunk_rows = rows_for_budget(budget * CHUNK_BUDGET_SHARE, bytes_per_row * PREPROCESS_OVERHEAD)
+        
+        # Split rows into train/test on the fly with the same 80/20 ratio as train_models
+        rng = np.random.default_rng(42)
+        self.feature_columns = None
+        self.scaler = StandardScaler()
+        spill_dir = tempfile.mkdtemp(prefix="training-", dir=os.path.abspath("."))
+        train_file = test_file = None
+        summary = self.eda_summary()
+        # Behavioral features of the training history start from an empty window that spans the chunks
+        store = behavior_store()
+        try:
+            for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, dtype=CSV_DTYPES):
+                processed = self.preprocess_data(chunk, store)
+                if train_file is None:
+                    feature_columns = processed.columns.drop('Attack Type').tolist()
+                    n_columns = len(feature_columns) + 1
+                    train_file = SpillFile(os.path.join(spill_dir, "train.f64"), n_columns)
+                    test_file = SpillFile(os.path.join(spill_dir, "test.f64"), n_columns)
+                    reservoir_rows = rows_for_budget(budget * RESERVOIR_BUDGET_SHARE, n_columns * 8)
+                    train_sample = ReservoirSample(reservoir_rows, n_columns, seed=42)
+                    test_sample = ReservoirSample(max(reservoir_rows // 4, 1), n_columns, seed=43)
+                # The label is stored as the last column of each spilled row
+                rows = processed.reindex(columns=feature_columns + ['Attack Type'], fill_value=0)
+                summary.update(rows)
+                rows = rows.to_numpy(dtype=np.float64)
+                is_test = rng.random(len(rows)) < 0.2
+                if not is_test.all():
+                    self.scaler.partial_fit(rows[~is_test, :-1])
+                train_file.append(rows[~is_test])
+                test_file.append(rows[is_test])
+                train_sample.add(rows[~is_test])
+                test_sample.add(rows[is_test])
+            if train_file is None:
+                raise ValueError(f"No rows found in {csv_path}")
+            
+            self.feature_columns = feature_columns
+            train_rows = train_file.open()
+            test_rows = test_file.open()
+            
+            # Train LightGBM from the disk-backed rows
+            train_data = lgb.Dataset(ScaledSequence(train_rows[:, :-1], self.scaler),
+                                     label=np.asarray(train_rows[:, -1], dtype=np.float32))
+            test_data = lgb.Dataset(ScaledSequence(test_rows[:, :-1], self.scaler),
+                                    label=np.asarray(test_rows[:, -1], dtype=np.float32),
+                                    reference=train_data)
+            self.lgbm_model = lgb.train({**LGBM_PARAMS, 'num_threads': TRAINING_THREADS}, train_data,
+                                        num_boost_round=100, valid_sets=[test_data])
+            
+            # Train Isolation Forest on the reservoir sample
+            self.isolation_forest = IsolationForest(contamination=0.1, random_state=42, n_jobs=TRAINING_THREADS)
+            sample_scaled = self.scaler.transform(train_sample.sample()[:, :-1])
+            self.isolation_forest.fit(sample_scaled)
+            self.training_window = sample_scaled[-ISOLATION_FOREST_WINDOW:].astype(np.float32)
+            
+            # Train Autoencoder from a generator over the spilled rows
+            batch_size = 32
+            block_rows = min(chunk_rows, len(train_rows))
+            full_blocks, tail = divmod(len(train_rows), block_rows)
+            steps_per_epoch = full_blocks * -(-block_rows // batch_size) + -(-tail // batch_size)
+            validation = self.scaler.transform(test_sample.sample()[:, :-1])
+            self.autoencoder = self.build_autoencoder(len(feature_columns))
+            self.autoencoder.fit(scaled_batches(train_rows[:, :-1], self.scaler, batch_size, block_rows),
+                                 steps_per_epoch=steps_per_epoch,
+                                 epochs=50,
+                                 shuffle=False,
+                                 validation_data=(validation, validation) if len(validation) else None,
+                                 verbose=0)
+            
+            self.refresh_inference_engines()
+            self.calibrate_autoencoder_threshold(validation)
+            
+            self._write_performance_report(len(feature_columns))
+            self.training_metadata = self._describe_training('streaming', len(train_rows), len(test_rows))
+            
+            return summary
+        finally:
+            for spill in (train_file, test_file):
+                if spill is not None:
+                    spill.remove()
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+    def train_models_incremental(self, df):
+        """Update the loaded models with newly labeled events instead of retraining from scratch.
+
+        The scaler stays fixed so existing trees and weights keep their meaning.
+        LightGBM continues boosting the current booster, the Autoencoder
+        fine-tunes from its current weights, and the Isolation Forest is refit
+        on the rolling window of recent rows. Previous and updated models are
+        scored on the same held-out split of the new events.
+        """
+        import lightgbm as lgb
+        from sklearn.ensemble import IsolationForest
+        from sklearn.model_selection import train_test_split
+        
+        if self.lgbm_model is None or self.feature_columns is None:
+            raise ValueError("Incremental training needs a trained model set; run a full training first.")
+        if len(df) < MIN_INCREMENTAL_ROWS:
+            raise ValueError(f"Only {len(df)} new labeled events, need at least {MIN_INCREMENTAL_ROWS}")
         
-        self.lgbm_model = lgb.train(params, train_data, num_boost_round=100, valid_sets=[test_data])
+        y = _encode_attack_types(df['Attack Type']) if 'Attack Type' in df.columns else pd.Series(0, index=df.index)
+        X = self.preprocess_data(df.copy(deep=False), behavior_store())[self.feature_columns]
+        train_rows, test_rows = train_test_split(np.arange(len(X)), test_size=0.2, random_state=42)
+        X_train_scaled = self._scale(X, train_rows)
+        X_test_scaled = self._scale(X, test_rows)
+        y_train, y_test = y.iloc[train_rows], y.iloc[test_rows]
+        previous = self._holdout_metrics(X_test_scaled, y_test)
         
-        # Train Isolation Forest
-        self.isolation_forest = IsolationForest(contamination=0.1, random_state=42)
-        self.isolation_forest.fit(X_train_scaled)
+        # Continue boosting from the current booster
+        train_data = lgb.Dataset(X_train_scaled, label=y_train)
+        test_data = lgb.Dataset(X_test_scaled, label=y_test, reference=train_data)
+        lgbm_model = lgb.train({**LGBM_PARAMS, 'num_threads': TRAINING_THREADS}, train_data,
+                               num_boost_round=INCREMENTAL_BOOST_ROUNDS, init_model=self.lgbm_model,
+                               valid_sets=[test_data])
         
-        # Train Autoencoder
-        self.autoencoder = self.build_autoencoder(X_train_scaled.shape[1])
-        self.autoencoder.fit(X_train_scaled, X_train_scaled,
-                           epochs=50,
-                           batch_size=32,
-                           shuffle=True,
-                           validation_data=(X_test_scaled, X_test_scaled),
-                           verbose=0)
+        # Refit the Isolation Forest on the most recent rows
+        window = X_train_scaled.astype(np.float32)
+        if self.training_window is not None:
+            window = np.concatenate([np.asarray(self.training_window), window])
+        window = window[-ISOLATION_FOREST_WINDOW:]
+        isolation_forest = IsolationForest(contamination=0.1, random_state=42, n_jobs=TRAINING_THREADS)
+        isolation_forest.fit(window)
         
+        # Fine-tune the Autoencoder from its current weights
+        autoencoder = self.autoencoder if self.autoencoder is not None else self._keras_autoencoder()
+        autoencoder.fit(X_train_scaled, X_train_scaled,
+                        epochs=INCREMENTAL_EPOCHS,
+                        batch_size=32,
+                        shuffle=True,
+                        validation_data=(X_test_scaled, X_test_scaled),
+                        verbose=0)
+        
+        base_version = self.model_version
+        self.lgbm_model = lgbm_model
+        self.isolation_forest = isolation_forest
+        self.autoencoder = autoencoder
+        self.training_window = window
+        self.refresh_inference_engines()
+        self.calibrate_autoencoder_threshold(X_test_scaled)
+        current = self._holdout_metrics(X_test_scaled, y_test)
+        
+        self._write_performance_report(len(self.feature_columns), {'previous': previous, 'current': current})
+        self.training_metadata = {
+            **self._describe_training('incremental', len(X_train_scaled), len(X_test_scaled)),
+            'base_version': base_version,
+            'boost_rounds_added': INCREMENTAL_BOOST_ROUNDS,
+            'holdout_comparison': {'previous': previous, 'current': current}
+        }
+        return {'previous': previous, 'current': current}
+
+    def _keras_autoencoder(self):
+        """Trainable Keras autoencoder initialized from the serving weights"""
+        arrays = self.numpy_autoencoder.to_arrays()
+        autoencoder = self.build_autoencoder(len(self.feature_columns))
+        weights = []
+        for i in range(len(arrays['activations'])):
+            weights += [arrays[f'w{i}'], arrays[f'b{i}']]
+        autoencoder.set_weights(weights)
+        return autoencoder
+
+    def _holdout_metrics(self, X_scaled, y):
+        """Quality of the current models on held-out scaled rows"""
+        y = np.asarray(y)
+        probabilities = self.lgbm_model.predict(X_scaled, num_threads=TRAINING_THREADS)
+        clipped = np.clip(probabilities[np.arange(len(y)), y], 1e-15, 1.0)
+        ae_mse = self._reconstruction_error(X_scaled)
+        metrics = {
+            'lgbm_accuracy': float((probabilities.argmax(axis=1) == y).mean()),
+            'lgbm_multi_logloss': float(-np.log(clipped).mean()),
+            'isolation_forest_anomaly_rate': float((self.isolation_forest.predict(X_scaled) == -1).mean()),
+            'autoencoder_mean_mse': float(ae_mse.mean())
+        }
+        if self.ae_threshold is not None:
+            metrics['autoencoder_anomaly_rate'] = float((ae_mse > self.ae_threshold).mean())
+        return metrics
+
+    def _describe_training(self, mode, train_rows, test_rows):
+        """Training metadata recorded in the saved model manifest"""
+        return {
+            'mode': mode,
+            'trained_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'train_rows': int(train_rows),
+            'test_rows': int(test_rows),
+            'lgbm_params': LGBM_PARAMS,
+            'lgbm_best_score': {name: dict(scores) for name, scores in self.lgbm_model.best_score.items()}
+        }
+
+    def _write_performance_report(self, input_dim, comparison=None):
         os.makedirs("output", exist_ok=True)
         with open("output/model_performance.txt", "w") as f:
             f.write("Models trained successfully!\n")
@@ -267,128 +774,294 @@ class CyberSecurityDetectionSystem:
             f.write("\nIsolation Forest Model:\n")
             f.write(f"Number of Estimators: {self.isolation_forest.n_estimators}\n")
             f.write("\nAutoencoder Model:\n")
-            f.write(f"Input Dimension: {X_train_scaled.shape[1]}\n")
+            f.write(f"Input Dimension: {input_dim}\n")
             f.write(f"Encoding Dimension: 32\n")
+            f.write(f"Anomaly Threshold (p{AE_THRESHOLD_QUANTILE * 100:g} MSE): {self.ae_threshold}\n")
+            if comparison:
+                f.write(f"\nHeld-out comparison with version {self.model_version}:\n")
+                for metric, before in comparison['previous'].items():
+                    f.write(f"{metric}: {before:.6f} -> {comparison['current'].get(metric, float('nan')):.6f}\n")
+
+    def _convert_severities_to_int(self, severities):
+        """Vectorized severity conversion: numeric values are truncated, labels are mapped"""
+        numeric = pd.to_numeric(severities, errors='coerce')
+        mapped = severities.map(self.severity_mapping)
+        return numeric.where(numeric.notna(), mapped).fillna(0).to_numpy().astype(np.int64)
+
+    def _build_alerts(self, new_data, lgbm_predictions, if_predictions, ae_mse, ae_threshold, created_at=None):
+        """Assemble JSON-native alert records for the anomalous rows of a batch.
+
+        Returns the alerts and the positions of the rows they were raised for.
+        """
+        confidence = lgbm_predictions.max(axis=1)
+        if_anomaly = if_predictions == -1
+        ae_anomaly = ae_mse > ae_threshold
+        # Combine predictions
+        rows = np.flatnonzero((confidence > 0.8) | if_anomaly | ae_anomaly)
+        if not len(rows):
+            return [], rows
         
-        return {
-            'lgbm': self.lgbm_model,
-            'isolation_forest': self.isolation_forest,
-            'autoencoder': self.autoencoder
+        # Convert IP addresses once for the alerted rows
+        source = new_data['Source IP'].iloc[rows]
+        destination = new_data['Destination IP'].iloc[rows]
+        source_ips = parse_ips(source)
+        destination_ips = parse_ips(destination)
+        invalid_ips = int((source_ips.version == 0).sum() + (destination_ips.version == 0).sum())
+        if invalid_ips:
+            logging.warning(f"{invalid_ips} invalid IP addresses in alerts, using default value")
+        
+        columns = {
+            'source_ip': alert_values(source, source_ips).tolist(),
+            'destination_ip': alert_values(destination, destination_ips).tolist(),
+            'attack_type': lgbm_predictions[rows].argmax(axis=1).tolist(),
+            'confidence': confidence[rows].tolist(),
+            'severity': self._convert_severities_to_int(new_data['Attack Severity'].iloc[rows]).tolist(),
+            'isolation_forest_anomaly': if_anomaly[rows].tolist(),
+            'autoencoder_anomaly': ae_anomaly[rows].tolist(),
+            'autoencoder_score': _json_scores(ae_mse[rows])
         }
+        created_at = created_at or datetime.datetime.now().replace(microsecond=0)
+        timestamp = created_at.strftime('%Y-%m-%d %H:%M:%S')
+        keys = ['timestamp'] + list(columns)
+        return [dict(zip(keys, (timestamp,) + values)) for values in zip(*columns.values())], rows
 
-    def _convert_ip_to_int(self, ip_str):
-        """Helper function to convert IP address string to integer"""
-        try:
-            return int(ipaddress.IPv4Address(ip_str))
-        except:
-            # Return a default value or raise an error
-            logging.warning(f"Invalid IP address: {ip_str}, using default value")
-            return 0
-
-    def _convert_severity_to_int(self, severity_str):
-        """Helper function to convert severity string to integer"""
-        try:
-            # First try direct integer conversion
-            return int(severity_str)
-        except (ValueError, TypeError):
-            # If that fails, try mapping the string
-            return self.severity_mapping.get(severity_str, 0)
-
-    def _prepare_alert_for_json(self, alert):
-        """Convert alert data to JSON serializable format"""
-        serializable_alert = alert.copy()
-        # Convert ObjectId to string if present
-        if '_id' in serializable_alert:
-            serializable_alert['_id'] = str(serializable_alert['_id'])
-        # Ensure all numeric types are native Python types
-        for key, value in serializable_alert.items():
-            if isinstance(value, np.integer):
-                serializable_alert[key] = int(value)
-            elif isinstance(value, np.floating):
-                serializable_alert[key] = float(value)
-        return serializable_alert
-
-    def detect_anomalies(self, new_data):
-        """Detect anomalies using all three models"""
+    def refresh_inference_engines(self, numpy_autoencoder=None):
+        """Rebuild the serving-side copies of the trained models"""
+        if numpy_autoencoder is None and self.autoencoder is not None and AUTOENCODER_ENGINE != 'keras':
+            numpy_autoencoder = NumpyAutoencoder.from_keras(self.autoencoder)
+        if numpy_autoencoder is not None and AUTOENCODER_ENGINE == 'int8':
+            numpy_autoencoder = numpy_autoencoder.quantize()
+        self.numpy_autoencoder = numpy_autoencoder
+        
+        forest = self.isolation_forest
+        if forest is not None and TREE_ENGINE != 'native' and not isinstance(forest, CompiledIsolationForest):
+            forest = CompiledIsolationForest.from_sklearn(forest)
+        self.forest_engine = forest
+        self.score_cache = None
+        self.lgbm_engine = None
+        if self.lgbm_model is not None and TREE_ENGINE == 'compiled':
+            try:
+                self.lgbm_engine = CompiledLightGBM.from_booster(self.lgbm_model)
+            except ValueError as e:
+                logging.warning(f"Scoring LightGBM with its own predict: {e}")
+
+    def _lgbm_predict(self, scaled_data):
+        if self.lgbm_engine is not None:
+            return self.lgbm_engine.predict(scaled_data)
+        return self.lgbm_model.predict(scaled_data, num_threads=LGBM_PREDICT_THREADS)
+
+    def _forest_predict(self, scaled_data):
+        forest = self.forest_engine if self.forest_engine is not None else self.isolation_forest
+        return forest.predict(scaled_data)
+
+    def _autoencoder_predict(self, scaled_data):
+        if self.numpy_autoencoder is not None:
+            return self.numpy_autoencoder.predict(scaled_data)
+        return self.autoencoder.predict(scaled_data, verbose=0)
+
+    def _reconstruction_error(self, scaled_data):
+        ae_predictions = self._autoencoder_predict(scaled_data)
+        return np.mean(np.power(scaled_data - ae_predictions, 2), axis=1)
+
+    def calibrate_autoencoder_threshold(self, holdout_scaled):
+        """Fix the autoencoder threshold on held-out data and seed the serving-time sketch"""
+        if not len(holdout_scaled):
+            return
+        holdout_mse = self._reconstruction_error(holdout_scaled)
+        self.ae_threshold = float(np.percentile(holdout_mse, AE_THRESHOLD_QUANTILE * 100))
+        self.ae_sketch = QuantileSketch(half_life=AE_THRESHOLD_HALF_LIFE)
+        self.ae_sketch.add(holdout_mse)
+
+    def _autoencoder_threshold(self, ae_mse, adapt=True):
+        """Threshold for this batch; the batch's scores then update the sketch.
+
+        With adapt=False the threshold calibrated at training time is used and
+        the sketch is left alone, so results do not depend on scoring order.
+        """
+        threshold = self.ae_threshold
+        if adapt and self.ae_sketch is not None and AE_THRESHOLD_HALF_LIFE:
+            threshold = self.ae_sketch.quantile(AE_THRESHOLD_QUANTILE)
+            self.ae_sketch.add(ae_mse)
+        if threshold is None:
+            # Models saved before calibration existed fall back to the batch percentile
+            threshold = np.percentile(ae_mse, AE_THRESHOLD_QUANTILE * 100)
+        return threshold
+
+    def _predict(self, new_data, serving=True):
+        """Raw outputs of the three models for a batch of records.
+
+        serving=True adds the records to the behavioral window and the
+        threshold sketch; serving=False scores them without changing either.
+        """
+        if self.feature_columns is None:
+            raise ValueError("Feature columns are not set. Models need to be trained first.")
+        
+        with time_stage('preprocess'):
+            # preprocess_data replaces columns rather than writing into them, so a shallow
+            # copy keeps the caller's frame intact; it also reindexes to feature_columns
+            feature_data = self.preprocess_data(new_data.copy(deep=False), self.feature_store if serving else None)
+        
+        with time_stage('scale'):
+            scaled_data = self._scale(feature_data)
+        
+        if SCORE_CACHE_MB > 0:
+            lgbm_predictions, if_predictions, ae_mse = self._run_models_cached(scaled_data)
+        else:
+            lgbm_predictions, if_predictions, ae_mse = self._run_models(scaled_data)
+        # The threshold adapts over time, so it is applied to cached scores as well
+        ae_threshold = self._autoencoder_threshold(ae_mse, serving)
+        return lgbm_predictions, if_predictions, ae_mse, ae_threshold
+
+    def _run_models(self, scaled_data):
+        # LightGBM predictions
+        with time_stage('lightgbm'):
+            lgbm_predictions = self._lgbm_predict(scaled_data)
+        
+        # Isolation Forest predictions
+        with time_stage('isolation_forest'):
+            if_predictions = self._forest_predict(scaled_data)
+        
+        # Autoencoder predictions
+        with time_stage('autoencoder'):
+            ae_mse = self._reconstruction_error(scaled_data)
+        return lgbm_predictions, if_predictions, ae_mse
+
+    def _run_models_cached(self, scaled_data):
+        """_run_models for the rows not in the score cache; rows repeated within the batch are scored once"""
+        if not len(scaled_data):
+            return self._run_models(scaled_data)
+        cache = self.score_cache
+        if cache is None or cache.version != self.model_version:
+            # New models (retrained, saved as a new version or reloaded) start an empty cache
+            cache = self.score_cache = ScoreCache(self.model_version, SCORE_CACHE_MB * 2**20,
+                                                  SCORE_CACHE_TTL_SECONDS)
+        with time_stage('score_cache'):
+            keys = cache.keys(scaled_data)
+            hit, cached = cache.lookup(keys)
+            misses = {}
+            for position in np.flatnonzero(~hit).tolist():
+                misses.setdefault(keys[position], []).append(position)
+        hits = int(hit.sum())
+        SCORE_CACHE_HITS.inc(hits)
+        SCORE_CACHE_MISSES.inc(len(keys) - hits)
+        if not misses:
+            outputs = cached
+        else:
+            groups = list(misses.values())
+            lgbm_predictions, if_predictions, ae_mse = self._run_models(scaled_data[[group[0] for group in groups]])
+            scored = np.column_stack([lgbm_predictions, if_predictions, ae_mse]).astype(np.float64)
+            cache.store(list(misses), scored)
+            outputs = np.empty((len(scaled_data), scored.shape[1]))
+            if cached is not None:
+                outputs[hit] = cached
+            outputs[np.concatenate(groups)] = np.repeat(scored, [len(group) for group in groups], axis=0)
+        return outputs[:, :-2], outputs[:, -2].astype(int), outputs[:, -1].astype(scaled_data.dtype)
+
+    def score_batch(self, new_data):
+        """Per-record scores and alert flags as a DataFrame, without storing alerts.
+
+        Used for offline scoring: the autoencoder threshold stays at its
+        calibrated value so every chunk is judged the same way, and the
+        behavioral columns come with new_data rather than from the serving window.
+        """
+        lgbm_predictions, if_predictions, ae_mse, ae_threshold = self._predict(new_data, serving=False)
+        confidence = lgbm_predictions.max(axis=1)
+        scores = pd.DataFrame({
+            'attack_type': lgbm_predictions.argmax(axis=1),
+            'confidence': confidence,
+            'severity': self._convert_severities_to_int(new_data['Attack Severity']),
+            'isolation_forest_anomaly': if_predictions == -1,
+            'autoencoder_anomaly': ae_mse > ae_threshold,
+            'autoencoder_score': ae_mse.astype(float)
+        }, index=new_data.index)
+        scores['alert'] = (confidence > 0.8) | scores['isolation_forest_anomaly'] | scores['autoencoder_anomaly']
+        DETECT_ROWS.inc(len(new_data))
+        DETECT_ALERTS.inc(int(scores['alert'].sum()))
+        return scores
+
+    def detect_anomalies(self, new_data, return_rows=False):
+        """Detect anomalies using all three models.
+
+        With return_rows=True, also returns the position in new_data of the
+        row behind each alert.
+        """
         try:
-            processed_data = self.preprocess_data(new_data.copy())  # Make a copy to avoid warnings
-            
-            # Get features excluding Attack Type if it exists
-            feature_data = processed_data.copy()
-            if 'Attack Type' in feature_data.columns:
-                feature_data = feature_data.drop('Attack Type', axis=1)
-            
-            # Ensure all expected columns are present
-            if self.feature_columns is None:
-                raise ValueError("Feature columns are not set. Models need to be trained first.")
-            
-            # Add missing columns with zeros
-            for col in self.feature_columns:
-                if col not in feature_data.columns:
-                    feature_data[col] = 0
-            
-            # Keep only the columns used during training
-            feature_data = feature_data[self.feature_columns]
-            
-            scaled_data = self.scaler.transform(feature_data)
+            lgbm_predictions, if_predictions, ae_mse, ae_threshold = self._predict(new_data)
             
-            # LightGBM predictions
-            lgbm_predictions = self.lgbm_model.predict(scaled_data)
-            lgbm_labels = [int(np.argmax(prob)) for prob in lgbm_predictions]
-            
-            # Isolation Forest predictions
-            if_predictions = self.isolation_forest.predict(scaled_data)
-            
-            # Autoencoder predictions
-            ae_predictions = self.autoencoder.predict(scaled_data)
-            ae_mse = np.mean(np.power(scaled_data - ae_predictions, 2), axis=1)
-            ae_threshold = np.percentile(ae_mse, 95)
-            
-            alerts = []
-            for idx in range(len(new_data)):
-                # Combine predictions
-                is_anomaly = (
-                    float(np.max(lgbm_predictions[idx])) > 0.8 or
-                    if_predictions[idx] == -1 or
-                    ae_mse[idx] > ae_threshold
-                )
-                
-                if is_anomaly:
-                    alert = {
-                        'timestamp': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                        'source_ip': self._convert_ip_to_int(new_data.iloc[idx]['Source IP']),
-                        'destination_ip': self._convert_ip_to_int(new_data.iloc[idx]['Destination IP']),
-                        'attack_type': int(lgbm_labels[idx]),
-                        'confidence': float(np.max(lgbm_predictions[idx])),
-                        'severity': self._convert_severity_to_int(new_data.iloc[idx]['Attack Severity']),
-                        'isolation_forest_anomaly': bool(if_predictions[idx] == -1),
-                        'autoencoder_anomaly': bool(ae_mse[idx] > ae_threshold),
-                        'autoencoder_score': float(ae_mse[idx])
-                    }
-                    alerts.append(alert)
-                    
+            with time_stage('alerts'):
+                # Local wall-clock time, as in the formatted alert timestamps; stored as a BSON date
+                created_at = datetime.datetime.now().replace(microsecond=0)
+                alerts, rows = self._build_alerts(new_data, lgbm_predictions, if_predictions, ae_mse, ae_threshold,
+                                                  created_at)
+            DETECT_ROWS.inc(len(new_data))
+            DETECT_ALERTS.inc(len(alerts))
             if alerts:
-                # Insert alerts into MongoDB
-                inserted_alerts = self.alerts_collection.insert_many(alerts)
-                # Convert alerts to JSON serializable format
-                json_alerts = [self._prepare_alert_for_json(alert) for alert in alerts]
-                return json_alerts
-            
-            return []
+                # Hand alerts to the background writer with client-side ObjectIds
+                documents = []
+                for alert in alerts:
+                    object_id = ObjectId()
+                    documents.append({**alert, '_id': object_id, 'timestamp': created_at})
+                    alert['_id'] = str(object_id)
+                self.alert_sink.submit(documents)
+            if return_rows:
+                return alerts, rows
+            return alerts
         
         except Exception as e:
             logging.error(f"Error in detect_anomalies: {str(e)}", exc_info=True)
             raise
     
-    def get_recent_alerts(self, limit=10):
-        """Retrieve recent alerts from MongoDB"""
-        alerts = list(self.alerts_collection.find().sort('timestamp', -1).limit(limit))
+    def shutdown(self):
+        """Flush pending alerts to MongoDB and snapshot the feature store before the process exits"""
+        self.alert_sink.close()
+        logging.info(f"Alert sink closed: {self.alert_sink.stats()}")
+        if self.feature_store is not None and len(self.feature_store):
+            self.feature_store.snapshot(FEATURE_STORE_SNAPSHOT)
+
+    def find_alerts(self, query=None, cursor=None, limit=DEFAULT_LIMIT):
+        """Newest alerts matching query, one keyset page at a time.
+
+        Returns the page and the cursor for the next one (None on the last page).
+        """
+        query = query or {}
+        if cursor:
+            query = after_cursor(query, cursor)
+        alerts = list(self.alerts_collection.find(query).sort(SORT).limit(limit + 1))
+        next_cursor = None
+        if len(alerts) > limit:
+            alerts = alerts[:limit]
+            if isinstance(alerts[-1].get('timestamp'), datetime.datetime):
+                next_cursor = encode_cursor(alerts[-1])
         converted = convert_objectids(alerts)
         # Convert timestamps to consistent format
         for alert in converted:
             if isinstance(alert['timestamp'], datetime.datetime):
                 alert['timestamp'] = alert['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
-        return converted
+        return converted, next_cursor
+
+    def get_recent_alerts(self, limit=10):
+        """Retrieve recent alerts from MongoDB"""
+        return self.find_alerts(limit=limit)[0]
+
+    def migrate_alert_timestamps(self):
+        """Convert alerts stored with string timestamps by earlier releases to BSON dates"""
+        result = self.alerts_collection.update_many(
+            {'timestamp': {'$type': 'string'}},
+            [{'$set': {'timestamp': {'$dateFromString': {'dateString': '$timestamp',
+                                                         'format': '%Y-%m-%d %H:%M:%S'}}}}])
+        return result.modified_count
+
+    def alert_stats(self, start=None, end=None, bucket='hour', timeline=True):
+        """Alert counts by severity, attack type and (with timeline) time bucket, from the per-minute rollups"""
+        return self.alert_rollups.stats(
+            start, end, bucket,
+            severity_names={code: name for name, code in self.severity_mapping.items()},
+            attack_type_names={code: name for name, code in ATTACK_TYPE_MAPPING.items()},
+            timeline=timeline)
+
+    def rebuild_alert_rollups(self):
+        """Recompute the rollups from stored alerts, e.g. after migrate_alert_timestamps"""
+        self.alert_rollups.rebuild(self.alerts_collection)
 
 def json_serializable(obj):
     """Convert MongoDB ObjectId to string for JSON serialization."""
@@ -398,38 +1071,206 @@ def json_serializable(obj):
 
 # Add global variable for system instance
 system = None
+batcher = None
+
+# Allows POST /debug/profile and the SIGUSR2 profiler toggle
+PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "0") == "1"
+
+REQUEST_SECONDS = REGISTRY.histogram('http_request_seconds', 'HTTP request latency by endpoint', label='endpoint')
+REQUESTS = REGISTRY.counter('http_requests_total', 'HTTP requests by endpoint and status',
+                            label=('endpoint', 'status'))
+REQUEST_ROWS = REGISTRY.histogram('detect_request_rows', 'Records per /detect request', buckets=BATCH_SIZE_BUCKETS)
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        REQUEST_SECONDS.labels(request.endpoint).observe(time.perf_counter() - started)
+    REQUESTS.labels((request.endpoint, response.status_code)).inc()
+    return response
+
+@REGISTRY.collector
+def _service_metrics():
+    lines = []
+    if system is not None:
+        lines += render_value('model_info', 'Model version being served', 1, version=system.model_version)
+        if system.ae_threshold is not None:
+            lines += render_value('autoencoder_threshold', 'Reconstruction error threshold at training time',
+                                  system.ae_threshold)
+        sink = system.alert_sink.stats()
+        lines += render_value('alert_queue_depth', 'Alerts waiting for the MongoDB writer', sink['queue_depth'])
+        lines += render_value('alerts_inserted_total', 'Alerts written to MongoDB by this process', sink['inserted'],
+                              kind='counter')
+        lines += render_value('alerts_spilled_total', 'Alerts spilled to disk by this process', sink['spilled'],
+                              kind='counter')
+        if system.feature_store is not None:
+            store = system.feature_store.stats()
+            lines += render_value('feature_store_sources', 'Source IPs tracked by the behavioral feature store',
+                                  store['sources'])
+            lines += render_value('feature_store_evicted_total', 'Sources evicted from the feature store by LRU or TTL',
+                                  store['evicted'], kind='counter')
+        if system.score_cache is not None:
+            cache = system.score_cache.stats()
+            lines += render_value('score_cache_entries', 'Feature rows in the score cache', cache['entries'])
+            lines += render_value('score_cache_bytes', 'Approximate memory held by the score cache', cache['bytes'])
+            lines += render_value('score_cache_hit_ratio', 'Share of records served from the score cache since the '
+                                  'current model version was loaded', cache['hit_ratio'])
+            lines += render_value('score_cache_evicted_total', 'Score cache entries evicted for the memory cap',
+                                  cache['evicted'], kind='counter')
+        rollups = system.alert_rollups
+        lines += render_value('alert_stats_cache_hits_total', '/alerts/stats answers served from cache',
+                              rollups.hits, kind='counter')
+        lines += render_value('alert_stats_cache_misses_total', '/alerts/stats answers aggregated in MongoDB',
+                              rollups.misses, kind='counter')
+    if batcher is not None:
+        for name, help, histogram in [
+                ('detect_batch_rows', 'Records per micro-batch', batcher.batch_rows),
+                ('detect_batch_requests', 'Requests per micro-batch', batcher.batch_requests),
+                ('detect_queue_delay_ms', 'Time requests waited for their micro-batch', batcher.queue_delay_ms)]:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} histogram"] + render_histogram(name, histogram)
+    return lines
+
+# Concurrent /detect requests are scored together for up to this long; 0 disables batching
+DETECT_MAX_WAIT_MS = float(os.environ.get("DETECT_MAX_WAIT_MS", "2"))
+DETECT_MAX_BATCH_ROWS = int(os.environ.get("DETECT_MAX_BATCH_ROWS", "1024"))
+# Records per detect_anomalies call for /detect/bulk
+BULK_CHUNK_ROWS = int(os.environ.get("BULK_CHUNK_ROWS", "1000"))
+
+DATASET_PATH = "cybersecurity_dataset.csv"
+# Set to train out-of-core with peak memory bounded by this many MB instead of loading the whole CSV
+TRAINING_MEMORY_BUDGET_MB = int(os.environ.get("TRAINING_MEMORY_BUDGET_MB", "0")) or None
+
+def train_from_csv(system, csv_path=DATASET_PATH, memory_budget_mb=TRAINING_MEMORY_BUDGET_MB):
+    """Train the system from a CSV, streaming it when a memory budget is set.
+
+    Returns an EdaSummary of the processed training data for perform_eda.
+    """
+    if memory_budget_mb:
+        summary = system.train_models_streaming(csv_path, memory_budget_mb)
+    else:
+        system.feature_columns = None
+        df = pd.read_csv(csv_path, dtype=CSV_DTYPES)
+        # Behavioral features of the training history start from an empty window
+        processed_df = system.preprocess_data(df, behavior_store())
+        system.train_models(processed_df)
+        summary = system.eda_summary(processed_df)
+    # Incremental training from this CSV continues after the rows trained on here
+    rows = system.training_metadata['train_rows'] + system.training_metadata['test_rows']
+    system.training_metadata['event_source'] = {'source': csv_path, 'watermark': rows}
+    return summary
+
+# Where incremental training reads newly labeled events: an appended CSV or
+# Parquet file, or mongodb:<collection> in the service database
+INCREMENTAL_SOURCE = os.environ.get("INCREMENTAL_SOURCE", "mongodb:labeled_events")
+
+def train_incremental(system, source=INCREMENTAL_SOURCE):
+    """Update the published model set with the events that arrived in source since it was trained.
+
+    Returns the held-out metrics of the previous and the updated models.
+    """
+    if not load_models(system):
+        raise FileNotFoundError("No saved models to update; run a full training first")
+    if system.autoencoder is None and artifact_store.manifest(system.model_version)['autoencoder']['keras']:
+        system.autoencoder = artifact_store.load_keras_autoencoder(system.model_version)
+    previous_source = system.training_metadata.get('event_source') or {}
+    # A different source starts from its beginning
+    watermark = previous_source.get('watermark') if previous_source.get('source') == source else None
+    events, watermark = read_events(source, system.db, watermark)
+    logging.info(f"Incremental training on {len(events)} new events from {source}")
+    comparison = system.train_models_incremental(events)
+    system.training_metadata['event_source'] = {'source': source, 'watermark': watermark}
+    return comparison
 
 # Add model persistence functions
+MODEL_DIR = "models"
+LEGACY_MODEL_PATH = os.path.join(MODEL_DIR, "system.pkl")
+artifact_store = ArtifactStore(MODEL_DIR)
+
 def save_models(system):
-    """Save trained models to disk"""
-    os.makedirs("models", exist_ok=True)
-    with open("models/system.pkl", "wb") as f:
-        pickle.dump({
-            'scaler': system.scaler,
-            'lgbm': system.lgbm_model,
-            'isolation_forest': system.isolation_forest,
-            'autoencoder': system.autoencoder,
-            'feature_columns': system.feature_columns
-        }, f)
-
-def load_models(system):
-    """Load trained models from disk"""
+    """Save trained models to disk as a new published version"""
+    system.model_version = artifact_store.save(system)
+    logging.info(f"Saved model version {system.model_version}")
+    return system.model_version
+
+def load_models(system, version=None):
+    """Load trained models from disk; raises IncompatibleModels for a version preprocessing cannot feed"""
+    if version is not None or artifact_store.current_version() is not None:
+        artifact_store.load(system, version)
+        check_feature_schema(system)
+        if AUTOENCODER_ENGINE == 'keras':
+            system.autoencoder = artifact_store.load_keras_autoencoder(system.model_version)
+            system.refresh_inference_engines()
+        return True
+    # Fall back to the single pickle written by earlier releases
     try:
-        with open("models/system.pkl", "rb") as f:
+        with open(LEGACY_MODEL_PATH, "rb") as f:
             models = pickle.load(f)
             system.scaler = models['scaler']
             system.lgbm_model = models['lgbm']
             system.isolation_forest = models['isolation_forest']
             system.autoencoder = models['autoencoder']
             system.feature_columns = models.get('feature_columns', None)  # Handle missing feature_columns
+        system.model_version = "legacy"
+        check_feature_schema(system)
+        system.refresh_inference_engines()
         return True
     except FileNotFoundError:
         return False
 
+def reload_models(version=None):
+    """Load a model version (CURRENT by default) and swap it in as the serving system.
+
+    The models load into a shallow copy that shares the MongoDB connection and
+    alert writer, and the global reference is replaced in one assignment, so
+    requests in flight finish on the model set they started with and
+    detection never sees a half-loaded one.
+    """
+    global system
+    candidate = copy.copy(system)
+    if not load_models(candidate, version):
+        raise FileNotFoundError("No saved models to load")
+    system = candidate
+    logging.info(f"Now serving model version {system.model_version}")
+    return system
+
+def detect_with_current_models(new_data, return_rows=False):
+    """detect_anomalies on whichever system is current when the call runs"""
+    return system.detect_anomalies(new_data, return_rows=return_rows)
+
+def detect_isolating_invalid(new_data):
+    """detect_with_current_models, halving the frame on InvalidRecords to find the records at fault.
+
+    Returns ``(alerts, rows, errors)``: rows are positions in new_data and
+    errors are ``(position, message)`` pairs. A pass that raises
+    InvalidRecords changes no state, so every valid record is scored once,
+    in order.
+    """
+    try:
+        alerts, rows = detect_with_current_models(new_data, return_rows=True)
+        return alerts, [int(row) for row in rows], []
+    except InvalidRecords as e:
+        if len(new_data) == 1:
+            return [], [], [(0, str(e))]
+    middle = len(new_data) // 2
+    alerts, rows, errors = detect_isolating_invalid(new_data.iloc[:middle])
+    right_alerts, right_rows, right_errors = detect_isolating_invalid(new_data.iloc[middle:])
+    return (alerts + right_alerts, rows + [middle + row for row in right_rows],
+            errors + [(middle + position, message) for position, message in right_errors])
+
+training_jobs = TrainingJobs(os.path.join(MODEL_DIR, "jobs"), on_published=lambda version: reload_models())
+
 def initialize_system():
     """Initialize and train the system on startup"""
-    global system
+    global system, batcher
     system = CyberSecurityDetectionSystem()
+    atexit.register(system.shutdown)
+    if DETECT_MAX_WAIT_MS > 0:
+        batcher = MicroBatcher(detect_with_current_models, DETECT_MAX_WAIT_MS, DETECT_MAX_BATCH_ROWS,
+                               retry_on=(InvalidRecords,))
     
     # Try to load existing models first
     if load_models(system):
@@ -440,9 +1281,7 @@ def initialize_system():
         
     try:
         # Train new models if loading fails
-        df = pd.read_csv("cybersecurity_dataset.csv")
-        processed_df = system.preprocess_data(df)
-        system.train_models(processed_df)
+        train_from_csv(system)
         save_models(system)
         logging.info("Models trained and saved successfully")
     except Exception as e:
@@ -453,12 +1292,49 @@ def initialize_system():
 # Modify the routes to use the global system instance
 @app.route('/train', methods=['POST'])
 def train():
-    global system
-    df = pd.read_csv("cybersecurity_dataset.csv")
-    processed_df = system.preprocess_data(df)
-    system.train_models(processed_df)
-    system.perform_eda(processed_df)
-    return jsonify({"message": "Models trained and EDA performed successfully!"})
+    """Start a background training job; poll /train/<job_id> for its progress.
+
+    An optional JSON body {"mode": "incremental", "source": ...} updates the
+    current models from newly labeled events instead of retraining on the
+    full dataset.
+    """
+    options = request.get_json(silent=True) or {}
+    mode = options.get('mode', 'full')
+    if mode == 'incremental':
+        source = options.get('source', INCREMENTAL_SOURCE)
+    elif mode == 'full':
+        source = DATASET_PATH
+    else:
+        return jsonify({"error": f"Unknown training mode {mode!r}; expected 'full' or 'incremental'"}), 400
+    job_id = training_jobs.submit(source, TRAINING_MEMORY_BUDGET_MB, mode=mode)
+    return jsonify({"job_id": job_id, "status": "queued", "status_url": f"/train/{job_id}"}), 202
+
+@app.route('/train/<job_id>', methods=['GET'])
+def train_status(job_id):
+    status = training_jobs.get(job_id)
+    if status is None:
+        return jsonify({"error": f"Unknown training job {job_id}"}), 404
+    return jsonify(status)
+
+REQUIRED_FIELDS = ['Source IP', 'Destination IP', 'Timestamp', 'Attack Severity']
+
+def records_frame(records):
+    """DataFrame for detection from a list of records or a decoded frame; raises ValueError if required fields are missing"""
+    new_data = pd.DataFrame(records)
+    
+    # Ensure required fields are present
+    missing_fields = [field for field in REQUIRED_FIELDS if field not in new_data.columns]
+    if missing_fields:
+        raise ValueError(f"Missing required fields: {missing_fields}")
+    
+    # Add missing columns if necessary
+    if 'User Agent' not in new_data.columns:
+        new_data['User Agent'] = 'Unknown'
+    if 'Data Exfiltrated' not in new_data.columns:
+        new_data['Data Exfiltrated'] = False
+    if 'Attack Type' not in new_data.columns:
+        new_data['Attack Type'] = 'Unknown'
+    return new_data
 
 @app.route('/detect', methods=['POST'])
 def detect():
@@ -467,40 +1343,49 @@ def detect():
         return jsonify({"error": "System not initialized"}), 500
     
     try:
-        data = request.json
-        logging.info(f"Received detection request: {data}")
+        try:
+            body_format = request_format(request.content_type)
+            with time_stage(f'{body_format}_decode'):
+                if body_format == JSON:
+                    data = request.json
+                elif body_format == NDJSON:
+                    data = list(iter_ndjson(request.stream))
+                else:
+                    data = decode(request.get_data(), body_format)
+        except UnsupportedFormat as e:
+            return jsonify({"error": str(e)}), 415
         
         # Convert data to expected format if it's a dict
         if isinstance(data, dict):
             data = [data]
         
         # Validate the data structure
-        if not isinstance(data, list):
+        if not isinstance(data, (list, pd.DataFrame)):
             return jsonify({"error": "Invalid data format. Expected list or dict"}), 400
             
-        # Convert to DataFrame
-        new_data = pd.DataFrame(data)
-        logging.info(f"Converted to DataFrame: {new_data.columns}")
-        
-        # Ensure required fields are present
-        required_fields = ['Source IP', 'Destination IP', 'Timestamp', 'Attack Severity']
-        missing_fields = [field for field in required_fields if field not in new_data.columns]
-        if missing_fields:
-            return jsonify({"error": f"Missing required fields: {missing_fields}"}), 400
-        
-        # Add missing columns if necessary
-        if 'User Agent' not in new_data.columns:
-            new_data['User Agent'] = 'Unknown'
-        if 'Data Exfiltrated' not in new_data.columns:
-            new_data['Data Exfiltrated'] = False
-        if 'Attack Type' not in new_data.columns:
-            new_data['Attack Type'] = 'Unknown'
+        try:
+            with time_stage('dataframe'):
+                new_data = records_frame(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        REQUEST_ROWS.observe(len(new_data))
             
         try:
-            alerts = system.detect_anomalies(new_data)
-            logging.info(f"Detection complete. Found {len(alerts)} alerts")
-            # Alerts are already JSON serializable at this point
-            return jsonify(alerts)
+            try:
+                if batcher is not None:
+                    alerts = batcher.submit(new_data)
+                else:
+                    alerts = system.detect_anomalies(new_data)
+            except InvalidRecords as e:
+                return jsonify({"error": f"Invalid records: {e}"}), 400
+            logging.debug(f"Detection complete. Found {len(alerts)} alerts")
+            response_format = FORMATS[request.accept_mimetypes.best_match(RESPONSE_TYPES, RESPONSE_TYPES[0])]
+            with time_stage(f'{response_format}_encode'):
+                if response_format == JSON:
+                    # Alerts are already JSON serializable at this point
+                    return jsonify(alerts)
+                body, media_type = encode(alerts, response_format)
+                return Response(body, mimetype=media_type)
         except Exception as e:
             logging.error(f"Error in anomaly detection: {e}", exc_info=True)
             return jsonify({"error": f"Detection error: {str(e)}"}), 500
@@ -509,15 +1394,131 @@ def detect():
         logging.error(f"Error processing detection request: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
+@app.route('/detect/bulk', methods=['POST'])
+def detect_bulk():
+    """Score a body of any size, streaming NDJSON results back.
+
+    The body is NDJSON, a JSON array, an Arrow IPC stream, Parquet or
+    MessagePack, per its Content-Type. Records are read and scored
+    BULK_CHUNK_ROWS at a time. Each alert is
+    sent as ``{"index": <input position>, "alert": {...}}`` as soon as its
+    chunk is scored, followed by ``{"processed": <records so far>}``. A
+    record with values that cannot be encoded is reported as ``{"error": ...,
+    "start": i, "end": i + 1}`` and the rest of its chunk is still scored; a
+    chunk that fails otherwise is reported as ``{"error": ..., "start": i,
+    "end": j}`` and skipped. An unreadable body ends the stream with an error
+    line. The last line is ``{"done": true, "processed": n, "alerts": k}``.
+    """
+    global system
+    if not system:
+        return jsonify({"error": "System not initialized"}), 500
+    try:
+        body_format = request_format(request.content_type)
+        if body_format in (JSON, NDJSON):
+            chunks = chunked(iter_records(request.stream, request.content_type), BULK_CHUNK_ROWS)
+        else:
+            chunks = iter_chunks(request.stream, body_format, BULK_CHUNK_ROWS)
+    except UnsupportedFormat as e:
+        return jsonify({"error": str(e)}), 415
+
+    def generate():
+        processed = alert_count = 0
+        try:
+            for start, chunk in chunks:
+                end = start + len(chunk)
+                try:
+                    with time_stage('dataframe'):
+                        new_data = records_frame(chunk)
+                    alerts, rows, errors = detect_isolating_invalid(new_data)
+                except Exception as e:
+                    logging.error(f"Bulk detection failed for records {start}-{end - 1}: {e}")
+                    yield json.dumps({"error": str(e), "start": start, "end": end}) + "\n"
+                else:
+                    with time_stage('json_encode'):
+                        lines = [json.dumps({"error": message, "start": start + position, "end": start + position + 1})
+                                 + "\n" for position, message in errors]
+                        lines += [json.dumps({"index": start + row, "alert": alert}) + "\n"
+                                  for row, alert in zip(rows, alerts)]
+                    alert_count += len(alerts)
+                    yield ''.join(lines)
+                processed = end
+                yield json.dumps({"processed": processed}) + "\n"
+        except ValueError as e:
+            yield json.dumps({"error": f"Invalid request body: {e}", "start": processed}) + "\n"
+            return
+        yield json.dumps({"done": True, "processed": processed, "alerts": alert_count}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/detect/stats', methods=['GET'])
+def detect_stats():
+    global system
+    if not system:
+        return jsonify({"error": "System not initialized"}), 500
+    return jsonify({
+        "micro_batching": batcher.stats() if batcher is not None else None,
+        "alert_sink": system.alert_sink.stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/debug/profile', methods=['POST'])
+def profile():
+    """Sample this process for ?seconds= (default 10) and return collapsed stacks"""
+    if not PROFILER_ENABLED:
+        return jsonify({"error": "Profiling is disabled; set PROFILER_ENABLED=1"}), 404
+    seconds = min(float(request.args.get('seconds', 10)), 300)
+    interval = float(request.args.get('interval_ms', 5)) / 1000.0
+    stacks = SamplingProfiler(interval).profile(seconds)
+    return Response(stacks, mimetype='text/plain')
+
 @app.route('/alerts', methods=['GET'])
 def alerts():
+    """Newest alerts first, filtered by start, end, severity, min_severity, attack_type and source_ip.
+
+    The body is the page of alerts; when more remain, the X-Next-Cursor
+    header carries the cursor to pass back as ?cursor= for the next page.
+    """
     global system
     if not system:
         return jsonify({"error": "System not initialized"}), 500
-    recent_alerts = system.get_recent_alerts()
-    return jsonify(recent_alerts)
+    try:
+        query = build_query(request.args, system.severity_mapping, ATTACK_TYPE_MAPPING)
+        limit = parse_limit(request.args.get('limit'))
+        page, next_cursor = system.find_alerts(query, request.args.get('cursor'), limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    response = jsonify(page)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+@app.route('/alerts/stats', methods=['GET'])
+def alert_stats():
+    """Alert totals and breakdowns over [start, end), with a timeline bucketed by minute, hour or day.
+
+    ?timeline=false returns the totals and breakdowns alone.
+    """
+    global system
+    if not system:
+        return jsonify({"error": "System not initialized"}), 500
+    try:
+        start = parse_time(request.args['start']) if request.args.get('start') else None
+        end = parse_time(request.args['end']) if request.args.get('end') else None
+        stats = system.alert_stats(start, end, request.args.get('bucket', 'hour'),
+                                   timeline=request.args.get('timeline', 'true').lower() != 'false')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except PyMongoError as e:
+        logging.error(f"Alert statistics failed: {e}")
+        return jsonify({"error": "Alert statistics unavailable"}), 503
+    return jsonify(stats)
 
 if __name__ == "__main__":
     initialize_system()  # Initialize before running
+    if PROFILER_ENABLED:
+        install_signal_toggle()
     app.run(debug=True, port=5001)
 
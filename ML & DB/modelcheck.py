@@ -28,6 +28,38 @@ def parse_datetime(dt_string):
             continue
     raise ValueError(f"No valid datetime format found for {dt_string}")
 
+# Pooled connections to the API, shared across reruns
+@st.cache_resource
+def api_session():
+    return requests.Session()
+
+HISTORY_PAGE_SIZE = 1000
+HISTORY_MAX_ALERTS = 20000
+
+def fetch_alerts(base_url, params, max_alerts=HISTORY_MAX_ALERTS):
+    """Follow the /alerts cursor until the filter is exhausted or max_alerts is reached"""
+    session = api_session()
+    params = {**params, 'limit': HISTORY_PAGE_SIZE}
+    alerts = []
+    while len(alerts) < max_alerts:
+        response = session.get(f"{base_url}/alerts", params=params)
+        response.raise_for_status()
+        alerts += response.json()
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+        params['cursor'] = cursor
+    return alerts[:max_alerts]
+
+def fetch_stats(base_url, **params):
+    """Pre-aggregated alert counts from /alerts/stats"""
+    response = api_session().get(f"{base_url}/alerts/stats", params=params)
+    response.raise_for_status()
+    return response.json()
+
+def counts_frame(counts, column):
+    return pd.DataFrame({column: list(counts), 'count': list(counts.values())})
+
 def main():
     st.title("Cybersecurity Threat Detection Dashboard")
     
@@ -138,7 +170,7 @@ def main():
         st.header("Batch Threat Detection")
         
         # File upload for JSON data
-        uploaded_file = st.file_uploader("Upload JSON file with threat data", type=['json'])
+        uploaded_file = st.file_uploader("Upload JSON or NDJSON file with threat data", type=['json', 'ndjson', 'jsonl'])
         
         # Text area for JSON input
         json_input = st.text_area(
@@ -160,7 +192,10 @@ def main():
         if process_batch:
             try:
                 if upload_method == "File Upload" and uploaded_file is not None:
-                    batch_data = json.load(uploaded_file)
+                    if uploaded_file.name.endswith(('.ndjson', '.jsonl')):
+                        batch_data = [json.loads(line) for line in uploaded_file if line.strip()]
+                    else:
+                        batch_data = json.load(uploaded_file)
                 elif upload_method == "Text Input" and json_input:
                     batch_data = json.loads(json_input)
                 else:
@@ -170,34 +205,39 @@ def main():
                 if not isinstance(batch_data, list):
                     batch_data = [batch_data]
                 
-                # Process each record
+                # One streamed upload; results arrive as each chunk is scored
                 with st.spinner('Processing batch data...'):
                     progress_bar = st.progress(0)
                     total_records = len(batch_data)
+                    body = '\n'.join(json.dumps(record) for record in batch_data).encode()
+                    detected = []
                     
-                    for i, record in enumerate(batch_data):
-                        try:
-                            response = requests.post(
-                                f"{base_url}/detect",
-                                json=record,
-                                headers={'Content-Type': 'application/json'}
-                            )
-                            
-                            if response.status_code == 200:
-                                alerts = response.json()
-                                if alerts:
-                                    st.warning(f"⚠️ Threats detected in record {i+1}!")
-                                    st.json(alerts)
+                    with api_session().post(f"{base_url}/detect/bulk", data=body, stream=True,
+                                            headers={'Content-Type': 'application/x-ndjson'}) as response:
+                        if response.status_code != 200:
+                            st.error(f"Error processing batch: {response.json().get('error', 'Unknown error')}")
+                            return
+                        for line in response.iter_lines():
+                            if not line:
+                                continue
+                            result = json.loads(line)
+                            if 'alert' in result:
+                                detected.append({'record': result['index'] + 1, **result['alert']})
+                            elif 'error' in result:
+                                if 'end' in result:
+                                    st.error(f"Error processing records {result['start'] + 1}-{result['end']}: {result['error']}")
                                 else:
-                                    st.success(f"✅ No threats detected in record {i+1}")
-                            else:
-                                st.error(f"Error processing record {i+1}: {response.json().get('error', 'Unknown error')}")
-                            
-                            # Update progress
-                            progress_bar.progress((i + 1) / total_records)
-                            
-                        except Exception as e:
-                            st.error(f"Error processing record {i+1}: {str(e)}")
+                                    st.error(result['error'])
+                            elif 'processed' in result and total_records:
+                                # Update progress
+                                progress_bar.progress(min(result['processed'] / total_records, 1.0))
+                    
+                    if detected:
+                        st.warning(f"⚠️ Threats detected in {len({alert['record'] for alert in detected})} "
+                                   f"of {total_records} records!")
+                        st.dataframe(pd.DataFrame(detected))
+                    else:
+                        st.success("✅ No threats detected")
                     
                     st.success("Batch processing complete!")
                     
@@ -216,44 +256,39 @@ def main():
             start_datetime = datetime.combine(start_date, datetime.min.time())
         with col2:
             end_date = st.date_input("End Date", datetime.now())
-            end_datetime = datetime.combine(end_date, datetime.max.time())
+            end_datetime = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
         
-        # Load historical data
+        # Aggregated by the server from its per-minute rollups
+        range_params = {
+            'start': start_datetime.strftime('%Y-%m-%d %H:%M:%S'),
+            'end': end_datetime.strftime('%Y-%m-%d %H:%M:%S')
+        }
         try:
-            response = requests.get(f"{base_url}/alerts")
-            response.raise_for_status()
-            historical_alerts = response.json()
+            bucket = 'hour' if end_datetime - start_datetime <= timedelta(days=14) else 'day'
+            stats = fetch_stats(base_url, bucket=bucket, **range_params)
             
-            if historical_alerts:
-                # Convert to DataFrame for visualization
-                df_alerts = pd.DataFrame(historical_alerts)
+            if stats['total']:
+                # Threat timeline
+                df_timeline = pd.DataFrame(stats['timeline'])
+                fig_timeline = px.bar(df_timeline, x='time', y='count', color='severity',
+                                      title='Threat Severity Timeline')
+                st.plotly_chart(fig_timeline)
                 
-                # Convert timestamp strings to datetime objects
-                df_alerts['timestamp'] = df_alerts['timestamp'].apply(parse_datetime)
+                # Attack type distribution
+                fig_attack_dist = px.pie(counts_frame(stats['attack_type'], 'attack_type'),
+                                         names='attack_type', values='count',
+                                         title='Distribution of Attack Types')
+                st.plotly_chart(fig_attack_dist)
                 
-                # Filter by date range
-                mask = (df_alerts['timestamp'] >= start_datetime) & (df_alerts['timestamp'] <= end_datetime)
-                df_alerts = df_alerts.loc[mask]
+                # Severity distribution
+                fig_severity = px.bar(counts_frame(stats['severity'], 'severity'), x='severity', y='count',
+                                      title='Distribution of Threat Severity')
+                st.plotly_chart(fig_severity)
                 
-                if not df_alerts.empty:
-                    # Threat timeline
-                    fig_timeline = px.line(df_alerts, x='timestamp', y='severity',
-                                         title='Threat Severity Timeline')
-                    st.plotly_chart(fig_timeline)
-                    
-                    # Attack type distribution
-                    fig_attack_dist = px.pie(df_alerts, names='attack_type',
-                                           title='Distribution of Attack Types')
-                    st.plotly_chart(fig_attack_dist)
-                    
-                    # Severity distribution
-                    fig_severity = px.histogram(df_alerts, x='severity',
-                                              title='Distribution of Threat Severity')
-                    st.plotly_chart(fig_severity)
-                else:
-                    st.info("No historical data available for the selected date range")
+                with st.expander("Most recent alerts in range"):
+                    st.dataframe(pd.DataFrame(fetch_alerts(base_url, range_params, max_alerts=HISTORY_PAGE_SIZE)))
             else:
-                st.info("No historical data available")
+                st.info("No historical data available for the selected date range")
         except requests.exceptions.RequestException as e:
             st.error(f"Error fetching historical data: {str(e)}")
     
@@ -262,21 +297,18 @@ def main():
         
         # System health metrics
         try:
-            response = requests.get(f"{base_url}/alerts")
-            response.raise_for_status()
-            all_alerts = response.json()
+            # Totals only: the page shows no timeline
+            all_time = fetch_stats(base_url, timeline='false')
+            last_day = fetch_stats(base_url, timeline='false',
+                                   start=(datetime.now() - timedelta(hours=24)).strftime('%Y-%m-%d %H:%M:%S'))
             
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("Total Alerts", len(all_alerts))
+                st.metric("Total Alerts", all_time['total'])
             with col2:
-                recent_count = len([
-                    alert for alert in all_alerts 
-                    if parse_datetime(alert['timestamp']) >= datetime.now() - timedelta(hours=24)
-                ])
-                st.metric("Alerts (24h)", recent_count)
+                st.metric("Alerts (24h)", last_day['total'])
             with col3:
-                high_severity = len([alert for alert in all_alerts if alert['severity'] >= 3])
+                high_severity = sum(all_time['severity'].get(name, 0) for name in ('High', 'Critical'))
                 st.metric("High Severity Alerts", high_severity)
             
             # Model performance metrics (if available)
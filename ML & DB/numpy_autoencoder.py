@@ -0,0 +1,96 @@
+"""TensorFlow-free inference for the Dense autoencoder built by build_autoencoder.
+
+The trained Keras model is exported to plain weight arrays and evaluated with
+NumPy matrix products, avoiding Model.predict's per-call overhead and the
+TensorFlow runtime in serving processes. An int8 variant stores each weight
+matrix with per-output-channel symmetric scales.
+"""
+import numpy as np
+
+ACTIVATIONS = {
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    'sigmoid': lambda x: np.divide(1.0, 1.0 + np.exp(-x, out=x), out=x),
+    'linear': lambda x: x,
+}
+
+class NumpyAutoencoder:
+    def __init__(self, weights, biases, activations):
+        self.weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.activations = list(activations)
+
+    @classmethod
+    def from_keras(cls, model):
+        """Copy the Dense layer weights out of a trained Keras model"""
+        weights, biases, activations = [], [], []
+        for layer in model.layers:
+            params = layer.get_weights()
+            if not params:
+                continue  # Input layer
+            weights.append(params[0])
+            biases.append(params[1])
+            activations.append(layer.activation.__name__)
+        return cls(weights, biases, activations)
+
+    def to_arrays(self):
+        """Flat name -> array mapping, e.g. for np.savez"""
+        arrays = {'activations': np.array(self.activations)}
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            arrays[f'w{i}'] = w
+            arrays[f'b{i}'] = b
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        activations = [str(a) for a in arrays['activations']]
+        weights = [arrays[f'w{i}'] for i in range(len(activations))]
+        biases = [arrays[f'b{i}'] for i in range(len(activations))]
+        return cls(weights, biases, activations)
+
+    def save(self, path):
+        np.savez(path, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls.from_arrays(dict(arrays))
+
+    def _matmul(self, x, i):
+        return x @ self.weights[i]
+
+    def predict(self, X):
+        """Reconstruct X (n_samples, n_features) in float32"""
+        x = np.asarray(X, dtype=np.float32)
+        # exp overflow in the sigmoid saturates to 0 as intended
+        with np.errstate(over='ignore'):
+            for i, activation in enumerate(self.activations):
+                x = self._matmul(x, i)
+                x += self.biases[i]
+                x = ACTIVATIONS[activation](x)
+        return x
+
+    def quantize(self):
+        """Int8 copy of this model with per-output-channel weight scales"""
+        return Int8Autoencoder(self.weights, self.biases, self.activations)
+
+class Int8Autoencoder(NumpyAutoencoder):
+    def __init__(self, weights, biases, activations):
+        super().__init__(weights, biases, activations)
+        self.scales = []
+        quantized = []
+        for w in self.weights:
+            scale = np.abs(w).max(axis=0) / 127.0
+            scale[scale == 0] = 1.0
+            quantized.append(np.round(w / scale).astype(np.int8))
+            self.scales.append(scale.astype(np.float32))
+        self.weights = quantized
+
+    def _matmul(self, x, i):
+        # The matrices are tiny, so widening them per call costs little next to the product
+        return (x @ self.weights[i].astype(np.float32)) * self.scales[i]
+
+    def to_arrays(self):
+        """Dequantized arrays, so saved models always load as float32"""
+        dequantized = NumpyAutoencoder([w * s for w, s in zip(self.weights, self.scales)],
+                                       self.biases, self.activations)
+        return dequantized.to_arrays()
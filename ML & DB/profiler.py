@@ -0,0 +1,99 @@
+"""Low-overhead sampling profiler that can be switched on in a running process.
+
+A daemon thread snapshots every other thread's Python stack at a fixed
+interval and counts identical stacks. Results are in the collapsed-stack
+format (``frame;frame;frame count``) read by flamegraph.pl and speedscope.
+Threads parked in a wait, sleep or select are skipped by default, so the
+profile shows where requests actually spend CPU.
+"""
+import collections
+import datetime
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+# Leaf functions of threads that are blocked rather than running
+IDLE_FUNCTIONS = {'wait', 'sleep', 'select', 'poll', 'accept', 'get', '_wait_for_tstate_lock', 'readinto'}
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005, include_idle=False, max_depth=64):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.max_depth = max_depth
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.started_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self.stacks.clear()
+        self.samples = 0
+        self.started_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and return the collapsed stacks"""
+        if self.running:
+            self._stop.set()
+            self._thread.join()
+        return self.collapsed()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                if not self.include_idle and frame.f_code.co_name in IDLE_FUNCTIONS:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def profile(self, seconds):
+        """Sample for ``seconds`` and return the collapsed stacks"""
+        self.start()
+        # An Event wait keeps this thread's leaf frame in IDLE_FUNCTIONS, out of the profile
+        threading.Event().wait(seconds)
+        return self.stop()
+
+def install_signal_toggle(signum=signal.SIGUSR2, output_dir="output", interval=0.005):
+    """Toggle a profiler with ``kill -USR2 <pid>``; the second signal writes the profile file.
+
+    Must be called from the main thread.
+    """
+    profiler = SamplingProfiler(interval)
+
+    def toggle(signum, frame):
+        if not profiler.running:
+            profiler.start()
+            logging.info(f"Sampling profiler started in process {os.getpid()}")
+            return
+        stacks = profiler.stop()
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, f"profile-{os.getpid()}-{datetime.datetime.now():%Y%m%d-%H%M%S}.txt")
+        with open(path, "w") as f:
+            f.write(stacks)
+        logging.info(f"Sampling profiler stopped after {profiler.samples} samples, wrote {path}")
+
+    signal.signal(signum, toggle)
+    return profiler
@@ -0,0 +1,111 @@
+"""Bounded-memory streaming quantile sketch for non-negative scores.
+
+Values are counted in logarithmically sized buckets (the DDSketch scheme), so
+any quantile is answered within a fixed relative error without keeping past
+values. Adding a batch is a vectorized log and bincount, O(batch) with no
+sort, and a query is a cumulative sum over at most ``max_buckets`` counts.
+Counts can decay exponentially per record so the quantiles follow drift in
+the score distribution.
+"""
+import math
+import threading
+
+import numpy as np
+
+class QuantileSketch:
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048, half_life=None, min_value=1e-12):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.half_life = half_life
+        self.min_value = min_value
+        self._log_gamma = math.log((1 + relative_accuracy) / (1 - relative_accuracy))
+        self._decay = 0.5 ** (1.0 / half_life) if half_life else 1.0
+        self.offset = 0  # Bucket index of counts[0]
+        self.counts = np.zeros(0)
+        self.zero_count = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self):
+        return self.zero_count + float(self.counts.sum())
+
+    def _index(self, values):
+        return np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+
+    def _value(self, index):
+        gamma = math.exp(self._log_gamma)
+        return 2.0 * gamma ** index / (gamma + 1)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        # NaN and overflowed scores have no bucket; an inf would also stretch the range
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+        small = values <= self.min_value
+        indexes = self._index(values[~small])
+        with self._lock:
+            if self._decay != 1.0:
+                factor = self._decay ** len(values)
+                self.counts *= factor
+                self.zero_count *= factor
+            self.zero_count += float(small.sum())
+            if len(indexes):
+                self._extend(int(indexes.min()), int(indexes.max()))
+                # Indexes below the retained range fold into the lowest bucket
+                positions = np.maximum(indexes - self.offset, 0)
+                self.counts += np.bincount(positions, minlength=len(self.counts))[:len(self.counts)]
+
+    def _extend(self, low, high):
+        if not len(self.counts):
+            self.offset = max(low, high - self.max_buckets + 1)
+            self.counts = np.zeros(high - self.offset + 1)
+            return
+        new_low = min(low, self.offset)
+        new_high = max(high, self.offset + len(self.counts) - 1)
+        # Keep the upper tail exact; the lowest buckets collapse when over budget
+        new_low = max(new_low, new_high - self.max_buckets + 1)
+        if new_low == self.offset and new_high == self.offset + len(self.counts) - 1:
+            return
+        counts = np.zeros(new_high - new_low + 1)
+        shift = self.offset - new_low
+        if shift >= 0:
+            counts[shift:shift + len(self.counts)] = self.counts
+        else:
+            counts[0] += self.counts[:-shift].sum()
+            counts[:len(self.counts) + shift] += self.counts[-shift:]
+        self.offset, self.counts = new_low, counts
+
+    def quantile(self, q):
+        """Approximate q-quantile of the values seen so far, None if empty"""
+        with self._lock:
+            total = self.zero_count + self.counts.sum()
+            if total <= 0:
+                return None
+            rank = q * total
+            if rank <= self.zero_count:
+                return 0.0
+            cumulative = np.cumsum(self.counts) + self.zero_count
+            index = min(int(np.searchsorted(cumulative, rank)), len(self.counts) - 1)
+            return self._value(self.offset + index)
+
+    def to_state(self):
+        """(params, counts) for persistence; counts is a plain array"""
+        with self._lock:
+            params = {
+                'relative_accuracy': self.relative_accuracy,
+                'max_buckets': self.max_buckets,
+                'half_life': self.half_life,
+                'min_value': self.min_value,
+                'offset': self.offset,
+                'zero_count': self.zero_count
+            }
+            return params, self.counts.copy()
+
+    @classmethod
+    def from_state(cls, params, counts):
+        sketch = cls(params['relative_accuracy'], params['max_buckets'], params['half_life'], params['min_value'])
+        sketch.offset = params['offset']
+        sketch.zero_count = params['zero_count']
+        sketch.counts = np.array(counts, dtype=np.float64)
+        return sketch
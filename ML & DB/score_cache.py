@@ -0,0 +1,105 @@
+"""Bounded cache of model outputs for repeated feature rows.
+
+Scans and floods send the same event over and over. _predict looks every
+scaled feature row up here before running the models; the key is a 128-bit
+BLAKE2 digest of the row's bytes keyed with the model version, and the value
+is what the models returned for that row (class probabilities, Isolation
+Forest label, reconstruction error). Whatever depends on the clock is still
+computed per event: the timestamp and behavioral window features are part of
+the row itself, so a hit always has the same window counts, and the
+autoencoder threshold and alert timestamps are applied after the lookup.
+Live window counts grow with each repeat of an event, so most hits come
+from score_batch, where the behavioral columns arrive with the records, and
+from traffic scored without behavioral features.
+
+A cache serves one model version and is replaced when the models change.
+Entries are evicted least recently used first once ``max_bytes`` is reached,
+and dropped ``ttl_seconds`` after they were stored when that is set.
+"""
+import collections
+import hashlib
+import threading
+import time
+
+import numpy as np
+
+# Approximate bytes per entry besides the stored outputs: digest, value object, tuple, dict node
+ENTRY_OVERHEAD = 240
+
+class ScoreCache:
+    def __init__(self, version, max_bytes, ttl_seconds=0):
+        self.version = version
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._hasher = hashlib.blake2b(digest_size=16, key=str(version).encode()[:64])
+        self._entries = collections.OrderedDict()  # digest -> (stored at, outputs as float64 bytes)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def keys(self, rows):
+        """Digest of every row of a C-contiguous 2-D array"""
+        rows = np.ascontiguousarray(rows)
+        keys = []
+        for row in rows.view(np.dtype((np.void, rows.itemsize * rows.shape[1]))).ravel().tolist():
+            hasher = self._hasher.copy()
+            hasher.update(row)
+            keys.append(hasher.digest())
+        return keys
+
+    def lookup(self, keys):
+        """``(hit mask, outputs of the hits in order)``; outputs is None when nothing hit"""
+        hit = np.zeros(len(keys), dtype=bool)
+        values = []
+        expired_before = time.monotonic() - self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            for position, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if expired_before is not None and entry[0] < expired_before:
+                    self._remove(key)
+                    continue
+                self._entries.move_to_end(key)
+                hit[position] = True
+                values.append(entry[1])
+            self.hits += len(values)
+            self.misses += len(keys) - len(values)
+        if not values:
+            return hit, None
+        return hit, np.frombuffer(b''.join(values), dtype=np.float64).reshape(len(values), -1)
+
+    def store(self, keys, outputs):
+        """Cache one row of ``outputs`` per key"""
+        now = time.monotonic()
+        outputs = np.asarray(outputs, dtype=np.float64)
+        with self._lock:
+            for key, row in zip(keys, outputs):
+                if key in self._entries:
+                    self._remove(key)
+                value = row.tobytes()
+                self._entries[key] = (now, value)
+                self.bytes += len(value) + ENTRY_OVERHEAD
+            while self.bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evicted += 1
+
+    def _remove(self, key):
+        _, value = self._entries.pop(key)
+        self.bytes -= len(value) + ENTRY_OVERHEAD
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'version': self.version, 'entries': len(self._entries), 'bytes': self.bytes,
+                'hits': self.hits, 'misses': self.misses, 'evicted': self.evicted,
+                'hit_ratio': self.hits / lookups if lookups else 0.0}
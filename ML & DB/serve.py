@@ -0,0 +1,146 @@
+"""Pre-fork production server for the detection API.
+
+The parent process loads the published model version once, binds the
+listening socket and forks the workers. It starts no threads and opens no
+connections. Workers inherit the models copy-on-write (the artifact arrays
+are memory-mapped, so their pages are shared outright). After fork each one
+opens its own MongoDB client, starts the alert index build, restores the
+behavioral window snapshot, and accepts connections on the shared socket. The parent restarts workers that die and,
+when a new version is published to models/CURRENT, loads it and replaces
+the workers one at a time so serving never stops.
+
+    python serve.py --workers 4 --port 5001
+
+With PROFILER_ENABLED=1, ``kill -USR2 <worker pid>`` starts and stops a
+sampling profile of that worker.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+import model
+from profiler import install_signal_toggle
+
+class PreforkServer:
+    def __init__(self, host, port, workers, reload_interval):
+        self.host = host
+        self.port = port
+        self.n_workers = workers
+        self.reload_interval = reload_interval
+        self.workers = {}  # pid -> model version the worker was forked with
+        self.stopping = False
+
+    def load(self):
+        # Serving threads and state start in each worker, after fork
+        system = model.CyberSecurityDetectionSystem(serving=False)
+        if not model.load_models(system):
+            raise RuntimeError("No trained models found; train and save models before serving")
+        model.system = system
+        logging.info(f"Parent loaded model version {system.model_version}")
+
+    def spawn(self):
+        # Objects created so far are never freed; keep the collector from touching their pages
+        gc.freeze()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                self.run_worker()
+            finally:
+                os._exit(0)
+        self.workers[pid] = model.system.model_version
+        return pid
+
+    def run_worker(self):
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(sig, signal.SIG_DFL)
+        system = model.system
+        system.connect()
+        system.start_serving()
+        model.LGBM_PREDICT_THREADS = model.LGBM_PREDICT_THREADS or 1
+        if model.DETECT_MAX_WAIT_MS > 0:
+            model.batcher = model.MicroBatcher(model.detect_with_current_models, model.DETECT_MAX_WAIT_MS,
+                                               model.DETECT_MAX_BATCH_ROWS, retry_on=(model.InvalidRecords,))
+
+        def stop(signum, frame):
+            # shutdown() waits for serve_forever to return, so it has to run on another thread
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, stop)
+        if model.PROFILER_ENABLED:
+            install_signal_toggle()
+        logging.info(f"Worker {os.getpid()} serving model version {system.model_version}")
+        self.server.serve_forever()
+        model.system.shutdown()
+
+    def stop_worker(self, pid):
+        try:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+        self.workers.pop(pid, None)
+
+    def reap(self):
+        """Collect exited workers and replace them"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.workers and not self.stopping:
+                logging.warning(f"Worker {pid} exited with status {status}, restarting")
+                self.workers.pop(pid)
+                self.spawn()
+
+    def rolling_reload(self, version):
+        logging.info(f"Rolling reload to model version {version}")
+        self.load()
+        for pid in [pid for pid, worker_version in self.workers.items() if worker_version != version]:
+            self.spawn()
+            self.stop_worker(pid)
+
+    def run(self):
+        self.load()
+        self.server = make_server(self.host, self.port, model.app, threaded=True)
+        for _ in range(self.n_workers):
+            self.spawn()
+
+        def stop(signum, frame):
+            self.stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        logging.info(f"Serving on {self.host}:{self.port} with {self.n_workers} workers")
+        last_check = time.monotonic()
+        while not self.stopping:
+            time.sleep(0.5)
+            self.reap()
+            if self.reload_interval and time.monotonic() - last_check >= self.reload_interval:
+                last_check = time.monotonic()
+                version = model.artifact_store.current_version()
+                if version is not None and version != model.system.model_version:
+                    self.rolling_reload(version)
+        for pid in list(self.workers):
+            self.stop_worker(pid)
+        self.server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork server for the detection API")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--reload-interval', type=float, default=10.0,
+                        help='seconds between checks for a new model version; 0 disables reloads')
+    args = parser.parse_args()
+    PreforkServer(args.host, args.port, args.workers, args.reload_interval).run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Building blocks for out-of-core training on CSV exports larger than RAM.
+
+Preprocessed chunks are spilled to flat float64 files on disk and read back
+through memory maps, so only one chunk of raw CSV and a bounded reservoir
+sample are ever held in memory at once.
+"""
+import os
+
+import lightgbm as lgb
+import numpy as np
+
+# Share of the memory budget given to one raw CSV chunk (preprocessing makes
+# a few copies of it) and to the reservoir sample used by the unsupervised models
+CHUNK_BUDGET_SHARE = 0.5
+RESERVOIR_BUDGET_SHARE = 0.25
+PREPROCESS_OVERHEAD = 4
+PROBE_ROWS = 1000
+
+def rows_for_budget(budget_bytes, bytes_per_row, minimum=1000):
+    return max(minimum, int(budget_bytes // max(bytes_per_row, 1)))
+
+class SpillFile:
+    """Append-only float64 matrix on disk, reopened as a read-only memmap"""
+
+    def __init__(self, path, n_columns):
+        self.path = path
+        self.n_columns = n_columns
+        self.n_rows = 0
+        self._file = open(path, 'wb')
+
+    def append(self, rows):
+        rows = np.ascontiguousarray(rows, dtype=np.float64)
+        self._file.write(rows.tobytes())
+        self.n_rows += len(rows)
+
+    def open(self):
+        self._file.close()
+        if self.n_rows == 0:
+            return np.empty((0, self.n_columns), dtype=np.float64)
+        return np.memmap(self.path, dtype=np.float64, mode='r',
+                         shape=(self.n_rows, self.n_columns))
+
+    def remove(self):
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+class ReservoirSample:
+    """Uniform fixed-size sample over a stream of row blocks (Algorithm R)"""
+
+    def __init__(self, capacity, n_columns, seed=42):
+        self.capacity = capacity
+        self.rows = np.empty((capacity, n_columns), dtype=np.float64)
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+
+    def add(self, rows):
+        filled = min(self.seen, self.capacity)
+        take = min(self.capacity - filled, len(rows))
+        self.rows[filled:filled + take] = rows[:take]
+        positions = self.seen + np.arange(take, len(rows))
+        if len(positions):
+            slots = (self._rng.random(len(positions)) * (positions + 1)).astype(np.int64)
+            keep = slots < self.capacity
+            # Fancy assignment keeps the last write per slot, matching the sequential algorithm
+            self.rows[slots[keep]] = rows[take:][keep]
+        self.seen += len(rows)
+
+    def sample(self):
+        return self.rows[:min(self.seen, self.capacity)]
+
+class ScaledSequence(lgb.Sequence):
+    """LightGBM Sequence that scales rows from a disk-backed matrix on read"""
+
+    def __init__(self, matrix, scaler, batch_size=4096):
+        self.matrix = matrix
+        self.scaler = scaler
+        self.batch_size = batch_size
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return self.scaler.transform(np.asarray(self.matrix[idx]))
+        if isinstance(idx, list):
+            return self.scaler.transform(np.asarray(self.matrix[idx]))
+        return self.scaler.transform(np.asarray(self.matrix[idx]).reshape(1, -1))[0]
+
+def scaled_batches(matrix, scaler, batch_size, block_rows, seed=42):
+    """Endless generator of shuffled (x, x) autoencoder batches from a memmap.
+
+    Each epoch visits the blocks in a random order and shuffles rows within
+    a block, so only ``block_rows`` rows are materialized at a time.
+    """
+    rng = np.random.default_rng(seed)
+    starts = np.arange(0, len(matrix), block_rows)
+    while True:
+        for start in rng.permutation(starts):
+            block = scaler.transform(np.asarray(matrix[start:start + block_rows]))
+            block = block[rng.permutation(len(block))]
+            for offset in range(0, len(block), batch_size):
+                batch = block[offset:offset + batch_size]
+                yield batch, batch
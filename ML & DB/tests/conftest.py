@@ -0,0 +1,56 @@
+import copy
+import os
+import sys
+
+import pytest
+
+# The service modules import each other as top-level modules from ``ML & DB``
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TRAIN_ROWS = 2000
+
+@pytest.fixture(scope="session")
+def workdir(tmp_path_factory):
+    """A scratch working directory for the session: models/ and output/ are relative paths"""
+    import model
+    from benchmarks.memory_mongo import InMemoryClient
+
+    directory = tmp_path_factory.mktemp("service")
+    previous = os.getcwd()
+    os.chdir(directory)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(model, "MongoClient", InMemoryClient)
+        yield directory
+    os.chdir(previous)
+
+@pytest.fixture(scope="session")
+def dataset_csv(workdir):
+    from benchmarks.synthetic import generate_dataset
+
+    path = str(workdir / "dataset.csv")
+    generate_dataset(TRAIN_ROWS).to_csv(path, index=False)
+    return path
+
+@pytest.fixture(scope="session")
+def trained_system(dataset_csv):
+    """A model set trained on a small synthetic dataset and published as models/CURRENT"""
+    import model
+
+    system = model.CyberSecurityDetectionSystem(serving=False)
+    model.train_from_csv(system, dataset_csv)
+    model.save_models(system)
+    return system
+
+@pytest.fixture
+def system(trained_system):
+    """The trained models with a behavioral window, threshold sketch and alert store of their own"""
+    import model
+    from quantile_sketch import QuantileSketch
+
+    system = copy.copy(trained_system)
+    system.connect()
+    system.feature_store = model.behavior_store()
+    system.ae_sketch = QuantileSketch.from_state(*trained_system.ae_sketch.to_state())
+    system.score_cache = None
+    yield system
+    system.alert_sink.close()
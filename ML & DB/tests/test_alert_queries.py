@@ -0,0 +1,99 @@
+import datetime
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+import model
+from alert_queries import build_query, decode_cursor, encode_cursor
+
+mongomock = pytest.importorskip("mongomock")
+
+BASE = datetime.datetime(2024, 1, 1)
+
+def random_alerts(n, seed):
+    # Few distinct seconds, so many alerts share a timestamp and only _id orders them
+    rng = np.random.default_rng(seed)
+    return [{'_id': ObjectId(), 'timestamp': BASE + datetime.timedelta(seconds=int(second)),
+             'severity': int(severity), 'attack_type': int(attack_type), 'source_ip': 167772160 + int(host)}
+            for second, severity, attack_type, host in zip(rng.integers(0, 40, n), rng.integers(1, 5, n),
+                                                          rng.integers(0, 6, n), rng.integers(0, 5, n))]
+
+def newest_first(alerts):
+    return [str(alert['_id']) for alert in sorted(alerts, key=lambda alert: (alert['timestamp'], alert['_id']),
+                                                  reverse=True)]
+
+@pytest.fixture
+def searcher():
+    system = model.CyberSecurityDetectionSystem(serving=False)
+    system.alerts_collection = mongomock.MongoClient()['cybersecurity_db']['alerts']
+    return system
+
+def walk(system, query, limit):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page, cursor = system.find_alerts(dict(query), cursor, limit)
+        assert len(page) <= limit
+        ids += [alert['_id'] for alert in page]
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+@pytest.mark.parametrize("limit", [1, 7, 50, 500])
+@pytest.mark.parametrize("args", [{}, {'severity': 'High,Critical'}, {'attack_type': '2'},
+                                  {'source_ip': '10.0.0.3', 'start': '2024-01-01 00:00:10'}])
+def test_pages_cover_every_match_once_in_order(searcher, args, limit):
+    alerts = random_alerts(300, seed=0)
+    searcher.alerts_collection.insert_many([dict(alert) for alert in alerts])
+    query = build_query(args, searcher.severity_mapping, model.ATTACK_TYPE_MAPPING)
+    matching = [alert for alert in alerts if mongomock.filtering.filter_applies(query, alert)]
+
+    ids, pages = walk(searcher, query, limit)
+
+    assert ids == newest_first(matching)
+    # One more row is fetched per page, so a full last page is known to be the last
+    assert pages == max(-(-len(matching) // limit), 1)
+
+def test_alerts_written_while_paging_neither_repeat_nor_hide_older_ones(searcher):
+    alerts = random_alerts(100, seed=1)
+    searcher.alerts_collection.insert_many([dict(alert) for alert in alerts])
+
+    first, cursor = searcher.find_alerts(limit=30)
+    # Newer alerts and one sharing the first page's last timestamp, below its _id
+    last = alerts[[str(alert['_id']) for alert in alerts].index(first[-1]['_id'])]
+    searcher.alerts_collection.insert_many([{**alert, 'timestamp': alert['timestamp'] + datetime.timedelta(hours=1)}
+                                            for alert in random_alerts(20, seed=2)])
+    tie = {'_id': ObjectId.from_datetime(BASE), 'timestamp': last['timestamp'], 'severity': 1,
+           'attack_type': 0, 'source_ip': 167772160}
+    searcher.alerts_collection.insert_one(dict(tie))
+    rest = []
+    while cursor:
+        page, cursor = searcher.find_alerts(cursor=cursor, limit=30)
+        rest += [alert['_id'] for alert in page]
+
+    assert [alert['_id'] for alert in first] + rest == newest_first(alerts + [tie])
+
+def test_cursor_names_the_last_alert():
+    alert = {'_id': ObjectId(), 'timestamp': datetime.datetime(2024, 5, 6, 7, 8, 9)}
+    cursor = encode_cursor(alert)
+
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (alert['timestamp'], alert['_id'])
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor("not-a-cursor")
+
+def test_next_cursor_header_walks_the_endpoint(searcher, monkeypatch):
+    alerts = random_alerts(25, seed=3)
+    searcher.alerts_collection.insert_many([dict(alert) for alert in alerts])
+    monkeypatch.setattr(model, "system", searcher)
+    client = model.app.test_client()
+
+    ids, cursor = [], ''
+    while cursor is not None:
+        response = client.get(f"/alerts?limit=10&cursor={cursor}")
+        assert response.status_code == 200
+        ids += [alert['_id'] for alert in response.get_json()]
+        cursor = response.headers.get('X-Next-Cursor')
+
+    assert ids == newest_first(alerts)
+    assert client.get("/alerts?cursor=bogus").status_code == 400
@@ -0,0 +1,84 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+from bson import ObjectId, json_util
+from pymongo.errors import PyMongoError
+
+from alert_sink import AlertSink
+
+class RecordingCollection:
+    """Appends the _id of every inserted alert to a file shared by the test's processes"""
+
+    def __init__(self, path, delay=0.0, fail=False):
+        self.path = path
+        self.delay = delay
+        self.fail = fail
+
+    def insert_many(self, documents, ordered=True):
+        if self.fail:
+            raise PyMongoError("not accepting writes")
+        time.sleep(self.delay)
+        with open(self.path, "a") as f:
+            f.write("".join(f"{document['_id']}\n" for document in documents))
+
+def inserted(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return f.read().split()
+
+def spilled_alerts(n):
+    return [{'_id': ObjectId(), 'attack_type': 1} for _ in range(n)]
+
+def replay(spill_path, record_path, barrier):
+    sink = AlertSink(RecordingCollection(record_path, delay=0.2), spill_path=spill_path)
+    barrier.wait()
+    sink._replay_spill()
+
+def test_workers_replay_each_spilled_alert_once(tmp_path):
+    spill_path, record_path = str(tmp_path / "spill.jsonl"), str(tmp_path / "inserted")
+    alerts = spilled_alerts(50)
+    AlertSink(None, spill_path=spill_path)._spill(alerts)
+
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(4)
+    workers = [context.Process(target=replay, args=(spill_path, record_path, barrier)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert sorted(inserted(record_path)) == sorted(str(alert['_id']) for alert in alerts)
+    assert sorted(os.listdir(tmp_path)) == ["inserted", "spill.jsonl.lock"]
+
+def test_failed_replay_keeps_the_claim_and_retries(tmp_path):
+    spill_path, record_path = str(tmp_path / "spill.jsonl"), str(tmp_path / "inserted")
+    collection = RecordingCollection(record_path, fail=True)
+    sink = AlertSink(collection, spill_path=spill_path)
+    first, second = spilled_alerts(3), spilled_alerts(2)
+    sink._spill(first)
+    sink._replay_spill()
+    # Spilled while the claimed alerts wait for their retry
+    sink._spill(second)
+    assert os.path.exists(f"{spill_path}.replay-{os.getpid()}")
+
+    collection.fail = False
+    sink._replay_spill()
+    assert inserted(record_path) == [str(alert['_id']) for alert in first]
+    sink._replay_spill()
+    assert inserted(record_path) == [str(alert['_id']) for alert in first + second]
+
+def test_claims_of_exited_workers_are_taken_over(tmp_path):
+    spill_path, record_path = str(tmp_path / "spill.jsonl"), str(tmp_path / "inserted")
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    alerts = spilled_alerts(3)
+    with open(f"{spill_path}.replay-{exited.pid}", "w") as f:
+        f.write("".join(json_util.dumps(alert) + "\n" for alert in alerts))
+
+    AlertSink(RecordingCollection(record_path), spill_path=spill_path)._replay_spill()
+
+    assert inserted(record_path) == [str(alert['_id']) for alert in alerts]
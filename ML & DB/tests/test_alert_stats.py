@@ -0,0 +1,96 @@
+import collections
+import datetime
+
+import numpy as np
+import pytest
+
+from alert_stats import BUCKET_FORMATS, AlertRollups, rollup_updates
+
+mongomock = pytest.importorskip("mongomock")
+
+BASE = datetime.datetime(2024, 1, 1, 12, 0, 0)
+
+def store(db, alerts):
+    """Insert alerts and fold them into the rollups, as the alert writer does"""
+    db['alerts'].insert_many(alerts)
+    # mongomock's bulk_write does not accept the requests of recent pymongo releases
+    for update in rollup_updates(alerts):
+        db['alert_rollups'].update_one(update._filter, update._doc, upsert=True)
+
+def random_alerts(n, seed):
+    rng = np.random.default_rng(seed)
+    return [{'timestamp': BASE + datetime.timedelta(seconds=int(second)), 'severity': int(severity),
+             'attack_type': int(attack_type)}
+            for second, severity, attack_type in zip(rng.integers(0, 3 * 3600, n), rng.integers(1, 5, n),
+                                                      rng.integers(0, 6, n))]
+
+def expected_stats(alerts, start, end, bucket):
+    selected = [alert for alert in alerts
+                if (start is None or alert['timestamp'] >= start) and (end is None or alert['timestamp'] < end)]
+    timeline = collections.Counter((alert['timestamp'].strftime(BUCKET_FORMATS[bucket]), str(alert['severity']))
+                                   for alert in selected)
+    return {
+        'total': len(selected),
+        'severity': dict(collections.Counter(str(alert['severity']) for alert in selected)),
+        'attack_type': dict(collections.Counter(str(alert['attack_type']) for alert in selected)),
+        'timeline': [{'time': time, 'severity': severity, 'count': count}
+                     for (time, severity), count in sorted(timeline.items())],
+    }
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient()['cybersecurity_db']
+
+@pytest.fixture
+def rollups(db):
+    return AlertRollups(db['alert_rollups'], cache_seconds=60, alerts=db['alerts'])
+
+def at(minutes, seconds=0):
+    return BASE + datetime.timedelta(minutes=minutes, seconds=seconds)
+
+@pytest.mark.parametrize("start, end", [
+    (None, None),
+    (None, at(95, 30)),  # Ends mid-minute, like "now"
+    (at(10, 45), None),
+    (at(10, 45), at(95, 30)),
+    (at(10), at(95)),
+    (at(20, 5), at(20, 50)),  # Within one minute
+    (at(20, 50), at(21, 5)),  # Across one minute boundary, no whole minute
+    (at(30), at(30)),
+])
+@pytest.mark.parametrize("bucket", ["minute", "hour"])
+def test_stats_count_exactly_the_alerts_in_range(db, rollups, start, end, bucket):
+    alerts = random_alerts(2000, seed=1)
+    store(db, [dict(alert) for alert in alerts])
+
+    stats = rollups.stats(start, end, bucket)
+
+    expected = expected_stats(alerts, start, end, bucket)
+    assert {field: stats[field] for field in expected} == expected
+
+def test_the_current_minute_counts_while_rollups_are_cached(db, rollups):
+    store(db, [{'timestamp': at(0, 10), 'severity': 1, 'attack_type': 1}])
+    assert rollups.stats(end=at(1, 30))['total'] == 1
+
+    store(db, [{'timestamp': at(1, 5), 'severity': 2, 'attack_type': 2},
+               {'timestamp': at(1, 45), 'severity': 2, 'attack_type': 2}])
+    stats = rollups.stats(end=at(1, 30))
+
+    assert rollups.hits == 1
+    assert stats['total'] == 2
+    assert stats['severity'] == {'1': 1, '2': 1}
+
+def test_totals_only_leave_out_the_timeline(db, rollups):
+    store(db, random_alerts(500, seed=2))
+
+    totals = rollups.stats(at(5, 30), at(100, 15), timeline=False, severity_names={1: 'Low'})
+    full = rollups.stats(at(5, 30), at(100, 15), severity_names={1: 'Low'})
+
+    assert 'timeline' not in totals
+    assert totals == {field: value for field, value in full.items() if field != 'timeline'}
+    assert 'Low' in totals['severity']
+
+def test_without_the_alerts_collection_ranges_widen_to_whole_minutes(db):
+    store(db, [{'timestamp': at(0, 10), 'severity': 1, 'attack_type': 1},
+               {'timestamp': at(1, 45), 'severity': 1, 'attack_type': 1}])
+    assert AlertRollups(db['alert_rollups']).stats(at(0, 30), at(1, 30))['total'] == 2
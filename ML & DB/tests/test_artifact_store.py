@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pytest
+
+import model
+from artifact_store import CURRENT, ArtifactStore
+
+def publish_with_columns(trained_system, replace, name):
+    """A copy of the trained version, with feature columns renamed in its manifest"""
+    store = model.artifact_store
+    version = f"{trained_system.model_version}-{name}"
+    shutil.copytree(store.path(trained_system.model_version), store.path(version))
+    manifest = store.manifest(version)
+    manifest['feature_columns'] = [replace.get(col, col) for col in manifest['feature_columns']]
+    with open(store.path(version, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    return version
+
+def scaled_rows(system, n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(n, len(system.feature_columns))).astype(model.FEATURE_DTYPE)
+
+def test_saved_version_scores_like_the_trained_system(trained_system, tmp_path):
+    store = ArtifactStore(str(tmp_path / "models"))
+    version = store.save(trained_system)
+    loaded = model.CyberSecurityDetectionSystem(serving=False)
+    manifest = store.load(loaded)
+
+    assert manifest['version'] == loaded.model_version == version == store.current_version()
+    assert loaded.feature_columns == trained_system.feature_columns
+    assert loaded.training_metadata == json.loads(json.dumps(trained_system.training_metadata, default=str))
+    # Arrays are shared through the page cache rather than copied into each process
+    assert isinstance(loaded.scaler.mean_, np.memmap)
+    np.testing.assert_array_equal(loaded.scaler.scale_, trained_system.scaler.scale_)
+    X = scaled_rows(trained_system)
+    np.testing.assert_array_equal(loaded._lgbm_predict(X), trained_system._lgbm_predict(X))
+    np.testing.assert_array_equal(loaded._forest_predict(X), trained_system._forest_predict(X))
+    np.testing.assert_array_equal(loaded._reconstruction_error(X), trained_system._reconstruction_error(X))
+    np.testing.assert_array_equal(loaded.training_window, trained_system.training_window)
+    assert loaded.ae_threshold == trained_system.ae_threshold
+    assert loaded.ae_sketch.quantile(0.95) == trained_system.ae_sketch.quantile(0.95)
+
+def test_current_moves_only_when_a_version_is_published(trained_system, tmp_path):
+    store = ArtifactStore(str(tmp_path / "models"))
+    first = store.save(trained_system)
+    second = store.save(trained_system, publish=False)
+
+    assert first != second
+    assert store.versions() == sorted([first, second])
+    assert store.current_version() == first
+    store.publish(second)
+    assert store.current_version() == second
+    assert sorted(os.listdir(store.root)) == sorted([CURRENT, first, second])
+
+def test_readers_never_see_a_partly_written_current(trained_system, tmp_path):
+    store = ArtifactStore(str(tmp_path / "models"))
+    versions = [store.save(trained_system, publish=False) for _ in range(2)]
+    store.publish(versions[0])
+    seen, done = set(), threading.Event()
+
+    def read():
+        while not done.is_set():
+            seen.add(store.current_version())
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for i in range(500):
+        store.publish(versions[i % 2])
+    done.set()
+    reader.join()
+
+    assert seen <= set(versions)
+
+def test_failed_save_leaves_no_version_behind(trained_system, tmp_path, monkeypatch):
+    store = ArtifactStore(str(tmp_path / "models"))
+    published = store.save(trained_system)
+
+    def fail(path):
+        raise OSError("disk full")
+
+    broken = model.CyberSecurityDetectionSystem(serving=False)
+    model.load_models(broken, trained_system.model_version)
+    monkeypatch.setattr(broken.lgbm_model, "save_model", fail)
+    with pytest.raises(OSError, match="disk full"):
+        store.save(broken)
+
+    assert store.versions() == [published]
+    assert store.current_version() == published
+    assert sorted(os.listdir(store.root)) == sorted([CURRENT, published])
+
+def test_trained_models_match_the_feature_schema(trained_system):
+    assert set(trained_system.feature_columns) == set(model.feature_schema())
+
+def test_old_ip_columns_refuse_to_load(trained_system, system, monkeypatch):
+    version = publish_with_columns(trained_system, {'Source IP_prefix': 'Source IP_hi'}, 'old-ip')
+    monkeypatch.setattr(model, "system", system)
+
+    with pytest.raises(model.IncompatibleModels, match="Source IP_hi"):
+        model.reload_models(version)
+    # The serving system keeps the model set it had
+    assert model.system is system
+
+def test_behavioral_columns_need_behavior_features(trained_system, monkeypatch):
+    monkeypatch.setattr(model, "BEHAVIOR_FEATURES", False)
+    with pytest.raises(model.IncompatibleModels, match="Pair Events"):
+        model.load_models(model.CyberSecurityDetectionSystem(serving=False), trained_system.model_version)
+
+def test_versions_without_missing_left_still_load(trained_system):
+    version = publish_with_columns(trained_system, {}, 'no-missing-left')
+    os.remove(model.artifact_store.path(version, "iforest_missing_left.npy"))
+    loaded = model.CyberSecurityDetectionSystem(serving=False)
+    model.load_models(loaded, version)
+
+    X = np.random.default_rng(0).normal(size=(200, len(loaded.feature_columns))).astype(np.float32)
+    np.testing.assert_array_equal(loaded._forest_predict(X), trained_system.isolation_forest.predict(X))
@@ -0,0 +1,57 @@
+import os
+
+import pandas as pd
+import pytest
+
+import batch_score
+from benchmarks.synthetic import generate_dataset
+
+@pytest.fixture(scope="module")
+def events_csv(trained_system, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("batch") / "events.csv")
+    # A few hours of events, so behavioral windows carry over between chunks
+    data = generate_dataset(600, seed=11)
+    data['Timestamp'] = pd.date_range("2024-01-01", periods=len(data), freq="20s").astype(str)
+    data.to_csv(path, index=False)
+    return path
+
+def score(events_csv, output, workers, *options):
+    batch_score.main([events_csv, str(output), '--workers', str(workers), '--chunk-rows', '100',
+                      '--keep', 'Event ID', *options])
+    return pd.read_parquet(str(output)).sort_values('row', ignore_index=True)
+
+def test_scores_do_not_depend_on_the_number_of_workers(events_csv, tmp_path):
+    one = score(events_csv, tmp_path / "one", 1)
+    two = score(events_csv, tmp_path / "two", 2)
+
+    pd.testing.assert_frame_equal(one, two)
+    assert one['row'].tolist() == list(range(600))
+
+def test_rerun_scores_only_the_missing_chunks(events_csv, tmp_path, capsys):
+    output = tmp_path / "scores"
+    expected = score(events_csv, output, 2)
+    parts = sorted(os.listdir(output))
+    kept = {name: os.stat(output / name).st_mtime_ns for name in parts if name.startswith("part-")}
+    # An interrupted run: two parts never finished, one of them mid-write
+    for name in ("part-000001.parquet", "part-000004.parquet"):
+        os.remove(output / name)
+        del kept[name]
+    (output / f"part-000004.parquet.tmp-{os.getpid()}").write_bytes(b"PAR1 truncated")
+    capsys.readouterr()
+
+    resumed = score(events_csv, output, 2)
+
+    pd.testing.assert_frame_equal(resumed, expected)
+    assert "4 chunks already done were skipped" in capsys.readouterr().out
+    assert sorted(os.listdir(output)) == parts
+    assert {name: os.stat(output / name).st_mtime_ns for name in kept} == kept
+
+def test_different_runs_do_not_resume_each_other(events_csv, tmp_path):
+    output = tmp_path / "scores"
+    score(events_csv, output, 1)
+
+    with pytest.raises(SystemExit, match="different run"):
+        score(events_csv, output, 1, '--alerts-only')
+    alerts = score(events_csv, output, 1, '--alerts-only', '--overwrite')
+
+    assert alerts['alert'].all()
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+import model
+from benchmarks.synthetic import generate_dataset
+
+@pytest.fixture
+def client(system, monkeypatch):
+    monkeypatch.setattr(model, "system", system)
+    return model.app.test_client()
+
+def records(n, seed=0):
+    frame = generate_dataset(n, seed=seed).assign(Timestamp="2024-01-01 12:00:00")
+    return frame.astype(object).to_dict('records')
+
+def bulk(client, records):
+    body = ''.join(json.dumps(record) + "\n" for record in records)
+    response = client.post('/detect/bulk', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+def test_only_the_bad_record_is_reported(client, system):
+    body = records(3)
+    body[1]['Timestamp'] = "garbage"
+
+    lines = bulk(client, body)
+
+    errors = [line for line in lines if 'error' in line]
+    assert [(error['start'], error['end']) for error in errors] == [(1, 2)]
+    assert all(line['index'] in (0, 2) for line in lines if 'index' in line)
+    assert lines[-1]['done'] and lines[-1]['processed'] == 3
+    # The two valid records were scored, once each
+    assert sum(window.events for window in system.feature_store.sources.values()) == 2
+
+def test_bad_records_across_a_chunk(client, system, monkeypatch):
+    monkeypatch.setattr(model, "BULK_CHUNK_ROWS", 8)
+    body = records(20, seed=1)
+    for position in (0, 9, 10, 19):
+        body[position]['Data Exfiltrated'] = "yes"
+
+    lines = bulk(client, body)
+
+    assert sorted(line['start'] for line in lines if 'error' in line) == [0, 9, 10, 19]
+    assert sum(window.events for window in system.feature_store.sources.values()) == 16
+    assert lines[-1]['processed'] == 20
+
+def test_alerts_skip_the_bad_record_and_keep_input_order(client, system):
+    body = records(30, seed=2)
+    body[5]['Timestamp'] = "garbage"
+
+    lines = bulk(client, body)
+
+    indexes = [line['index'] for line in lines if 'index' in line]
+    assert 5 not in indexes
+    assert indexes == sorted(indexes)
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import model
+from benchmarks.synthetic import generate_dataset
+
+INT8_COLUMNS = ['Attack Severity', 'Attack Type', 'Data Exfiltrated']
+INT8_PREFIXES = ('Browser_', 'Device_', 'Response Action_')
+
+@pytest.fixture
+def features(trained_system):
+    """Unscaled feature rows in the trained column order"""
+    return trained_system.preprocess_data(generate_dataset(500, seed=20))
+
+@pytest.mark.parametrize("rows", [None, np.random.default_rng(0).permutation(500)[:137]])
+def test_float32_scaling_rounds_the_float64_transform(trained_system, features, rows, monkeypatch):
+    monkeypatch.setattr(model, "SCALE_BLOCK_ROWS", 64)
+    expected = trained_system.scaler.transform(features)
+    if rows is not None:
+        expected = expected[rows]
+
+    scaled = trained_system._scale(features, rows)
+    assert scaled.dtype == np.float32
+    np.testing.assert_array_equal(scaled, expected.astype(np.float32))
+
+    monkeypatch.setattr(model, "FEATURE_DTYPE", np.float64)
+    np.testing.assert_array_equal(trained_system._scale(features, rows), expected)
+
+def test_compact_columns_hold_the_values_of_wide_ones(dataset_csv):
+    system = model.CyberSecurityDetectionSystem(serving=False)
+    compact = system.preprocess_data(pd.read_csv(dataset_csv, dtype=model.CSV_DTYPES), model.behavior_store())
+    wide = system.preprocess_data(pd.read_csv(dataset_csv), model.behavior_store())
+
+    for column in compact.columns:
+        if column in INT8_COLUMNS or column.startswith(INT8_PREFIXES):
+            assert compact[column].dtype == np.int8, column
+    for column in model.BEHAVIOR_COLUMNS if model.BEHAVIOR_FEATURES else []:
+        assert compact[column].dtype == np.int32, column
+    pd.testing.assert_frame_equal(compact.astype(np.float64), wide.astype(np.float64))
+
+def test_float32_scores_match_float64_scores(system, monkeypatch):
+    records = model.records_frame(generate_dataset(2000, seed=21))
+    monkeypatch.setattr(model, "SCORE_CACHE_MB", 0)
+    compact = system.score_batch(records.copy())
+    monkeypatch.setattr(model, "FEATURE_DTYPE", np.float64)
+    wide = system.score_batch(records.copy())
+
+    for column in ['attack_type', 'severity', 'isolation_forest_anomaly', 'autoencoder_anomaly', 'alert']:
+        pd.testing.assert_series_equal(compact[column], wide[column])
+    np.testing.assert_allclose(compact['confidence'], wide['confidence'], rtol=1e-6)
+    np.testing.assert_allclose(compact['autoencoder_score'], wide['autoencoder_score'], rtol=1e-5)
@@ -0,0 +1,73 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import model
+from benchmarks.synthetic import generate_dataset
+from eda import BROWSER_COLUMNS, DEVICE_COLUMNS, EdaSummary, build_figures
+
+@pytest.fixture(scope="module")
+def processed():
+    system = model.CyberSecurityDetectionSystem(serving=False)
+    return system.preprocess_data(generate_dataset(3000, seed=30), model.behavior_store())
+
+def value_counts(series):
+    return {str(code): int(count) for code, count in series.value_counts().items()}
+
+@pytest.mark.parametrize("block_rows", [1000, 333, 3000])
+def test_aggregates_match_the_full_frame(processed, block_rows):
+    summary = EdaSummary.from_frame(processed, block_rows=block_rows)
+
+    assert summary.rows == len(processed)
+    assert summary.attack_types == value_counts(processed['Attack Type'])
+    assert summary.severities == value_counts(processed['Attack Severity'])
+    assert summary.devices == {col: int(processed[col].sum()) for col in DEVICE_COLUMNS}
+    assert summary.browsers == {col: int(processed[col].sum()) for col in BROWSER_COLUMNS}
+    np.testing.assert_allclose(summary.mean, processed.mean().to_numpy(), rtol=1e-12)
+    columns, matrix = summary.correlation()
+    assert columns == processed.columns.tolist()
+    # Constant columns have no correlation in either
+    np.testing.assert_allclose(matrix, processed.corr().to_numpy(), rtol=1e-9, atol=1e-12)
+
+@pytest.mark.parametrize("max_points", [500, 20])
+def test_timeline_matches_grouping_the_full_frame(processed, max_points):
+    summary = EdaSummary.from_frame(processed, block_rows=700, max_points=max_points, bucket_seconds=3600)
+    points = summary.timeline_points()
+
+    assert len(points) <= max_points
+    assert summary.bucket_seconds % 3600 == 0
+    severity = processed['Attack Severity'].astype(np.float64)
+    grouped = severity.groupby(processed['Timestamp'] // summary.bucket_seconds).agg(['size', 'mean', 'max'])
+    assert [point[0].timestamp() for point in points] == [float(bucket * summary.bucket_seconds)
+                                                          for bucket in grouped.index]
+    assert [point[1] for point in points] == grouped['size'].tolist()
+    np.testing.assert_allclose([point[2] for point in points], grouped['mean'], rtol=1e-12)
+    assert [point[3] for point in points] == grouped['max'].tolist()
+
+def test_chunks_of_an_empty_summary_fold_like_one_frame(processed):
+    whole = EdaSummary.from_frame(processed)
+    folded = EdaSummary()
+    for rows in np.array_split(np.arange(len(processed)), 7):
+        folded.update(processed.iloc[rows])
+    folded.update(processed.iloc[:0])
+
+    whole_dict, folded_dict = whole.to_dict(), folded.to_dict()
+    np.testing.assert_allclose(np.array(folded_dict.pop('correlation'), dtype=float),
+                               np.array(whole_dict.pop('correlation'), dtype=float), rtol=1e-9, atol=1e-12)
+    assert folded_dict == whole_dict
+
+def test_figures_come_from_the_saved_summary(processed):
+    pytest.importorskip("plotly")
+    summary = EdaSummary.from_frame(processed, attack_type_names={1: 'Malware'})
+    figures = build_figures(json.loads(json.dumps(summary.to_dict())))
+
+    pie = figures['attack_distribution'].data[0]
+    assert dict(zip(pie.labels, pie.values)) == {('Malware' if code == '1' else code): count
+                                                 for code, count in summary.attack_types.items()}
+    assert list(figures['device_distribution'].data[0].y) == list(summary.devices.values())
+    heatmap = figures['correlation_heatmap'].data[0]
+    assert list(heatmap.x) == processed.columns.tolist()
+    correlation = pd.DataFrame(heatmap.z, dtype=float).to_numpy()
+    np.testing.assert_allclose(correlation, processed.corr().to_numpy(), rtol=1e-9, atol=1e-12)
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+import feature_store
+import model
+from benchmarks.synthetic import generate_dataset
+from feature_store import FeatureStore
+
+SETTINGS = [
+    dict(window_seconds=300, buckets=30),
+    # Few buckets and a short TTL, so windows slide and idle sources expire between batches
+    dict(window_seconds=30, buckets=3, ttl_seconds=50),
+    # LRU eviction on every batch
+    dict(window_seconds=300, buckets=30, max_entities=3),
+    # Sources run out of destination budget
+    dict(window_seconds=300, buckets=30, max_destinations=2),
+]
+
+def batches(seed, count=6):
+    """Batches of (timestamps, sources, destinations, failed), partly out of order and overlapping in time"""
+    rng = np.random.default_rng(seed)
+    start = 1_700_000_000
+    for _ in range(count):
+        n = int(rng.integers(0, 80))
+        timestamps = start + rng.integers(-100, int(rng.choice([5, 60, 400, 2000])), n)
+        start += int(rng.integers(0, 300))
+        sources = rng.choice(list("abcdefg")[:int(rng.integers(1, 8))], n).astype(object)
+        destinations = rng.choice(list("vwxyz"), n).astype(object)
+        yield timestamps, sources, destinations, rng.random(n) < 0.3
+
+def state(store):
+    """Everything a store keeps, with the sources in LRU order"""
+    return ([(source, [(index, events, failed, dict(destinations))
+                       for index, events, failed, destinations in window.buckets],
+              window.events, window.failed, dict(window.destinations), window.last_seen)
+             for source, window in store.sources.items()], store.newest, store.evicted)
+
+def force_path(monkeypatch, vectorized):
+    if vectorized:
+        monkeypatch.setattr(feature_store, "VECTORIZE_MIN_EVENTS", 0)
+        monkeypatch.setattr(feature_store, "VECTORIZE_MIN_EVENTS_PER_WINDOW", 0)
+    else:
+        monkeypatch.setattr(feature_store, "VECTORIZE_MIN_EVENTS", np.iinfo(np.int64).max)
+
+def run(monkeypatch, vectorized, settings, seed):
+    """Features of every batch and the final state, with update forced down one path"""
+    with monkeypatch.context() as patch:
+        force_path(patch, vectorized)
+        store = FeatureStore(**settings)
+        features = [store.update(*batch) for batch in batches(seed)]
+    return features, state(store)
+
+@pytest.mark.parametrize("settings", SETTINGS)
+@pytest.mark.parametrize("seed", range(5))
+def test_vectorized_update_matches_per_event(monkeypatch, settings, seed):
+    expected_features, expected_state = run(monkeypatch, False, settings, seed)
+    features, final_state = run(monkeypatch, True, settings, seed)
+
+    for expected, actual in zip(expected_features, features):
+        for col in feature_store.FEATURE_COLUMNS:
+            np.testing.assert_array_equal(actual[col], expected[col], err_msg=col)
+    assert final_state == expected_state
+
+def test_eviction_keeps_the_most_recently_seen_sources():
+    store = FeatureStore(max_entities=2)
+    for second, source in enumerate(["a", "b", "a", "c"]):
+        store.update([1_700_000_000 + second], [source], ["x"], False)
+    assert list(store.sources) == ["a", "c"]
+    assert store.evicted == 1
+
+def test_features_count_the_window_and_the_event_itself():
+    store = FeatureStore(window_seconds=300, buckets=30)
+    features = store.update([0, 10, 20, 400], ["a", "a", "a", "a"], ["x", "y", "x", "x"], [True, False, False, False])
+    assert features['Source Events'].tolist() == [1, 2, 3, 1]
+    assert features['Source Distinct Destinations'].tolist() == [1, 2, 2, 1]
+    assert features['Source Failed Events'].tolist() == [1, 1, 1, 0]
+    assert features['Pair Events'].tolist() == [1, 1, 2, 1]
+
+def test_restored_snapshot_continues_like_the_original(tmp_path):
+    path = str(tmp_path / "store.pkl")
+    settings = SETTINGS[2]
+    original = FeatureStore(**settings)
+    *history, last = list(batches(seed=7))
+    for batch in history:
+        original.update(*batch)
+    original.snapshot(path)
+
+    restored = FeatureStore(**settings)
+    assert restored.restore(path)
+    assert state(restored) == state(original)[:2] + (0,)
+    expected, actual = original.update(*last), restored.update(*last)
+    for col in feature_store.FEATURE_COLUMNS:
+        np.testing.assert_array_equal(actual[col], expected[col])
+
+def test_snapshot_with_other_window_settings_is_ignored(tmp_path):
+    path = str(tmp_path / "store.pkl")
+    store = FeatureStore(window_seconds=300)
+    store.update([1_700_000_000], ["a"], ["x"], False)
+    store.snapshot(path)
+    assert not FeatureStore(window_seconds=60).restore(path)
+    assert not FeatureStore().restore(str(tmp_path / "missing.pkl"))
+
+def test_preprocess_data_without_a_store_is_stateless(system):
+    data = generate_dataset(50)
+    first = system.preprocess_data(data.copy())
+    second = system.preprocess_data(data.copy())
+
+    assert first.equals(second)
+    assert not len(system.feature_store)
+    assert not first[feature_store.FEATURE_COLUMNS].to_numpy().any()
+
+def test_training_and_offline_scoring_leave_the_serving_window_alone(system, dataset_csv):
+    system.feature_store.update([1_700_000_000], ["10.0.0.1"], ["10.0.0.2"], False)
+    before = state(system.feature_store)
+
+    system.score_batch(model.records_frame(generate_dataset(20)))
+    model.train_from_csv(system, dataset_csv)
+
+    assert state(system.feature_store) == before
+
+def test_training_features_do_not_depend_on_the_serving_window(trained_system, system):
+    data = generate_dataset(100, seed=5)
+    system.feature_store.update(np.full(100, 1_700_000_000), data["Source IP"], data["Destination IP"], False)
+
+    expected = trained_system.preprocess_data(data.copy(), model.behavior_store())
+    assert system.preprocess_data(data.copy(), model.behavior_store()).equals(expected)
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import model
+from artifact_store import ArtifactStore
+from benchmarks.synthetic import generate_dataset
+from event_sources import read_events
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A model directory of the test's own, so CURRENT of the session stays put"""
+    store = ArtifactStore(str(tmp_path / "models"))
+    monkeypatch.setattr(model, "artifact_store", store)
+    return store
+
+def test_appended_events_update_the_published_models(dataset_csv, store, tmp_path):
+    source = str(tmp_path / "labeled.csv")
+    pd.read_csv(dataset_csv).head(1500).to_csv(source, index=False)
+    base = model.CyberSecurityDetectionSystem(serving=False)
+    model.train_from_csv(base, source)
+    base_version = model.save_models(base)
+    generate_dataset(400, seed=7).to_csv(source, mode="a", header=False, index=False)
+
+    updated = model.CyberSecurityDetectionSystem(serving=False)
+    comparison = model.train_incremental(updated, source)
+
+    assert set(comparison) == {'previous', 'current'}
+    metadata = updated.training_metadata
+    assert metadata['mode'] == 'incremental'
+    assert metadata['base_version'] == base_version
+    assert metadata['train_rows'] + metadata['test_rows'] == 400
+    assert metadata['event_source'] == {'source': source, 'watermark': 1900}
+    # The scaler is kept so the existing trees keep their meaning; boosting continues from them
+    assert updated.feature_columns == base.feature_columns
+    np.testing.assert_array_equal(updated.scaler.mean_, base.scaler.mean_)
+    assert updated.lgbm_model.num_trees() == \
+        base.lgbm_model.num_trees() + model.INCREMENTAL_BOOST_ROUNDS * base.lgbm_model.num_model_per_iteration()
+    assert len(updated.training_window) == min(len(base.training_window) + metadata['train_rows'],
+                                               model.ISOLATION_FOREST_WINDOW)
+
+    # The next run starts after the events consumed here
+    model.save_models(updated)
+    with pytest.raises(ValueError, match="Only 0 new labeled events"):
+        model.train_incremental(model.CyberSecurityDetectionSystem(serving=False), source)
+
+def test_incremental_training_needs_a_trained_model_set():
+    with pytest.raises(ValueError, match="run a full training first"):
+        model.CyberSecurityDetectionSystem(serving=False).train_models_incremental(generate_dataset(200))
+
+def test_file_sources_resume_after_the_watermark(tmp_path):
+    events = generate_dataset(30, seed=8)
+    csv, parquet = str(tmp_path / "events.csv"), str(tmp_path / "events.parquet")
+    events.head(20).to_csv(csv, index=False)
+    events.to_parquet(parquet)
+
+    first, watermark = read_events(csv)
+    events.tail(10).to_csv(csv, mode="a", header=False, index=False)
+    rest, watermark = read_events(csv, watermark=watermark)
+
+    assert (len(first), len(rest), watermark) == (20, 10, 30)
+    assert rest['Source IP'].tolist() == events['Source IP'].tail(10).tolist()
+    tail, watermark = read_events(parquet, watermark=25)
+    assert (len(tail), watermark) == (5, 30)
+
+def test_collection_sources_resume_after_the_last_id():
+    mongomock = pytest.importorskip("mongomock")
+    collection = mongomock.MongoClient()['cybersecurity_db']['labeled_events']
+    collection.insert_many([{'event': i} for i in range(5)])
+    db = collection.database
+
+    first, watermark = read_events("mongodb:labeled_events", db)
+    collection.insert_many([{'event': i} for i in range(5, 8)])
+    rest, watermark = read_events("mongodb:labeled_events", db, watermark)
+
+    assert first['event'].tolist() == [0, 1, 2, 3, 4]
+    assert rest['event'].tolist() == [5, 6, 7]
+    assert read_events("mongodb:labeled_events", db, watermark)[1] == watermark
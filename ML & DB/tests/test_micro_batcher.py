@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+import model
+from benchmarks.synthetic import generate_dataset
+from micro_batcher import MicroBatcher
+
+def submit_together(batcher, frames):
+    """Submit frames from concurrent threads; returns each one's alerts or exception"""
+    results = [None] * len(frames)
+
+    def submit(position):
+        try:
+            results[position] = batcher.submit(frames[position])
+        except Exception as e:
+            results[position] = e
+
+    threads = [threading.Thread(target=submit, args=(position,)) for position in range(len(frames))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def window_events(store):
+    return sum(window.events for window in store.sources.values())
+
+def test_bad_request_fails_alone_and_leaves_no_state(system):
+    # One timestamp, so no event leaves the window or the TTL before the counts are compared
+    good = model.records_frame(generate_dataset(20, seed=3).assign(Timestamp="2024-01-01 12:00:00"))
+    bad = model.records_frame(generate_dataset(1, seed=4).assign(**{'Data Exfiltrated': 'yes'}))
+    batcher = MicroBatcher(system.detect_anomalies, max_wait_ms=500, retry_on=(model.InvalidRecords,))
+
+    alerts, error = submit_together(batcher, [good, bad])
+
+    assert batcher.stats()['batch_requests']['count'] == 1  # Both went into one batch
+    assert isinstance(alerts, list)
+    assert isinstance(error, model.InvalidRecords)
+    reference = model.behavior_store()
+    model.behavior_features(reference, good)
+    # The failed combined pass did not add the good request's events a second time
+    assert window_events(system.feature_store) == window_events(reference) == len(good)
+
+def test_other_errors_fail_the_batch_without_retrying():
+    calls = []
+
+    def detect(frame, return_rows=True):
+        calls.append(len(frame))
+        raise RuntimeError("model failure")
+
+    batcher = MicroBatcher(detect, max_wait_ms=500, retry_on=(model.InvalidRecords,))
+    results = submit_together(batcher, [generate_dataset(3), generate_dataset(2)])
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert calls == [5]
+
+def test_detect_rejects_invalid_records_with_400(system, monkeypatch):
+    monkeypatch.setattr(model, "system", system)
+    monkeypatch.setattr(model, "batcher", None)
+    record = generate_dataset(1).astype(object).iloc[0].to_dict()
+    response = model.app.test_client().post('/detect', json=[dict(record, Timestamp="garbage")])
+    assert response.status_code == 400
+    assert not len(system.feature_store)
+
+@pytest.mark.parametrize("field, value", [("Timestamp", "garbage"), ("Data Exfiltrated", "yes")])
+def test_invalid_values_raise_before_the_window_is_updated(system, field, value):
+    frame = model.records_frame(generate_dataset(5).assign(**{field: value}))
+    with pytest.raises(model.InvalidRecords):
+        system.detect_anomalies(frame)
+    assert not len(system.feature_store)
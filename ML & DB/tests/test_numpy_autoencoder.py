@@ -0,0 +1,58 @@
+"""NumpyAutoencoder must score like the Keras model it was exported from.
+
+Run from the ``ML & DB`` directory:
+
+    python -m pytest tests
+"""
+import numpy as np
+import pytest
+
+keras = pytest.importorskip("tensorflow").keras
+
+from numpy_autoencoder import NumpyAutoencoder
+
+N_FEATURES = 24
+
+def reconstruction_mse(X, reconstructed):
+    return np.mean(np.power(X - reconstructed, 2), axis=1)
+
+@pytest.fixture(scope="module")
+def saved_model(tmp_path_factory):
+    """An autoencoder as build_autoencoder makes it, briefly trained, saved and loaded back"""
+    import model
+    from benchmarks.memory_mongo import InMemoryClient
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(model, "MongoClient", InMemoryClient)
+        system = model.CyberSecurityDetectionSystem(serving=False)
+    X = np.random.default_rng(0).standard_normal((512, N_FEATURES)).astype(np.float32)
+    autoencoder = system.build_autoencoder(N_FEATURES)
+    autoencoder.fit(X, X, epochs=2, batch_size=32, verbose=0)
+    path = str(tmp_path_factory.mktemp("autoencoder") / "autoencoder.keras")
+    autoencoder.save(path)
+    return keras.models.load_model(path), X
+
+def test_matches_keras_predict(saved_model):
+    autoencoder, X = saved_model
+    expected = autoencoder.predict(X, verbose=0)
+    actual = NumpyAutoencoder.from_keras(autoencoder).predict(X)
+    np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-6)
+    np.testing.assert_allclose(reconstruction_mse(X, actual), reconstruction_mse(X, expected), rtol=1e-3)
+
+def test_saved_arrays_match_keras_predict(saved_model, tmp_path):
+    autoencoder, X = saved_model
+    path = str(tmp_path / "autoencoder.npz")
+    NumpyAutoencoder.from_keras(autoencoder).save(path)
+    expected = reconstruction_mse(X, autoencoder.predict(X, verbose=0))
+    np.testing.assert_allclose(reconstruction_mse(X, NumpyAutoencoder.load(path).predict(X)), expected, rtol=1e-3)
+
+def test_int8_stays_close_to_keras_predict(saved_model):
+    autoencoder, X = saved_model
+    expected = reconstruction_mse(X, autoencoder.predict(X, verbose=0))
+    actual = reconstruction_mse(X, NumpyAutoencoder.from_keras(autoencoder).quantize().predict(X))
+    np.testing.assert_allclose(actual, expected, rtol=5e-2)
+
+def test_single_row_matches_batch(saved_model):
+    autoencoder, X = saved_model
+    numpy_autoencoder = NumpyAutoencoder.from_keras(autoencoder)
+    np.testing.assert_allclose(numpy_autoencoder.predict(X[:1]), numpy_autoencoder.predict(X)[:1], rtol=1e-6)
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from quantile_sketch import QuantileSketch
+
+QUANTILES = [0.01, 0.25, 0.5, 0.9, 0.95, 0.99, 0.999]
+
+def distributions(n, seed):
+    rng = np.random.default_rng(seed)
+    return {
+        'lognormal': rng.lognormal(-3, 2, n),
+        'exponential': rng.exponential(0.05, n),
+        'uniform': rng.uniform(1, 2, n),
+        'pareto': rng.pareto(1.5, n) + 1e-3,
+    }
+
+def assert_within_accuracy(sketch, values, accuracy):
+    for q in QUANTILES:
+        exact = np.quantile(values, q, method='inverted_cdf')
+        assert abs(sketch.quantile(q) - exact) <= accuracy * exact * (1 + 1e-9), q
+
+@pytest.mark.parametrize("name", ["lognormal", "exponential", "uniform", "pareto"])
+@pytest.mark.parametrize("accuracy", [0.01, 0.05])
+def test_quantiles_are_within_the_relative_accuracy(name, accuracy):
+    values = distributions(100_000, seed=0)[name]
+    sketch = QuantileSketch(relative_accuracy=accuracy)
+    sketch.add(values)
+
+    assert sketch.count == len(values)
+    assert_within_accuracy(sketch, values, accuracy)
+
+def test_batches_count_like_one_add():
+    values = distributions(20_000, seed=1)['lognormal']
+    whole, batched = QuantileSketch(), QuantileSketch()
+    whole.add(values)
+    for start in range(0, len(values), 777):
+        batched.add(values[start:start + 777])
+
+    assert batched.offset == whole.offset
+    np.testing.assert_array_equal(batched.counts, whole.counts)
+
+def test_bucket_budget_keeps_the_upper_tail_exact():
+    rng = np.random.default_rng(2)
+    # 200 buckets at 1% span a factor of about 55: the tiny scores fold into the lowest one
+    tiny, scores = rng.uniform(1e-9, 1e-6, 1000), rng.uniform(1, 20, 49_000)
+    values = np.concatenate([tiny, scores])
+    sketch = QuantileSketch(max_buckets=200)
+    for start in range(0, len(values), 5000):
+        sketch.add(values[start:start + 5000])
+
+    assert len(sketch.counts) == 200
+    for q in [0.05, 0.5, 0.9, 0.99]:
+        exact = np.quantile(values, q, method='inverted_cdf')
+        assert abs(sketch.quantile(q) - exact) <= 0.01 * exact * (1 + 1e-9), q
+    assert sketch.quantile(0.01) < scores.min()
+
+def test_zero_and_non_finite_scores():
+    sketch = QuantileSketch()
+    sketch.add([0.0, 0.0, 0.0, np.nan, np.inf, 1.0])
+
+    assert sketch.count == 4
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1.0) == pytest.approx(1.0, rel=0.01)
+    assert QuantileSketch().quantile(0.5) is None
+
+def test_decay_follows_a_shifted_distribution():
+    rng = np.random.default_rng(3)
+    sketch = QuantileSketch(half_life=10_000)
+    sketch.add(rng.exponential(1.0, 100_000))
+    shifted = rng.exponential(10.0, 100_000)
+    for start in range(0, len(shifted), 1000):
+        sketch.add(shifted[start:start + 1000])
+
+    exact = np.quantile(shifted, 0.95, method='inverted_cdf')
+    assert sketch.quantile(0.95) == pytest.approx(exact, rel=0.05)
+
+def test_state_round_trip():
+    sketch = QuantileSketch(relative_accuracy=0.02, half_life=5000)
+    sketch.add(distributions(10_000, seed=4)['pareto'])
+    restored = QuantileSketch.from_state(*sketch.to_state())
+
+    assert [restored.quantile(q) for q in QUANTILES] == [sketch.quantile(q) for q in QUANTILES]
+    restored.add([1.0])
+    assert restored.count != sketch.count
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import model
+from benchmarks.synthetic import generate_dataset
+from score_cache import ENTRY_OVERHEAD, ScoreCache
+
+@pytest.fixture
+def records():
+    return model.records_frame(generate_dataset(200, seed=9))
+
+def test_repeated_rows_are_answered_from_the_cache(system, records, monkeypatch):
+    monkeypatch.setattr(model, "SCORE_CACHE_MB", 0)
+    expected = system.score_batch(records)
+    monkeypatch.setattr(model, "SCORE_CACHE_MB", 32)
+
+    first = system.score_batch(records)
+    second = system.score_batch(records)
+
+    assert system.score_cache.stats()['hits'] == len(records)
+    assert system.score_cache.stats()['misses'] == len(records)
+    model_columns = ['attack_type', 'confidence', 'isolation_forest_anomaly', 'autoencoder_score']
+    assert first[model_columns].equals(expected[model_columns])
+    assert second.equals(first)
+
+def test_new_model_version_starts_an_empty_cache(system, records):
+    system.score_batch(records)
+    cache = system.score_cache
+    system.model_version = "retrained"
+
+    system.score_batch(records)
+
+    assert system.score_cache is not cache
+    assert system.score_cache.version == "retrained"
+    assert system.score_cache.stats()['hits'] == 0
+
+def test_changed_window_counts_are_not_hits(system):
+    # The same events again: each source's window now counts them twice
+    records = model.records_frame(generate_dataset(50, seed=10).assign(Timestamp="2024-01-01 12:00:00"))
+    system.detect_anomalies(records)
+    system.detect_anomalies(records)
+    assert system.score_cache.stats()['hits'] == 0
+
+def test_version_keys_the_digests():
+    rows = np.arange(6, dtype=np.float32).reshape(2, 3)
+    assert ScoreCache("a", 2**20).keys(rows) != ScoreCache("b", 2**20).keys(rows)
+    assert ScoreCache("a", 2**20).keys(rows) == ScoreCache("a", 2**20).keys(rows.copy())
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ScoreCache("v", 2 * (8 + ENTRY_OVERHEAD))
+    keys = cache.keys(np.arange(3, dtype=np.float32).reshape(3, 1))
+    cache.store(keys[:2], [[0.0], [1.0]])
+    cache.lookup(keys[:1])
+    cache.store(keys[2:], [[2.0]])
+
+    hit, outputs = cache.lookup(keys)
+    assert hit.tolist() == [True, False, True]
+    assert outputs.ravel().tolist() == [0.0, 2.0]
+    assert cache.evicted == 1
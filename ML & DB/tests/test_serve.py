@@ -0,0 +1,24 @@
+import model
+import serve
+
+def test_parent_starts_serving_state_only_in_workers(trained_system, monkeypatch, tmp_path):
+    snapshot = str(tmp_path / "feature_store.pkl")
+    store = model.behavior_store()
+    store.update([1_700_000_000], ["10.0.0.1"], ["10.0.0.2"], False)
+    store.snapshot(snapshot)
+    monkeypatch.setattr(model, "FEATURE_STORE_SNAPSHOT", snapshot)
+    monkeypatch.setattr(model, "system", None)
+    index_builds = []
+    monkeypatch.setattr(model.CyberSecurityDetectionSystem, "ensure_indexes",
+                        lambda system: index_builds.append(system))
+
+    serve.PreforkServer('127.0.0.1', 0, 1, 0).load()
+
+    assert model.system.model_version == trained_system.model_version
+    assert not index_builds
+    assert not len(model.system.feature_store)
+
+    # What each worker does after fork
+    model.system.connect()
+    model.system.start_serving()
+    assert len(model.system.feature_store) == 1
@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+import model
+from streaming import ReservoirSample, SpillFile, scaled_batches
+
+def sequential_reservoir(rows, capacity, seed):
+    """Algorithm R one row at a time, drawing from the generator in the same order"""
+    rng = np.random.default_rng(seed)
+    sample = list(rows[:capacity])
+    for position in range(capacity, len(rows)):
+        slot = int(rng.random() * (position + 1))
+        if slot < capacity:
+            sample[slot] = rows[position]
+    return np.array(sample)
+
+@pytest.mark.parametrize("block_rows", [1, 7, 250, 5000])
+def test_reservoir_blocks_sample_like_the_sequential_algorithm(block_rows):
+    rows = np.arange(5000, dtype=np.float64).reshape(-1, 1)
+    reservoir = ReservoirSample(100, 1, seed=3)
+    for start in range(0, len(rows), block_rows):
+        reservoir.add(rows[start:start + block_rows])
+
+    np.testing.assert_array_equal(reservoir.sample(), sequential_reservoir(rows, 100, seed=3))
+    assert reservoir.seen == len(rows)
+
+def test_spilled_rows_read_back_in_order(tmp_path):
+    rows = np.random.default_rng(0).normal(size=(300, 4))
+    spill = SpillFile(str(tmp_path / "rows.f64"), 4)
+    for start in range(0, 300, 64):
+        spill.append(rows[start:start + 64])
+
+    np.testing.assert_array_equal(spill.open(), rows)
+    spill.remove()
+    assert not list(tmp_path.iterdir())
+
+def test_autoencoder_batches_cover_every_row_each_epoch():
+    matrix = np.arange(250, dtype=np.float64).reshape(-1, 1)
+    scaler = StandardScaler().fit(matrix)
+    batches = scaled_batches(matrix, scaler, batch_size=32, block_rows=100)
+    steps_per_epoch = 2 * 4 + 2  # Two full blocks of 4 batches, a tail block of 2
+
+    for _ in range(2):
+        epoch = np.concatenate([next(batches)[0] for _ in range(steps_per_epoch)])
+        np.testing.assert_allclose(np.sort(scaler.inverse_transform(epoch).ravel()), matrix.ravel(), atol=1e-9)
+
+@pytest.fixture(scope="module")
+def ordered_csv(dataset_csv, tmp_path_factory):
+    """The training CSV in time order, as exports are: the window then sees the same events at any chunk size"""
+    path = str(tmp_path_factory.mktemp("streaming") / "ordered.csv")
+    pd.read_csv(dataset_csv).sort_values('Timestamp', kind='stable').to_csv(path, index=False)
+    return path
+
+def train_streaming(csv_path, chunk_rows):
+    system = model.CyberSecurityDetectionSystem(serving=False)
+    summary = system.train_models_streaming(csv_path, memory_budget_mb=64, chunk_rows=chunk_rows)
+    return system, summary
+
+def test_chunk_size_does_not_change_what_is_trained_on(ordered_csv, trained_system):
+    whole, whole_summary = train_streaming(ordered_csv, chunk_rows=5000)
+    chunked, chunked_summary = train_streaming(ordered_csv, chunk_rows=300)
+
+    assert chunked.feature_columns == whole.feature_columns == trained_system.feature_columns
+    # The behavioral window spans chunks, so the spilled rows are the ones of one whole-file pass
+    without_correlation = lambda summary: {key: value for key, value in summary.to_dict().items()
+                                           if key != 'correlation'}
+    assert without_correlation(chunked_summary) == without_correlation(whole_summary)
+    np.testing.assert_allclose(chunked_summary.correlation()[1], whole_summary.correlation()[1], atol=1e-12)
+    np.testing.assert_allclose(chunked.scaler.mean_, whole.scaler.mean_, rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(chunked.scaler.var_, whole.scaler.var_, rtol=1e-9, atol=1e-12)
+    assert chunked.scaler.n_samples_seen_ == whole.scaler.n_samples_seen_
+    assert chunked.training_metadata['mode'] == 'streaming'
+    assert chunked.training_metadata['train_rows'] + chunked.training_metadata['test_rows'] == 2000
+    # Spill files are removed once training is done
+    assert not [name for name in os.listdir('.') if name.startswith('training-')]
+
+    X = np.random.default_rng(1).normal(size=(50, len(chunked.feature_columns))).astype(model.FEATURE_DTYPE)
+    probabilities = chunked._lgbm_predict(X)
+    assert probabilities.shape == (50, len(model.ATTACK_TYPE_MAPPING))
+    np.testing.assert_allclose(probabilities.sum(axis=1), 1, rtol=1e-6)
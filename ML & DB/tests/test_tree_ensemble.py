@@ -0,0 +1,74 @@
+import lightgbm as lgb
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+
+from tree_ensemble import CompiledIsolationForest, CompiledLightGBM
+
+def data(n, seed, nan_share=0.0, dtype=np.float64):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 6)).astype(dtype)
+    X[:, 5] = rng.integers(0, 3, n)  # Many exact zeros, for zero_as_missing splits
+    X[rng.random(X.shape) < nan_share] = np.nan
+    return X
+
+def labels(X, classes):
+    return (np.nan_to_num(X[:, 0]) + np.nan_to_num(X[:, 1]) > 0).astype(int) + (classes > 2) * (X[:, 5] == 2)
+
+@pytest.mark.parametrize("train_nan", [0.0, 0.1])
+@pytest.mark.parametrize("options", [{}, {'zero_as_missing': True}])
+def test_lightgbm_matches_predict_proba(train_nan, options):
+    X = data(2000, seed=0, nan_share=train_nan)
+    classifier = lgb.LGBMClassifier(n_estimators=30, num_leaves=15, verbose=-1, **options).fit(X, labels(X, 3))
+    compiled = CompiledLightGBM.from_booster(classifier.booster_)
+
+    for X_test in (data(3000, seed=1), data(3000, seed=2, nan_share=0.2), data(500, seed=3, dtype=np.float32)):
+        np.testing.assert_array_equal(compiled.predict(X_test), classifier.predict_proba(X_test))
+
+@pytest.mark.parametrize("objective", ["binary", "regression"])
+def test_lightgbm_matches_booster_predict(objective):
+    X = data(2000, seed=4, nan_share=0.05)
+    booster = lgb.train({'objective': objective, 'num_leaves': 15, 'verbose': -1},
+                        lgb.Dataset(X, label=labels(X, 2)), num_boost_round=20)
+    compiled = CompiledLightGBM.from_booster(booster)
+
+    X_test = data(2000, seed=5, nan_share=0.2)
+    np.testing.assert_array_equal(compiled.predict(X_test), booster.predict(X_test))
+
+def test_lightgbm_compiles_the_best_iteration():
+    X = data(2000, seed=6)
+    y = labels(X, 3)
+    classifier = lgb.LGBMClassifier(n_estimators=200, learning_rate=0.3, verbose=-1)
+    classifier.fit(X[:1500], y[:1500], eval_set=[(X[1500:], y[1500:])],
+                   callbacks=[lgb.early_stopping(5, verbose=False)])
+    assert 0 < classifier.booster_.best_iteration < 200
+
+    np.testing.assert_array_equal(CompiledLightGBM.from_booster(classifier.booster_).predict(X),
+                                  classifier.booster_.predict(X))
+
+@pytest.mark.parametrize("max_features", [1.0, 0.5])
+def test_isolation_forest_matches_score_samples(max_features):
+    forest = IsolationForest(n_estimators=50, max_features=max_features, contamination=0.1,
+                             random_state=0).fit(data(1000, seed=7))
+    compiled = CompiledIsolationForest.from_sklearn(forest)
+
+    for X_test in (data(3000, seed=8), data(3000, seed=9, nan_share=0.2), data(100, seed=10, dtype=np.float32)):
+        np.testing.assert_array_equal(compiled.score_samples(X_test), forest.score_samples(X_test))
+        np.testing.assert_array_equal(compiled.predict(X_test), forest.predict(X_test))
+
+def test_saved_arrays_score_like_the_fitted_forest():
+    forest = IsolationForest(n_estimators=20, random_state=1).fit(data(500, seed=11))
+    compiled = CompiledIsolationForest.from_sklearn(forest)
+    reloaded = CompiledIsolationForest(**compiled.to_arrays(), offset=compiled.offset,
+                                       denominator=compiled.denominator)
+
+    X_test = data(1000, seed=12, nan_share=0.2)
+    np.testing.assert_array_equal(reloaded.score_samples(X_test), forest.score_samples(X_test))
+
+def test_system_engines_match_the_fitted_models(trained_system):
+    from model import FEATURE_DTYPE
+
+    X = np.random.default_rng(13).normal(size=(500, len(trained_system.feature_columns))).astype(FEATURE_DTYPE)
+    np.testing.assert_array_equal(trained_system._forest_predict(X), trained_system.isolation_forest.predict(X))
+    np.testing.assert_array_equal(CompiledLightGBM.from_booster(trained_system.lgbm_model).predict(X),
+                                  trained_system.lgbm_model.predict(X))
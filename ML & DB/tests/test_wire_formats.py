@@ -0,0 +1,131 @@
+import io
+
+import pandas as pd
+import pytest
+
+import model
+from benchmarks.synthetic import generate_dataset
+from wire_formats import (ARROW, JSON, MEDIA_TYPES, MSGPACK, NDJSON, PARQUET, UnsupportedFormat, decode, encode,
+                          iter_chunks, request_format)
+
+pa = pytest.importorskip("pyarrow")
+msgpack = pytest.importorskip("msgpack")
+import pyarrow.ipc as ipc  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+ALERTS = [
+    {'timestamp': '2024-01-01 00:00:00', 'source_ip': 167772161, 'destination_ip': '2001:db8::1', 'severity': 3,
+     'attack_type': 2, 'confidence': 0.875, 'isolation_forest_anomaly': True},
+    {'timestamp': '2024-01-01 00:00:05', 'source_ip': '2001:db8::2', 'destination_ip': 3232235777, 'severity': 1,
+     'attack_type': 0, 'confidence': 0.5, 'isolation_forest_anomaly': False},
+]
+
+def records(n=50, seed=0):
+    return generate_dataset(n, seed=seed)
+
+def arrow_body(df, batch_rows=None):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = io.BytesIO()
+    with ipc.new_stream(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=batch_rows):
+            writer.write_batch(batch)
+    return sink.getvalue()
+
+def parquet_body(df):
+    sink = io.BytesIO()
+    df.to_parquet(sink, index=False)
+    return sink.getvalue()
+
+def with_string_addresses(alerts):
+    return [{**alert, 'source_ip': str(alert['source_ip']), 'destination_ip': str(alert['destination_ip'])}
+            for alert in alerts]
+
+@pytest.mark.parametrize("content_type, expected", [
+    (None, JSON),
+    ("application/json; charset=utf-8", JSON),
+    ("application/jsonl", NDJSON),
+    ("Application/Vnd.Apache.Arrow.Stream", ARROW),
+    ("application/x-parquet", PARQUET),
+    ("application/vnd.msgpack", MSGPACK),
+])
+def test_content_types_name_their_format(content_type, expected):
+    assert request_format(content_type) == expected
+
+def test_unknown_content_types_are_refused():
+    with pytest.raises(UnsupportedFormat, match="text/csv"):
+        request_format("text/csv")
+    with pytest.raises(UnsupportedFormat):
+        decode(b"{}", JSON)
+
+def test_request_bodies_decode_to_the_sent_records():
+    df = records()
+    pd.testing.assert_frame_equal(decode(arrow_body(df, batch_rows=7), ARROW), df)
+    pd.testing.assert_frame_equal(decode(parquet_body(df), PARQUET), df)
+    rows = df.to_dict('records')
+    assert decode(msgpack.packb(rows), MSGPACK) == rows
+
+@pytest.mark.parametrize("batch_rows", [1, 7, 16, 100])
+def test_arrow_streams_rebatch_to_the_chunk_size(batch_rows):
+    df = records(53)
+    chunks = list(iter_chunks(io.BytesIO(arrow_body(df, batch_rows)), ARROW, 16))
+
+    assert [(start, len(chunk)) for start, chunk in chunks] == [(0, 16), (16, 16), (32, 16), (48, 5)]
+    pd.testing.assert_frame_equal(pd.concat([chunk for _, chunk in chunks], ignore_index=True), df)
+
+def test_parquet_and_msgpack_bodies_stream_in_chunks():
+    df = records(53)
+    chunks = list(iter_chunks(io.BytesIO(parquet_body(df)), PARQUET, 16))
+    assert [start for start, _ in chunks] == [0, 16, 32, 48]
+    pd.testing.assert_frame_equal(pd.concat([chunk for _, chunk in chunks], ignore_index=True), df)
+
+    rows = df.to_dict('records')
+    # Single maps and arrays of maps may be mixed in one stream
+    body = msgpack.packb(rows[0]) + msgpack.packb(rows[1:30]) + b"".join(msgpack.packb(row) for row in rows[30:])
+    chunks = list(iter_chunks(io.BytesIO(body), MSGPACK, 16))
+    assert [start for start, _ in chunks] == [0, 16, 32, 48]
+    assert [row for _, chunk in chunks for row in chunk] == rows
+
+def test_alert_responses_round_trip():
+    body, media_type = encode(ALERTS, ARROW)
+    assert media_type == MEDIA_TYPES[ARROW]
+    # IPv4 integers and IPv6 text share the address columns as strings
+    assert ipc.open_stream(body).read_all().to_pylist() == with_string_addresses(ALERTS)
+
+    body, media_type = encode(ALERTS, PARQUET)
+    assert media_type == MEDIA_TYPES[PARQUET]
+    assert pq.read_table(io.BytesIO(body)).to_pylist() == with_string_addresses(ALERTS)
+
+    body, media_type = encode(ALERTS, MSGPACK)
+    assert msgpack.unpackb(body) == ALERTS
+    with pytest.raises(UnsupportedFormat):
+        encode(ALERTS, NDJSON)
+
+@pytest.mark.parametrize("content_type, body", [
+    (MEDIA_TYPES[ARROW], lambda df: arrow_body(df, batch_rows=9)),
+    (MEDIA_TYPES[PARQUET], parquet_body),
+    (MEDIA_TYPES[MSGPACK], lambda df: msgpack.packb(df.to_dict('records'))),
+])
+@pytest.mark.parametrize("accept", [MEDIA_TYPES[JSON], MEDIA_TYPES[ARROW], MEDIA_TYPES[MSGPACK]])
+def test_detect_reads_and_answers_in_each_format(system, monkeypatch, content_type, body, accept):
+    df = records(20)
+    received = []
+
+    def detect_anomalies(new_data):
+        received.append(new_data)
+        return ALERTS
+
+    monkeypatch.setattr(system, "detect_anomalies", detect_anomalies)
+    monkeypatch.setattr(model, "system", system)
+    monkeypatch.setattr(model, "batcher", None)
+    response = model.app.test_client().post("/detect", data=body(df), content_type=content_type,
+                                            headers={'Accept': accept})
+
+    assert response.status_code == 200
+    assert response.mimetype == accept
+    pd.testing.assert_frame_equal(received[0], model.records_frame(df.to_dict('records')))
+    if accept == MEDIA_TYPES[JSON]:
+        assert response.get_json() == ALERTS
+    elif accept == MEDIA_TYPES[ARROW]:
+        assert ipc.open_stream(response.data).read_all().to_pylist() == with_string_addresses(ALERTS)
+    else:
+        assert msgpack.unpackb(response.data) == ALERTS
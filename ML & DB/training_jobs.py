@@ -0,0 +1,140 @@
+"""Training jobs that run in their own process, off the serving path.
+
+A full job trains a complete model set in a freshly spawned interpreter,
+saves it as a new artifact version, publishes it, and then hands the EDA
+summary to a detached renderer (see eda.py), so the job finishes without
+waiting for the figures. An incremental job updates the published set with
+newly labeled events instead (see train_incremental).
+
+Job state lives in ``<jobs_dir>/<job_id>.json`` and is written by the job
+itself, so any serving process (including other pre-fork workers) can
+report it. Jobs serialize on a file lock, so concurrent requests queue
+instead of training side by side.
+"""
+import datetime
+import fcntl
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+
+import eda
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+FULL, INCREMENTAL = 'full', 'incremental'
+LOCK_FILE = ".lock"
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+def _write_status(path, **fields):
+    status = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            status = json.load(f)
+    status.update(fields)
+    temporary = f"{path}.tmp-{os.getpid()}"
+    with open(temporary, "w") as f:
+        json.dump(status, f, indent=2, default=str)
+    os.replace(temporary, path)
+    return status
+
+def _configure_threads(threads):
+    # Must run before TensorFlow builds its thread pools
+    from tensorflow import config
+
+    config.threading.set_intra_op_parallelism_threads(threads)
+    config.threading.set_inter_op_parallelism_threads(2)
+
+def _run(status_path, lock_path, mode, source, memory_budget_mb):
+    """Job process entry point"""
+    import model
+
+    with open(lock_path, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        _write_status(status_path, status=RUNNING, started_at=_now(), pid=os.getpid())
+        try:
+            # A full in-memory training fits the autoencoder alongside the tree models
+            concurrent = mode != INCREMENTAL and not memory_budget_mb
+            _configure_threads(model.training_thread_split()[2] if concurrent else model.TRAINING_THREADS)
+            # The job only trains and publishes; the serving processes own the indexes and the window
+            system = model.CyberSecurityDetectionSystem(serving=False)
+            if mode == INCREMENTAL:
+                model.train_incremental(system, source)
+                version = model.save_models(system)
+                _write_status(status_path, status=SUCCEEDED, version=version, published_at=_now(),
+                              finished_at=_now(), training=system.training_metadata)
+                return
+            summary = model.train_from_csv(system, source, memory_budget_mb)
+            version = model.save_models(system)
+            # Published before EDA, so serving processes can swap the new models in right away
+            _write_status(status_path, version=version, published_at=_now(), training=system.training_metadata)
+            try:
+                _write_status(status_path, eda_dir=system.perform_eda(summary, source=source, background=True))
+            except Exception as e:
+                logging.error(f"EDA failed for model version {version}: {e}", exc_info=True)
+                _write_status(status_path, eda_error=str(e))
+            _write_status(status_path, status=SUCCEEDED, finished_at=_now())
+        except Exception as e:
+            logging.error(f"Training job failed: {e}", exc_info=True)
+            _write_status(status_path, status=FAILED, finished_at=_now(), error=str(e))
+            raise
+
+class TrainingJobs:
+    def __init__(self, jobs_dir, on_published=None):
+        """``on_published(version)`` is called in this process once a job publishes its models"""
+        self.jobs_dir = jobs_dir
+        self.on_published = on_published
+        # Spawned, not forked: the server process has threads and live TensorFlow/OpenMP state
+        self._context = multiprocessing.get_context('spawn')
+
+    def _path(self, job_id):
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def submit(self, source, memory_budget_mb=None, mode=FULL):
+        """Start a training job and return its id.
+
+        ``source`` is the CSV for a full job, or the event source for an
+        incremental one.
+        """
+        if mode not in (FULL, INCREMENTAL):
+            raise ValueError(f"Unknown training mode {mode!r}")
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        job_id = uuid.uuid4().hex[:12]
+        status_path = self._path(job_id)
+        _write_status(status_path, id=job_id, status=QUEUED, created_at=_now(), mode=mode, source=source,
+                      memory_budget_mb=memory_budget_mb)
+        process = self._context.Process(target=_run, name=f"training-{job_id}",
+                                        args=(status_path, os.path.join(self.jobs_dir, LOCK_FILE),
+                                              mode, source, memory_budget_mb))
+        process.start()
+        threading.Thread(target=self._watch, args=(job_id, process), name=f"training-watch-{job_id}",
+                         daemon=True).start()
+        return job_id
+
+    def _watch(self, job_id, process):
+        process.join()
+        status = self.get(job_id)
+        if status['status'] in (QUEUED, RUNNING):
+            # Killed before it could record the outcome (OOM killer, signal)
+            status = _write_status(self._path(job_id), status=FAILED, finished_at=_now(),
+                                   error=f"Training process exited with code {process.exitcode}")
+        logging.info(f"Training job {job_id} {status['status']}")
+        if status.get('version') and self.on_published is not None:
+            self.on_published(status['version'])
+
+    def get(self, job_id):
+        """Status of a job, or None if the id is unknown"""
+        if not all(c in '0123456789abcdef' for c in job_id):
+            return None
+        try:
+            with open(self._path(job_id)) as f:
+                status = json.load(f)
+        except FileNotFoundError:
+            return None
+        if status.get('eda_dir'):
+            # Rendering outlives the job; its progress is kept next to the figures
+            status['eda'] = eda.status(status['eda_dir'])
+        return status
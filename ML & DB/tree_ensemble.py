@@ -0,0 +1,297 @@
+"""Tree ensembles flattened into contiguous node arrays.
+
+All trees of an ensemble share one set of node arrays (feature, threshold,
+left/right child, leaf value) with a root offset per tree, so a fitted model
+can be stored as plain .npy files, memory-mapped, and scored for a whole
+batch with a vectorized level-by-level traversal of every tree at once.
+
+Both the sklearn IsolationForest and the LightGBM booster compile to this
+form. On small batches the traversal is a few dozen NumPy calls, against the
+per-call setup of LightGBM's predict and sklearn's per-tree Python loop.
+"""
+import math
+
+import numpy as np
+
+LEAF = -1
+# Samples traversed together; keeps the (n_trees, block) working arrays cache-sized
+BLOCK_ROWS = 1024
+
+# LightGBM missing-value handling, bits 2-3 of a split's decision_type
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+# LightGBM treats |x| <= 1e-35f as zero
+ZERO_THRESHOLD = float(np.float32(1e-35))
+
+class _Walker:
+    """Level-by-level traversal of every tree at once.
+
+    Nodes are renumbered breadth-first so each split's right child directly
+    follows its left child, and leaves never move (threshold +inf, self
+    loop). A level is then one gather-compare-add over all (tree, sample)
+    pairs, repeated for the depth of the deepest tree.
+    """
+
+    def __init__(self, roots, feature, threshold, left, right, missing_type=None, default_left=None):
+        feature, left, right = np.asarray(feature), np.asarray(left), np.asarray(right)
+        # order[new id] = original id
+        levels, frontier = [np.asarray(roots)], np.asarray(roots)
+        while True:
+            splits = frontier[feature[frontier] != LEAF]
+            if not len(splits):
+                break
+            frontier = np.stack([left[splits], right[splits]], axis=1).ravel()
+            levels.append(frontier)
+        self.depth = len(levels) - 1
+        self.order = np.concatenate(levels)
+        renumbered = np.empty(len(feature), dtype=np.int64)
+        renumbered[self.order] = np.arange(len(self.order))
+        is_leaf = feature[self.order] == LEAF
+        self.roots = renumbered[roots]
+        self.feature = np.where(is_leaf, 0, feature[self.order])
+        self.threshold = np.where(is_leaf, np.inf, np.asarray(threshold)[self.order])
+        self.left = np.where(is_leaf, np.arange(len(self.order)), renumbered[np.where(is_leaf, 0, left[self.order])])
+        # Per-node missing-value rules, only kept when some split uses them
+        self.missing_type = None
+        self.zero_rules = False
+        if missing_type is not None and np.any(np.asarray(missing_type)[self.order][~is_leaf] != MISSING_NONE):
+            self.missing_type = np.where(is_leaf, MISSING_NONE, np.asarray(missing_type)[self.order])
+            self.default_left = np.asarray(default_left, dtype=bool)[self.order] | is_leaf
+            # Without NaN in a batch only MISSING_ZERO splits differ from a plain comparison
+            self.zero_rules = bool(np.any(self.missing_type == MISSING_ZERO))
+
+    def leaves(self, X):
+        """Original leaf node id of every (tree, sample) pair, shape (n_trees, n_samples)"""
+        n_samples, n_features = X.shape
+        nodes = np.repeat(self.roots[:, None], n_samples, axis=1)
+        # Row offsets into the flattened batch
+        offsets = (np.arange(n_samples) * n_features)[None, :]
+        flat = X.ravel()
+        missing = self.zero_rules or np.isnan(flat).any()
+        for _ in range(self.depth):
+            values = flat[offsets + self.feature[nodes]]
+            if missing:
+                go_right = ~self._missing_decision(values, nodes)
+            else:
+                go_right = values > self.threshold[nodes]
+            nodes = self.left[nodes] + go_right
+        return self.order[nodes]
+
+    def _missing_decision(self, values, nodes):
+        """LightGBM's NumericalDecision (True goes left): NaN counts as 0 unless the split routes NaN itself"""
+        nan = np.isnan(values)
+        if self.missing_type is None:
+            return np.where(nan, 0.0, values) <= self.threshold[nodes]
+        kind = self.missing_type[nodes]
+        values = np.where(nan & (kind != MISSING_NAN), 0.0, values)
+        use_default = (((kind == MISSING_ZERO) & (np.abs(values) <= ZERO_THRESHOLD))
+                       | ((kind == MISSING_NAN) & nan))
+        return np.where(use_default, self.default_left[nodes], values <= self.threshold[nodes])
+
+class CompiledIsolationForest:
+    """Array form of a fitted sklearn IsolationForest with identical predictions.
+
+    ``missing_left`` is sklearn's per-node ``missing_go_to_left``: the side a
+    NaN feature value takes at each split. Without it NaN counts as 0, as
+    forests compiled before it was kept did.
+    """
+
+    ARRAYS = ['roots', 'feature', 'threshold', 'left', 'right', 'leaf_depth', 'missing_left']
+
+    def __init__(self, roots, feature, threshold, left, right, leaf_depth, missing_left, offset, denominator):
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_depth = leaf_depth
+        self.missing_left = missing_left
+        self.offset = float(offset)
+        self.denominator = float(denominator)
+        missing_type = None if missing_left is None else np.full(len(feature), MISSING_NAN, dtype=np.int8)
+        self._walker = _Walker(roots, feature, threshold, left, right, missing_type, missing_left)
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        from sklearn.ensemble._iforest import _average_path_length
+
+        roots, feature, threshold, left, right, leaf_depth, missing_left = [], [], [], [], [], [], []
+        base = 0
+        for tree, features in zip(forest.estimators_, forest.estimators_features_):
+            tree = tree.tree_
+            is_leaf = tree.children_left == -1
+            # Node depths with the root at 0; children always come after their parent
+            depth = np.zeros(tree.node_count)
+            for node in range(tree.node_count):
+                if not is_leaf[node]:
+                    depth[tree.children_left[node]] = depth[node] + 1
+                    depth[tree.children_right[node]] = depth[node] + 1
+            roots.append(base)
+            # Trees see a column subset; map their feature ids back to global columns
+            feature.append(np.where(is_leaf, LEAF, np.asarray(features)[np.maximum(tree.feature, 0)]))
+            threshold.append(tree.threshold)
+            left.append(np.where(is_leaf, -1, tree.children_left + base))
+            right.append(np.where(is_leaf, -1, tree.children_right + base))
+            missing_left.append(np.asarray(tree.missing_go_to_left, dtype=bool) & ~is_leaf)
+            # Same per-leaf path length sklearn adds: depth plus the expected depth of the unbuilt subtree
+            leaf_depth.append(np.where(is_leaf, (depth + 1) + _average_path_length(tree.n_node_samples) - 1.0, 0.0))
+            base += tree.node_count
+        denominator = len(forest.estimators_) * _average_path_length([forest._max_samples])[0]
+        return cls(np.array(roots, dtype=np.int64),
+                   np.concatenate(feature).astype(np.int32),
+                   np.concatenate(threshold).astype(np.float64),
+                   np.concatenate(left).astype(np.int64),
+                   np.concatenate(right).astype(np.int64),
+                   np.concatenate(leaf_depth).astype(np.float64),
+                   np.concatenate(missing_left),
+                   forest.offset_, denominator)
+
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAYS if getattr(self, name) is not None}
+
+    def score_samples(self, X):
+        # sklearn scores trees on float32 input
+        X = np.asarray(X, dtype=np.float32)
+        depths = np.zeros(len(X))
+        for start in range(0, len(X), BLOCK_ROWS):
+            leaves = self._walker.leaves(np.ascontiguousarray(X[start:start + BLOCK_ROWS]))
+            # Reducing over the tree axis adds tree by tree in sklearn's order, for bit-identical sums
+            depths[start:start + BLOCK_ROWS] = self.leaf_depth[leaves].sum(axis=0)
+        if self.denominator == 0:
+            return -np.ones(len(X))
+        return -(2 ** (-depths / self.denominator))
+
+    def decision_function(self, X):
+        return self.score_samples(X) - self.offset
+
+    def predict(self, X):
+        is_inlier = np.ones(len(X), dtype=int)
+        is_inlier[self.decision_function(X) < 0] = -1
+        return is_inlier
+
+class CompiledLightGBM:
+    """Array form of a LightGBM booster with numerical splits, with identical predictions.
+
+    Built from the booster's text model, so thresholds and leaf values are
+    the exact doubles LightGBM itself uses. Trees are ordered as in the
+    model: tree ``t`` adds to the raw score of class ``t % num_class``.
+    """
+
+    ARRAYS = ['roots', 'feature', 'threshold', 'left', 'right', 'value', 'missing_type', 'default_left']
+    OBJECTIVES = ('multiclass', 'binary', 'regression')
+
+    def __init__(self, roots, feature, threshold, left, right, value, missing_type, default_left,
+                 num_class, objective, sigmoid=1.0):
+        if objective not in self.OBJECTIVES:
+            raise ValueError(f"Unsupported LightGBM objective {objective!r}; expected one of {self.OBJECTIVES}")
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.missing_type = missing_type
+        self.default_left = default_left
+        self.num_class = int(num_class)
+        self.objective = objective
+        self.sigmoid = float(sigmoid)
+        self._walker = _Walker(roots, feature, threshold, left, right, missing_type, default_left)
+
+    @property
+    def num_trees(self):
+        return len(self.roots)
+
+    @classmethod
+    def from_booster(cls, booster, num_iteration=None):
+        """Compile the trees booster.predict would use (best_iteration unless num_iteration is given)"""
+        return cls.from_string(booster.model_to_string(num_iteration=num_iteration))
+
+    @classmethod
+    def from_string(cls, model):
+        header, trees = {}, []
+        current = header
+        for line in model.splitlines():
+            if line.startswith('Tree='):
+                current = {}
+                trees.append(current)
+            elif line == 'end of trees':
+                break
+            elif '=' in line:
+                key, value = line.split('=', 1)
+                current[key] = value
+        objective, *options = header['objective'].split()
+        options = dict(option.split(':', 1) for option in options if ':' in option)
+
+        roots, feature, threshold, left, right, value, missing_type, default_left = ([] for _ in range(8))
+        base = 0
+        for tree in trees:
+            if int(tree.get('num_cat', 0)) or tree.get('is_linear', '0') != '0':
+                raise ValueError("Categorical splits and linear trees are not supported")
+            leaf_value = np.array(tree['leaf_value'].split(), dtype=np.float64)
+            n_internal = int(tree['num_leaves']) - 1
+
+            def numbers(key, dtype):
+                return np.array(tree[key].split(), dtype=dtype) if n_internal else np.empty(0, dtype=dtype)
+
+            decision_type = numbers('decision_type', np.int64)
+            # Internal nodes come first, then leaves; LightGBM encodes leaf j as child ~j
+            children = [numbers(key, np.int64) for key in ('left_child', 'right_child')]
+            children = [np.where(child >= 0, child, n_internal + ~child) + base for child in children]
+            no_child = np.full(len(leaf_value), LEAF)
+            roots.append(base)
+            feature.append(np.concatenate([numbers('split_feature', np.int64), no_child]))
+            threshold.append(np.concatenate([numbers('threshold', np.float64), np.zeros(len(leaf_value))]))
+            left.append(np.concatenate([children[0], no_child]))
+            right.append(np.concatenate([children[1], no_child]))
+            value.append(np.concatenate([np.zeros(n_internal), leaf_value]))
+            missing_type.append(np.concatenate([(decision_type >> 2) & 3, np.zeros(len(leaf_value), np.int64)]))
+            default_left.append(np.concatenate([(decision_type & 2) != 0, np.zeros(len(leaf_value), bool)]))
+            base += n_internal + len(leaf_value)
+        return cls(np.array(roots, dtype=np.int64),
+                   np.concatenate(feature).astype(np.int32),
+                   np.concatenate(threshold),
+                   np.concatenate(left).astype(np.int64),
+                   np.concatenate(right).astype(np.int64),
+                   np.concatenate(value),
+                   np.concatenate(missing_type).astype(np.int8),
+                   np.concatenate(default_left),
+                   int(header.get('num_tree_per_iteration', header.get('num_class', 1))),
+                   objective, float(options.get('sigmoid', 1.0)))
+
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    def raw_score(self, X):
+        """Summed leaf values per class, shape (n_samples, num_class)"""
+        X = np.asarray(X)
+        if X.dtype not in (np.float32, np.float64):
+            X = X.astype(np.float64)
+        raw = np.zeros((len(X), self.num_class))
+        for start in range(0, len(X), BLOCK_ROWS):
+            leaves = self._walker.leaves(np.ascontiguousarray(X[start:start + BLOCK_ROWS]))
+            values = self.value[leaves].reshape(-1, self.num_class, leaves.shape[1])
+            # Iteration by iteration, as LightGBM accumulates them
+            raw[start:start + BLOCK_ROWS] = values.sum(axis=0).T
+        return raw
+
+    def predict(self, X):
+        """Same output as Booster.predict: class probabilities, or one column for binary/regression"""
+        raw = self.raw_score(X)
+        if self.objective == 'multiclass':
+            # LightGBM's Common::Softmax
+            exp = _exp(raw - raw.max(axis=1, keepdims=True))
+            total = exp[:, 0].copy()
+            for column in range(1, self.num_class):
+                total += exp[:, column]
+            return exp / total[:, None]
+        raw = raw[:, 0]
+        if self.objective == 'binary':
+            return 1.0 / (1.0 + _exp(-self.sigmoid * raw))
+        return raw
+
+def _exp(x):
+    """exp through the C library like LightGBM; NumPy's vectorized exp can differ in the last bit"""
+    return np.fromiter(map(math.exp, x.ravel().tolist()), dtype=np.float64, count=x.size).reshape(x.shape)
@@ -0,0 +1,143 @@
+"""Request and response body formats for the detect endpoints.
+
+JSON stays the default. Arrow IPC streams and Parquet are columnar: they
+decode straight into a DataFrame without building a Python object per
+field, which is where JSON spends its time on large batches. MessagePack is
+a compact row format for small requests. pyarrow and msgpack are optional
+and only imported when a client uses their format.
+"""
+import importlib
+import io
+
+JSON = 'json'
+NDJSON = 'ndjson'
+ARROW = 'arrow'
+PARQUET = 'parquet'
+MSGPACK = 'msgpack'
+
+MEDIA_TYPES = {
+    JSON: 'application/json',
+    NDJSON: 'application/x-ndjson',
+    ARROW: 'application/vnd.apache.arrow.stream',
+    PARQUET: 'application/vnd.apache.parquet',
+    MSGPACK: 'application/msgpack',
+}
+FORMATS = {
+    **{media_type: name for name, media_type in MEDIA_TYPES.items()},
+    'application/jsonl': NDJSON,
+    'application/ndjson': NDJSON,
+    'application/x-parquet': PARQUET,
+    'application/x-msgpack': MSGPACK,
+    'application/vnd.msgpack': MSGPACK,
+}
+# Formats a /detect response can be encoded in, in order of preference
+RESPONSE_TYPES = [MEDIA_TYPES[name] for name in (JSON, ARROW, PARQUET, MSGPACK)]
+# Alert fields holding an IPv4 integer or IPv6 text, typed as strings in columnar responses
+ADDRESS_FIELDS = ('source_ip', 'destination_ip')
+
+class UnsupportedFormat(ValueError):
+    pass
+
+def request_format(content_type):
+    """Format name for a Content-Type header; JSON when absent"""
+    media_type = (content_type or MEDIA_TYPES[JSON]).split(';')[0].strip().lower()
+    if media_type not in FORMATS:
+        raise UnsupportedFormat(f"Unsupported Content-Type {media_type!r}; expected one of {sorted(FORMATS)}")
+    return FORMATS[media_type]
+
+def _import(module, format_name):
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        raise UnsupportedFormat(f"{format_name} bodies need the {module.split('.')[0]} package on the server")
+
+def decode(body, format_name):
+    """Decode a request body into a DataFrame (columnar formats) or records (row formats)"""
+    if format_name == ARROW:
+        ipc = _import('pyarrow.ipc', 'Arrow')
+        return ipc.open_stream(body).read_all().to_pandas()
+    if format_name == PARQUET:
+        pq = _import('pyarrow.parquet', 'Parquet')
+        return pq.read_table(io.BytesIO(body)).to_pandas()
+    if format_name == MSGPACK:
+        msgpack = _import('msgpack', 'MessagePack')
+        return msgpack.unpackb(body)
+    raise UnsupportedFormat(f"Cannot decode {format_name} bodies here")
+
+def iter_chunks(stream, format_name, chunk_rows):
+    """Yield ``(start_index, DataFrame or records)`` chunks of a bulk body in a binary format"""
+    if format_name == ARROW:
+        ipc = _import('pyarrow.ipc', 'Arrow')
+        batches = _rebatch(ipc.open_stream(stream), chunk_rows)
+    elif format_name == PARQUET:
+        pq = _import('pyarrow.parquet', 'Parquet')
+        # The footer is at the end, so Parquet needs the whole body
+        batches = pq.ParquetFile(io.BytesIO(stream.read())).iter_batches(batch_size=chunk_rows)
+    elif format_name == MSGPACK:
+        from bulk_records import chunked
+
+        yield from chunked(_iter_msgpack(stream), chunk_rows)
+        return
+    else:
+        raise UnsupportedFormat(f"Cannot stream {format_name} bodies here")
+    start = 0
+    for batch in batches:
+        yield start, batch.to_pandas()
+        start += batch.num_rows
+
+def _rebatch(reader, rows):
+    """Re-slice an Arrow record batch stream into batches of ``rows`` rows"""
+    pa = _import('pyarrow', 'Arrow')
+    pending, pending_rows = [], 0
+    for batch in reader:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        while pending_rows >= rows:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, rows).combine_chunks().to_batches()[0]
+            pending = table.slice(rows).to_batches()
+            pending_rows -= rows
+    if pending_rows:
+        yield pa.Table.from_batches(pending).combine_chunks().to_batches()[0]
+
+def _iter_msgpack(stream):
+    """Records from a stream of MessagePack maps, arrays of maps, or both"""
+    msgpack = _import('msgpack', 'MessagePack')
+    for item in msgpack.Unpacker(stream):
+        if isinstance(item, list):
+            yield from item
+        else:
+            yield item
+
+def _alert_table(pa, alerts):
+    """Arrow table of alert dicts; address fields are strings so IPv4 and IPv6 alerts share a column"""
+    names = list(dict.fromkeys(name for alert in alerts for name in alert))
+    columns = []
+    for name in names:
+        values = [alert.get(name) for alert in alerts]
+        if name in ADDRESS_FIELDS:
+            columns.append(pa.array([None if value is None else str(value) for value in values], type=pa.string()))
+        else:
+            columns.append(pa.array(values))
+    return pa.Table.from_arrays(columns, names=names)
+
+def encode(alerts, format_name):
+    """Encode a list of alert dicts; returns ``(body, media_type)``"""
+    if format_name == ARROW:
+        pa = _import('pyarrow', 'Arrow')
+        ipc = _import('pyarrow.ipc', 'Arrow')
+        table = _alert_table(pa, alerts)
+        sink = io.BytesIO()
+        with ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue(), MEDIA_TYPES[ARROW]
+    if format_name == PARQUET:
+        pa = _import('pyarrow', 'Parquet')
+        pq = _import('pyarrow.parquet', 'Parquet')
+        sink = io.BytesIO()
+        pq.write_table(_alert_table(pa, alerts), sink)
+        return sink.getvalue(), MEDIA_TYPES[PARQUET]
+    if format_name == MSGPACK:
+        msgpack = _import('msgpack', 'MessagePack')
+        return msgpack.packb(alerts), MEDIA_TYPES[MSGPACK]
+    raise UnsupportedFormat(f"Cannot encode {format_name} responses here")